@@ -0,0 +1,178 @@
+"""Initial schema, as previously created by Base.metadata.create_all
+
+Databases created by the old startup create_all already match this revision,
+so it creates nothing when their tables exist and `alembic upgrade head` can
+run on them directly.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = {"users", "airlines", "airports", "flights", "bookings", "passengers", "banners", "offers"}
+
+
+def upgrade():
+    if TABLES <= set(sa.inspect(op.get_bind()).get_table_names()):
+        # Created by create_all before migrations existed
+        return
+
+    op.create_table(
+        "users",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("airline_id", sa.String(), nullable=True),
+        sa.Column("is_blocked", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "airlines",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("logo", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("manager_id", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["manager_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("code"),
+    )
+    op.create_index("ix_airlines_id", "airlines", ["id"])
+    # users and airlines reference each other
+    op.create_foreign_key("users_airline_id_fkey", "users", "airlines", ["airline_id"], ["id"])
+
+    op.create_table(
+        "airports",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("code", sa.String(), nullable=False),
+        sa.Column("city", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=False),
+        sa.Column("timezone", sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_airports_id", "airports", ["id"])
+    op.create_index("ix_airports_code", "airports", ["code"], unique=True)
+
+    op.create_table(
+        "flights",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("flight_number", sa.String(), nullable=False),
+        sa.Column("airline_id", sa.String(), nullable=False),
+        sa.Column("origin_id", sa.String(), nullable=False),
+        sa.Column("destination_id", sa.String(), nullable=False),
+        sa.Column("departure_time", sa.DateTime(), nullable=False),
+        sa.Column("arrival_time", sa.DateTime(), nullable=False),
+        sa.Column("duration", sa.Integer(), nullable=False),
+        sa.Column("price", sa.Float(), nullable=False),
+        sa.Column("available_seats", sa.Integer(), nullable=False),
+        sa.Column("total_seats", sa.Integer(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["airline_id"], ["airlines.id"]),
+        sa.ForeignKeyConstraint(["origin_id"], ["airports.id"]),
+        sa.ForeignKeyConstraint(["destination_id"], ["airports.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_flights_id", "flights", ["id"])
+
+    op.create_table(
+        "bookings",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("confirmation_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("flight_id", sa.String(), nullable=False),
+        sa.Column("total_price", sa.Float(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("payment_status", sa.String(), nullable=True),
+        sa.Column("booked_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["flight_id"], ["flights.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_bookings_id", "bookings", ["id"])
+    op.create_index("ix_bookings_confirmation_id", "bookings", ["confirmation_id"], unique=True)
+
+    op.create_table(
+        "passengers",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("booking_id", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=False),
+        sa.Column("last_name", sa.String(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("date_of_birth", sa.String(), nullable=False),
+        sa.Column("passport_number", sa.String(), nullable=True),
+        sa.Column("nationality", sa.String(), nullable=True),
+        sa.ForeignKeyConstraint(["booking_id"], ["bookings.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_passengers_id", "passengers", ["id"])
+
+    op.create_table(
+        "banners",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("image_url", sa.String(), nullable=True),
+        sa.Column("link", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("order", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_banners_id", "banners", ["id"])
+
+    op.create_table(
+        "offers",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("title", sa.String(), nullable=False),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("discount", sa.Float(), nullable=False),
+        sa.Column("valid_from", sa.DateTime(), nullable=False),
+        sa.Column("valid_to", sa.DateTime(), nullable=False),
+        sa.Column("min_price", sa.Float(), nullable=True),
+        sa.Column("max_discount", sa.Float(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_offers_id", "offers", ["id"])
+
+
+def downgrade():
+    op.drop_table("offers")
+    op.drop_table("banners")
+    op.drop_table("passengers")
+    op.drop_table("bookings")
+    op.drop_table("flights")
+    op.drop_table("airports")
+    op.drop_constraint("users_airline_id_fkey", "users", type_="foreignkey")
+    op.drop_table("airlines")
+    op.drop_table("users")
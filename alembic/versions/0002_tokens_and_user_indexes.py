@@ -0,0 +1,55 @@
+"""Revoked tokens table and user directory indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # create_all created these too once they were on the models, so databases
+    # that predate migrations may already have some of them
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("revoked_tokens"):
+        op.create_table(
+            "revoked_tokens",
+            sa.Column("jti", sa.String(), nullable=False),
+            sa.Column("token_type", sa.String(), nullable=False),
+            sa.Column("expires_at", sa.DateTime(), nullable=False),
+            sa.Column("revoked_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+            sa.PrimaryKeyConstraint("jti"),
+        )
+        op.create_index("ix_revoked_tokens_expires_at", "revoked_tokens", ["expires_at"])
+        op.create_index("ix_revoked_tokens_revoked_at", "revoked_tokens", ["revoked_at"])
+
+    user_indexes = {index["name"] for index in inspector.get_indexes("users")}
+    for name, columns, options in (
+        ("ix_users_airline_id", ["airline_id"], {}),
+        ("ix_users_role_id", ["role", "id"], {}),
+        ("ix_users_email_pattern", ["email"], {"postgresql_ops": {"email": "varchar_pattern_ops"}}),
+        ("ix_users_first_name_lower", [sa.text("lower(first_name)")],
+         {"postgresql_ops": {"lower(first_name)": "text_pattern_ops"}}),
+        ("ix_users_last_name_lower", [sa.text("lower(last_name)")],
+         {"postgresql_ops": {"lower(last_name)": "text_pattern_ops"}}),
+    ):
+        if name not in user_indexes:
+            op.create_index(name, "users", columns, **options)
+
+
+def downgrade():
+    op.drop_index("ix_users_last_name_lower", table_name="users")
+    op.drop_index("ix_users_first_name_lower", table_name="users")
+    op.drop_index("ix_users_email_pattern", table_name="users")
+    op.drop_index("ix_users_role_id", table_name="users")
+    op.drop_index("ix_users_airline_id", table_name="users")
+    op.drop_table("revoked_tokens")
@@ -0,0 +1,60 @@
+"""Unique flight schedule index
+
+Duplicate departures (same airline, flight number and departure time) were
+allowed before. Copies without bookings are deleted, keeping a booked copy or
+else the one with the lowest id. If more than one copy of a departure has
+bookings the upgrade stops and lists them; move the bookings onto one row,
+delete the others and rerun it.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        DELETE FROM flights
+        WHERE NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.flight_id = flights.id)
+          AND EXISTS (
+            SELECT 1 FROM flights AS other
+            WHERE other.airline_id = flights.airline_id
+              AND other.flight_number = flights.flight_number
+              AND other.departure_time = flights.departure_time
+              AND other.id <> flights.id
+              AND (other.id < flights.id
+                   OR EXISTS (SELECT 1 FROM bookings WHERE bookings.flight_id = other.id))
+          )
+    """)
+    duplicates = op.get_bind().execute(sa.text("""
+        SELECT flight_number, departure_time FROM flights
+        GROUP BY airline_id, flight_number, departure_time
+        HAVING count(*) > 1
+        ORDER BY departure_time
+    """)).all()
+    if duplicates:
+        listed = ", ".join(f"{flight_number} at {departure_time}" for flight_number, departure_time in duplicates[:10])
+        raise RuntimeError(
+            f"{len(duplicates)} departures have more than one booked flight row: {listed}. "
+            "Move their bookings onto one row and delete the others, then rerun the upgrade."
+        )
+
+    op.create_index(
+        "ix_flights_airline_number_departure", "flights",
+        ["airline_id", "flight_number", "departure_time"],
+        unique=True,
+    )
+
+
+def downgrade():
+    op.drop_index("ix_flights_airline_number_departure", table_name="flights")
@@ -0,0 +1,25 @@
+"""Flight base price for dynamic pricing
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:03
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("flights", sa.Column("base_price", sa.Float(), nullable=True))
+    op.execute("UPDATE flights SET base_price = price")
+
+
+def downgrade():
+    op.drop_column("flights", "base_price")
@@ -0,0 +1,27 @@
+"""Indexes for scheduled flight and booking status transitions
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:04
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_flights_status_departure", "flights", ["status", "departure_time"])
+    op.create_index("ix_flights_status_arrival", "flights", ["status", "arrival_time"])
+    op.create_index("ix_bookings_flight_id_status", "bookings", ["flight_id", "status"])
+
+
+def downgrade():
+    op.drop_index("ix_bookings_flight_id_status", table_name="bookings")
+    op.drop_index("ix_flights_status_arrival", table_name="flights")
+    op.drop_index("ix_flights_status_departure", table_name="flights")
@@ -1,26 +1,90 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
+import asyncio
+import base64
+import hashlib
+import hmac
 import os
+import secrets
+import uuid
 from dotenv import load_dotenv
+from revocation import revocation_list
 
 load_dotenv()
 
 # Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+
+# Password hashing
+PASSWORD_HASH_SCHEME = "pbkdf2_sha256"
+PASSWORD_HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+# hashlib releases the GIL while deriving keys, so a small thread pool runs
+# hashes in parallel without occupying the request threadpool
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+
+def _pbkdf2(password: str, salt: bytes, iterations: int) -> bytes:
+    return hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
 
-def verify_password(plain_password: str, stored_password: str) -> bool:
-    """Verify a password - simple plain text comparison for development."""
-    print(f"Verifying password. Stored: {stored_password}, Input: {plain_password}")
-    return plain_password == stored_password
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.b64decode(data + "=" * (-len(data) % 4))
 
 
 def get_password_hash(password: str) -> str:
-    """Return password as-is for development (no hashing)."""
-    return password
+    """Hash a password as pbkdf2_sha256$<iterations>$<salt>$<hash>."""
+    salt = secrets.token_bytes(16)
+    digest = _pbkdf2(password, salt, PASSWORD_HASH_ITERATIONS)
+    return f"{PASSWORD_HASH_SCHEME}${PASSWORD_HASH_ITERATIONS}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def verify_password(plain_password: str, stored_password: str) -> bool:
+    """Verify a password against a stored hash or a legacy plain text value."""
+    if not stored_password.startswith(PASSWORD_HASH_SCHEME + "$"):
+        return hmac.compare_digest(plain_password.encode("utf-8"), stored_password.encode("utf-8"))
+    try:
+        _, iterations, salt, digest = stored_password.split("$")
+        expected = _b64decode(digest)
+        actual = _pbkdf2(plain_password, _b64decode(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+
+def password_needs_rehash(stored_password: str) -> bool:
+    """Legacy plain text rows and hashes made with an old cost factor need rehashing."""
+    if not stored_password.startswith(PASSWORD_HASH_SCHEME + "$"):
+        return True
+    iterations = stored_password.split("$")[1]
+    return iterations != str(PASSWORD_HASH_ITERATIONS)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the dedicated hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, stored_password: str) -> bool:
+    """Verify a password on the dedicated hashing pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, verify_password, plain_password, stored_password)
+
+
+# Compared against when the email is unknown so that lookups take the same time
+DUMMY_PASSWORD_HASH = f"{PASSWORD_HASH_SCHEME}${PASSWORD_HASH_ITERATIONS}${_b64encode(b'0' * 16)}${_b64encode(b'0' * 32)}"
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -31,22 +95,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+
+def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """Create a long-lived JWT refresh token."""
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> dict:
-    """Verify and decode a JWT token."""
+def verify_token(token: str, token_type: str = "access") -> dict:
+    """Verify and decode a JWT token, rejecting revoked tokens."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        # Tokens issued before refresh tokens existed carry no type and are access tokens
+        if email is None or payload.get("type", "access") != token_type:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        jti = payload.get("jti")
+        if jti and revocation_list.is_revoked(jti):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
         return payload
     except JWTError:
         raise HTTPException(
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+"""
+Sync vs async database path benchmark.
+
+Runs the same flight listing query at increasing concurrency through the sync
+session (dispatched on a threadpool capped like Starlette's default of 40
+threads) and through AsyncSession on the event loop, and reports throughput
+and latency percentiles for each.
+
+    DATABASE_URL=postgresql://... python benchmarks/async_vs_sync.py --requests 2000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import anyio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crud  # noqa: E402
+import crud_async  # noqa: E402
+from database import SessionLocal, AsyncSessionLocal, engine, async_engine  # noqa: E402
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def sync_call(limit):
+    db = SessionLocal()
+    try:
+        flights = crud.get_flights(db, limit=limit)
+        # Touch the relationships the response model would serialize
+        for flight in flights:
+            flight.airline, flight.origin, flight.destination
+    finally:
+        db.close()
+
+
+async def async_call(limit):
+    async with AsyncSessionLocal() as db:
+        await crud_async.get_flights(db, limit=limit)
+
+
+async def run(label, call, requests, concurrency):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<6} c={concurrency:<4} {requests / elapsed:8.1f} req/s  "
+          f"p50={percentile(latencies, 50):7.1f}ms p95={percentile(latencies, 95):7.1f}ms "
+          f"p99={percentile(latencies, 99):7.1f}ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", default="10,50,100,200")
+    parser.add_argument("--limit", type=int, default=50, help="Flights per query")
+    parser.add_argument("--threads", type=int, default=40, help="Threadpool size for the sync path")
+    args = parser.parse_args()
+
+    limiter = anyio.CapacityLimiter(args.threads)
+
+    async def sync_path():
+        await anyio.to_thread.run_sync(sync_call, args.limit, limiter=limiter)
+
+    async def async_path():
+        await async_call(args.limit)
+
+    # Warm both pools
+    await sync_path()
+    await async_path()
+
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        await run("sync", sync_path, args.requests, concurrency)
+        await run("async", async_path, args.requests, concurrency)
+
+    engine.dispose()
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
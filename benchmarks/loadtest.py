@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+
+"""
+HTTP load test with a realistic traffic mix.
+
+Closed-loop virtual users, one thread and keep-alive connection each, drive a
+running app through airport autocomplete, flight search, flight detail, login,
+booking creation and cancellation, and dashboard statistics in weighted
+proportions. Concurrency ramps through the given stages. Each stage reports
+throughput and p50/p95/p99 latency per endpoint. The last line is the number
+to compare before and after a change: the final stage's throughput and p95.
+
+Expects a dataset from datagen.py (its accounts and shared password).
+
+    python datagen.py --flights 5000 --users 20000 --replace
+    python -m gunicorn -c gunicorn_conf.py main:app &
+    python benchmarks/loadtest.py --base-url http://127.0.0.1:8000 --stages 10:30,50:30,100:60
+"""
+
+import argparse
+import gzip
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen  # noqa: E402
+
+DEFAULT_MIX = "autocomplete=30,search=30,detail=18,login=3,book=8,cancel=6,stats=5"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class HTTPError(Exception):
+    pass
+
+
+class Session:
+    """One keep-alive connection, reopened after transport errors."""
+
+    def __init__(self, base_url, timeout):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.timeout = parts.hostname, parts.port or 80, timeout
+        self.connection = None
+        self.token = None
+
+    def request(self, method, path, params=None, body=None, token=None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {"Accept": "application/json", "Accept-Encoding": "gzip"}
+        token = token or self.token
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            self.connection.request(method, path, body=payload, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        if response.status >= 400:
+            raise HTTPError(f"{method} {path} -> {response.status}")
+        if response.getheader("Content-Encoding") == "gzip":
+            data = gzip.decompress(data)
+        return json.loads(data) if data else None
+
+    def login(self, email):
+        self.token = self.request("POST", "/auth/login", body={"email": email, "password": datagen.DATAGEN_PASSWORD})["access_token"]
+        return self.token
+
+
+def discover(args):
+    """Airports, bookable flights, customers and a manager token from the running app."""
+    session = Session(args.base_url, args.timeout)
+    admin_token = session.login(datagen.ACCOUNTS["admin"])
+    manager_token = session.login(datagen.ACCOUNTS["company_manager"])
+    manager = session.request("GET", "/auth/me")
+    session.token = None
+    airports = session.request("GET", "/airports/")
+    flights = session.request("GET", "/flights/", params={"limit": 2000, "fields": "id,departure_time,available_seats,origin,destination"})
+    customers = session.request("GET", "/users/query", token=admin_token, params={"role": "regular", "is_blocked": "false", "limit": 500})
+    # Far enough out that cancellations take the refund path
+    bookable = [
+        f for f in flights
+        if datetime.fromisoformat(f["departure_time"]) > datetime.utcnow() + timedelta(days=2) and f["available_seats"] > 20
+    ]
+    if not bookable or not customers["data"]:
+        sys.exit("No bookable flights or customers found; load a dataset with datagen.py first")
+    return {
+        "prefixes": sorted({a["city"][:n].lower() for a in airports for n in (2, 3)} | {a["code"][:2] for a in airports}),
+        "flights": flights,
+        "bookable": bookable,
+        "customers": [user["email"] for user in customers["data"]],
+        "manager_token": manager_token,
+        "airline_id": manager["airline_id"],
+    }
+
+
+# Each operation returns the name it is reported under
+def op_autocomplete(user):
+    user.session.request("GET", "/airports/search", params={"query": user.rng.choice(user.ctx["prefixes"])})
+    return "autocomplete"
+
+
+def op_search(user):
+    flight = user.rng.choice(user.ctx["flights"])
+    user.session.request("GET", "/flights/search", params={
+        "origin": flight["origin"]["code"],
+        "destination": flight["destination"]["code"],
+        "departure_date": flight["departure_time"][:10],
+        "passengers": user.rng.choice((1, 1, 2, 3)),
+    })
+    return "search"
+
+
+def op_detail(user):
+    user.session.request("GET", f"/flights/{quote(user.rng.choice(user.ctx['flights'])['id'])}")
+    return "detail"
+
+
+def op_login(user):
+    user.session.login(user.email)
+    return "login"
+
+
+def op_book(user):
+    flight = user.rng.choice(user.ctx["bookable"])
+    passengers = [
+        {"first_name": "Load", "last_name": f"Test{i}", "email": "loadtest@example.com", "date_of_birth": "1990-01-01"}
+        for i in range(user.rng.choice((1, 1, 2)))
+    ]
+    booking = user.session.request("POST", "/bookings/", body={"flight_id": flight["id"], "passengers": passengers})
+    user.bookings.append(booking["id"])
+    return "book"
+
+
+def op_cancel(user):
+    if not user.bookings:
+        return op_book(user)
+    user.session.request("POST", f"/bookings/{user.bookings.pop(0)}/cancel")
+    return "cancel"
+
+
+def op_stats(user):
+    user.session.request(
+        "GET", f"/statistics/company/{user.ctx['airline_id']}",
+        params={"period": "week"}, token=user.ctx["manager_token"],
+    )
+    return "stats"
+
+
+LABELS = {
+    "autocomplete": "GET /airports/search",
+    "search": "GET /flights/search",
+    "detail": "GET /flights/{id}",
+    "login": "POST /auth/login",
+    "book": "POST /bookings/",
+    "cancel": "POST /bookings/{id}/cancel",
+    "stats": "GET /statistics/company/{id}",
+}
+
+OPERATIONS = {
+    "autocomplete": op_autocomplete,
+    "search": op_search,
+    "detail": op_detail,
+    "login": op_login,
+    "book": op_book,
+    "cancel": op_cancel,
+    "stats": op_stats,
+}
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, index, args, ctx, mix, controller):
+        super().__init__(daemon=True)
+        self.index = index
+        self.args = args
+        self.ctx = ctx
+        self.controller = controller
+        self.rng = random.Random(args.seed + index)
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        self.email = ctx["customers"][index % len(ctx["customers"])]
+        self.session = Session(args.base_url, args.timeout)
+        self.bookings = []
+        # stage -> endpoint -> [latencies in ms, error count]; merged after the run, so no locking
+        self.results = {}
+
+    def run(self):
+        while not self.controller.done:
+            stage = self.controller.stage
+            if self.index >= self.controller.concurrency:
+                time.sleep(0.05)
+                continue
+            name = self.rng.choices(self.names, self.weights)[0]
+            start = time.perf_counter()
+            try:
+                if self.session.token is None:
+                    # Users log in when they join, outside the measurements
+                    self.session.login(self.email)
+                    start = time.perf_counter()
+                name = OPERATIONS[name](self)
+                error = False
+            except (HTTPError, OSError, http.client.HTTPException) as e:
+                error = True
+                if self.args.verbose:
+                    print(f"  user {self.index}: {e}")
+            elapsed = (time.perf_counter() - start) * 1000
+            # Requests that straddle a stage boundary are not counted
+            if stage == self.controller.stage:
+                entry = self.results.setdefault(stage, {}).setdefault(LABELS[name], [[], 0])
+                if error:
+                    entry[1] += 1
+                else:
+                    entry[0].append(elapsed)
+            if self.args.think_ms:
+                time.sleep(self.rng.expovariate(1000 / self.args.think_ms))
+
+
+class Controller:
+    def __init__(self):
+        self.concurrency = 0
+        self.stage = None
+        self.done = False
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_stages(value):
+    stages = []
+    for part in value.split(","):
+        concurrency, _, seconds = part.partition(":")
+        stages.append((int(concurrency), float(seconds)))
+    return stages
+
+
+def report(concurrency, duration, results):
+    total_latencies, total_errors = [], 0
+    print(f"\nstage c={concurrency} ({duration:.0f}s)")
+    print(f"  {'endpoint':<32} {'count':>7} {'errors':>6} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for label in sorted(results):
+        latencies, errors = results[label]
+        total_latencies.extend(latencies)
+        total_errors += errors
+        print(f"  {label:<32} {len(latencies):>7} {errors:>6} {len(latencies) / duration:>8.1f} "
+              f"{percentile(latencies, 50):>6.1f}ms {percentile(latencies, 95):>6.1f}ms {percentile(latencies, 99):>6.1f}ms")
+    throughput = len(total_latencies) / duration
+    print(f"  {'total':<32} {len(total_latencies):>7} {total_errors:>6} {throughput:>8.1f} "
+          f"{percentile(total_latencies, 50):>6.1f}ms {percentile(total_latencies, 95):>6.1f}ms {percentile(total_latencies, 99):>6.1f}ms")
+    return {
+        "concurrency": concurrency,
+        "throughput": round(throughput, 1),
+        "errors": total_errors,
+        "p50_ms": round(percentile(total_latencies, 50), 1),
+        "p95_ms": round(percentile(total_latencies, 95), 1),
+        "p99_ms": round(percentile(total_latencies, 99), 1),
+        "endpoints": {
+            label: {
+                "count": len(latencies),
+                "errors": errors,
+                "p50_ms": round(percentile(latencies, 50), 1),
+                "p95_ms": round(percentile(latencies, 95), 1),
+                "p99_ms": round(percentile(latencies, 99), 1),
+            }
+            for label, (latencies, errors) in results.items()
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--stages", type=parse_stages, default=parse_stages("10:20,25:20,50:30"),
+                        help="Comma-separated concurrency:seconds stages, run in order")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think-ms", type=float, default=0, help="Mean pause between a user's requests")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Print every failed request")
+    args = parser.parse_args()
+
+    ctx = discover(args)
+    controller = Controller()
+    users = [VirtualUser(i, args, ctx, args.mix, controller) for i in range(max(c for c, _ in args.stages))]
+    for user in users:
+        user.start()
+
+    durations = []
+    for index, (concurrency, seconds) in enumerate(args.stages):
+        controller.stage = index
+        controller.concurrency = concurrency
+        start = time.perf_counter()
+        time.sleep(seconds)
+        durations.append(time.perf_counter() - start)
+    controller.done = True
+    for user in users:
+        user.join(args.timeout)
+
+    summaries = []
+    for index, duration in enumerate(durations):
+        merged = {}
+        for user in users:
+            for label, (latencies, errors) in user.results.get(index, {}).items():
+                entry = merged.setdefault(label, [[], 0])
+                entry[0].extend(latencies)
+                entry[1] += errors
+        summaries.append(report(args.stages[index][0], duration, merged))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"mix": args.mix, "stages": summaries}, f, indent=2)
+    last = summaries[-1]
+    print(f"\nresult: {last['throughput']} req/s at c={last['concurrency']}, p95 {last['p95_ms']}ms, {last['errors']} errors")
+
+
+if __name__ == "__main__":
+    main()
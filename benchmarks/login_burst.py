@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+
+"""
+Login burst benchmark.
+
+Measures latency of a cheap endpoint while a burst of logins runs against a
+running server, to show that password hashing does not starve other requests.
+
+    python benchmarks/login_burst.py --base-url http://localhost:8000 \\
+        --email u@u.u --password u --logins 200 --concurrency 50
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def request(url, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, (time.perf_counter() - start) * 1000
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def probe(url, stop, samples, interval):
+    while not stop.is_set():
+        samples.append(request(url)[1])
+        time.sleep(interval)
+
+
+def summarize(label, samples):
+    print(f"{label:<22} n={len(samples):<5} p50={percentile(samples, 50):7.1f}ms "
+          f"p95={percentile(samples, 95):7.1f}ms p99={percentile(samples, 99):7.1f}ms "
+          f"mean={statistics.mean(samples) if samples else 0:7.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="u@u.u")
+    parser.add_argument("--password", default="u")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--probe-path", default="/airports/")
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    parser.add_argument("--baseline-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    probe_url = args.base_url + args.probe_path
+    login_url = args.base_url + "/auth/login"
+    credentials = {"email": args.email, "password": args.password}
+
+    # Baseline: probe latency with no login traffic
+    stop = threading.Event()
+    baseline = []
+    thread = threading.Thread(target=probe, args=(probe_url, stop, baseline, args.probe_interval))
+    thread.start()
+    time.sleep(args.baseline_seconds)
+    stop.set()
+    thread.join()
+
+    # Burst: the same probe while logins run concurrently
+    stop = threading.Event()
+    during = []
+    thread = threading.Thread(target=probe, args=(probe_url, stop, during, args.probe_interval))
+    thread.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(lambda _: request(login_url, credentials), range(args.logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+
+    failures = sum(1 for status, _ in results if status != 200)
+    login_latencies = [latency for _, latency in results]
+    print(f"logins: {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s), {failures} failed")
+    summarize("login", login_latencies)
+    summarize(f"{args.probe_path} baseline", baseline)
+    summarize(f"{args.probe_path} during burst", during)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+
+"""
+Query-count and latency regression suite.
+
+`generate` loads a datagen.py dataset into DATABASE_URL. `run` drives a
+running app through every router and reads the per-request X-DB-Query-Count
+header.
+The app must not run with APP_ENV=production, because that hides the header.
+Each endpoint's query count, the fewest any of its iterations issued, is
+checked against benchmarks/budgets.json. Its latency percentiles are compared
+with a recorded baseline.
+
+`run` exits non-zero when an endpoint issues more queries than its budget,
+has no budget, or its p95 regresses by more than the tolerance.
+
+Budgets were recorded against the default dataset. The suite also books
+seats, so regenerate with --replace before each run. Point DATABASE_URL at a
+dedicated database, because --replace deletes its rows.
+
+    export DATABASE_URL=postgresql://localhost/asmanga_perf
+    alembic upgrade head
+    python benchmarks/regression.py generate --replace
+    python -m uvicorn main:app --port 8000 &
+    python benchmarks/regression.py run --update-baseline   # on the base commit
+    python benchmarks/regression.py run                     # on the change
+"""
+
+import argparse
+import http.client
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import datagen  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BUDGETS_PATH = os.path.join(HERE, "budgets.json")
+BASELINE_PATH = os.path.join(HERE, "baseline.json")
+
+
+def generate(args):
+    # Monday of the current week, so every run lays out the same weekdays the same way
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    anchor = today - timedelta(days=today.weekday())
+    try:
+        counts = datagen.generate(flights=args.flights, users=args.users, seed=args.seed, anchor=anchor, replace=args.replace)
+    except RuntimeError as e:
+        sys.exit(str(e))
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class Client:
+    """Keep-alive HTTP client that records the query count of every response."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=600)
+        self.tokens = {}
+
+    def request(self, method, path, role=None, params=None, body=None):
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        headers = {"Accept": "application/json"}
+        if role is not None:
+            headers["Authorization"] = f"Bearer {self.tokens[role]}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers["Content-Type"] = "application/json"
+        start = time.perf_counter()
+        self.connection.request(method, path, body=payload, headers=headers)
+        response = self.connection.getresponse()
+        data = response.read()
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status >= 400:
+            raise RuntimeError(f"{method} {path} -> {response.status}: {data[:300]!r}")
+        queries = response.getheader("X-DB-Query-Count")
+        if queries is None:
+            raise RuntimeError("X-DB-Query-Count header missing; run the app with APP_ENV other than production")
+        return json.loads(data) if data else None, int(queries), elapsed
+
+    def login(self):
+        for role, email in datagen.ACCOUNTS.items():
+            token, _, _ = self.request("POST", "/auth/login", body={"email": email, "password": datagen.DATAGEN_PASSWORD})
+            self.tokens[role] = token["access_token"]
+
+
+def discover(client):
+    """Ids the endpoint cases need, read from the dataset through the API."""
+    me, _, _ = client.request("GET", "/auth/me", role="regular")
+    manager, _, _ = client.request("GET", "/auth/me", role="company_manager")
+    flights, _, _ = client.request("GET", "/flights/", params={"limit": 500})
+    soon = datetime.utcnow() + timedelta(days=2)
+    # Far enough out that cancellations take the refund path
+    flight = next(
+        f for f in flights
+        if datetime.fromisoformat(f["departure_time"]) > soon and f["available_seats"] >= 50
+    )
+    bookings, _, _ = client.request("GET", "/bookings/my-bookings", role="regular")
+    return {
+        "user_id": me["id"],
+        "airline_id": manager["airline_id"],
+        "flight": flight,
+        "confirmation_id": bookings[0]["confirmation_id"],
+        "created_bookings": [],
+        "created_flights": [],
+    }
+
+
+def new_flight(ctx):
+    flight = ctx["flight"]
+    departure = datetime.utcnow() + timedelta(days=120)
+    return {
+        "flight_number": "PERF1", "airline_id": ctx["airline_id"],
+        "origin_id": flight["origin_id"], "destination_id": flight["destination_id"],
+        "departure_time": departure.isoformat(), "arrival_time": (departure + timedelta(hours=3)).isoformat(),
+        "price": 199.0, "total_seats": 180,
+    }
+
+
+def create_booking(client, ctx):
+    result = client.request("POST", "/bookings/", role="regular", body={
+        "flight_id": ctx["flight"]["id"],
+        "passengers": [{"first_name": "Perf", "last_name": "Run", "email": "perf@example.com", "date_of_birth": "1990-01-01"}],
+    })
+    ctx["created_bookings"].append(result[0]["id"])
+    return result
+
+
+def create_flight(client, ctx):
+    result = client.request("POST", "/flights/", role="company_manager", body=new_flight(ctx))
+    ctx["created_flights"].append(result[0]["id"])
+    return result
+
+
+# name -> call(client, ctx); writes that consume earlier results run after them
+CASES = {
+    "auth.login": lambda c, ctx: c.request("POST", "/auth/login", body={"email": datagen.ACCOUNTS["regular"], "password": datagen.DATAGEN_PASSWORD}),
+    "auth.me": lambda c, ctx: c.request("GET", "/auth/me", role="regular"),
+    "flights.search": lambda c, ctx: c.request("GET", "/flights/search", params={
+        "origin": ctx["flight"]["origin"]["code"], "destination": ctx["flight"]["destination"]["code"],
+        "departure_date": ctx["flight"]["departure_time"][:10],
+    }),
+    "flights.list": lambda c, ctx: c.request("GET", "/flights/"),
+    "flights.list_included": lambda c, ctx: c.request("GET", "/flights/", params={"refs": "included"}),
+    "flights.detail": lambda c, ctx: c.request("GET", f"/flights/{ctx['flight']['id']}"),
+    "flights.company": lambda c, ctx: c.request("GET", f"/flights/company/{ctx['airline_id']}", role="company_manager"),
+    "flights.create": create_flight,
+    "flights.update": lambda c, ctx: c.request("PUT", f"/flights/{ctx['created_flights'][-1]}", role="company_manager", body={"price": 209.0}),
+    "flights.delete": lambda c, ctx: c.request("DELETE", f"/flights/{ctx['created_flights'].pop()}", role="company_manager"),
+    "bookings.create": create_booking,
+    "bookings.mine": lambda c, ctx: c.request("GET", "/bookings/my-bookings", role="regular"),
+    "bookings.confirmation": lambda c, ctx: c.request("GET", f"/bookings/confirmation/{ctx['confirmation_id']}"),
+    "bookings.company": lambda c, ctx: c.request("GET", f"/bookings/company/{ctx['airline_id']}", role="company_manager"),
+    "bookings.cancel": lambda c, ctx: c.request("POST", f"/bookings/{ctx['created_bookings'].pop()}/cancel", role="regular"),
+    "airports.list": lambda c, ctx: c.request("GET", "/airports/"),
+    "airports.search": lambda c, ctx: c.request("GET", "/airports/search", params={"query": "LO"}),
+    "airports.detail": lambda c, ctx: c.request("GET", f"/airports/{ctx['flight']['origin_id']}"),
+    "airlines.list": lambda c, ctx: c.request("GET", "/airlines/"),
+    "airlines.detail": lambda c, ctx: c.request("GET", f"/airlines/{ctx['airline_id']}"),
+    "users.list": lambda c, ctx: c.request("GET", "/users/", role="admin"),
+    "users.query": lambda c, ctx: c.request("GET", "/users/query", role="admin", params={"name_prefix": "mu", "count": "estimate"}),
+    "users.detail": lambda c, ctx: c.request("GET", f"/users/{ctx['user_id']}", role="admin"),
+    "users.managers": lambda c, ctx: c.request("GET", "/users/managers/company-managers", role="admin"),
+    "content.banners": lambda c, ctx: c.request("GET", "/content/banners"),
+    "content.offers": lambda c, ctx: c.request("GET", "/content/offers"),
+    "statistics.company": lambda c, ctx: c.request("GET", f"/statistics/company/{ctx['airline_id']}", role="company_manager"),
+    "statistics.admin": lambda c, ctx: c.request("GET", "/statistics/admin", role="admin"),
+}
+
+# Fewer samples for endpoints dominated by password hashing
+ITERATIONS = {"auth.login": 5}
+
+
+def load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def run(args):
+    client = Client(args.base_url)
+    client.login()
+    ctx = discover(client)
+    selected = [name for name in CASES if not args.only or any(name.startswith(prefix) for prefix in args.only)]
+
+    results = {}
+    for name in selected:
+        call = CASES[name]
+        iterations = ITERATIONS.get(name, args.iterations)
+        for _ in range(min(args.warmup, iterations // 3)):
+            call(client, ctx)
+        latencies, counts = [], []
+        for _ in range(iterations):
+            _, count, elapsed = call(client, ctx)
+            latencies.append(elapsed)
+            counts.append(count)
+        # Background work such as the revocation sync or a principal cache
+        # refill adds queries to whichever request triggers it; the fewest
+        # seen is the endpoint's own cost.
+        queries = min(counts)
+        results[name] = {
+            "queries": queries,
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+        }
+
+    if args.update_budgets:
+        budgets = load_json(BUDGETS_PATH)
+        budgets.update({name: result["queries"] for name, result in results.items()})
+        write_json(BUDGETS_PATH, budgets)
+    if args.update_baseline:
+        baseline = load_json(BASELINE_PATH)
+        baseline.update({name: {"p50_ms": r["p50_ms"], "p95_ms": r["p95_ms"]} for name, r in results.items()})
+        write_json(BASELINE_PATH, baseline)
+
+    budgets = load_json(BUDGETS_PATH)
+    baseline = load_json(BASELINE_PATH)
+    failures = []
+    print(f"{'endpoint':<24} {'queries':>8} {'budget':>7} {'p50':>9} {'p95':>9} {'base p95':>9}  status")
+    for name, result in results.items():
+        budget = budgets.get(name)
+        base = baseline.get(name, {}).get("p95_ms")
+        problems = []
+        if budget is None:
+            problems.append("no budget")
+        elif result["queries"] > budget:
+            problems.append(f"queries {result['queries']} > {budget}")
+        if base is not None and result["p95_ms"] > base * (1 + args.tolerance) + args.min_delta_ms:
+            problems.append(f"p95 +{(result['p95_ms'] / base - 1) * 100:.0f}%")
+        failures.extend(f"{name}: {problem}" for problem in problems)
+        print(f"{name:<24} {result['queries']:>8} {budget if budget is not None else '-':>7} "
+              f"{result['p50_ms']:>7.1f}ms {result['p95_ms']:>7.1f}ms "
+              f"{f'{base:.1f}ms' if base is not None else '-':>9}  {', '.join(problems) or 'ok'}")
+
+    if failures:
+        print(f"\n{len(failures)} regression(s):")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll endpoints within budget")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    gen = commands.add_parser("generate", help="Load a synthetic dataset into DATABASE_URL")
+    gen.add_argument("--flights", type=int, default=5000, help="About 57 bookings are generated per flight")
+    gen.add_argument("--users", type=int, default=20000)
+    gen.add_argument("--seed", type=int, default=42)
+    gen.add_argument("--replace", action="store_true", help="Delete existing users, flights and bookings first")
+
+    bench = commands.add_parser("run", help="Check query budgets and latency against the baseline")
+    bench.add_argument("--base-url", default="http://127.0.0.1:8000")
+    bench.add_argument("--iterations", type=int, default=30)
+    bench.add_argument("--warmup", type=int, default=3)
+    bench.add_argument("--tolerance", type=float, default=0.25, help="Allowed p95 increase over the baseline")
+    bench.add_argument("--min-delta-ms", type=float, default=2.0, help="Ignore p95 increases smaller than this")
+    bench.add_argument("--only", nargs="*", help="Endpoint name prefixes to run, e.g. flights bookings.create")
+    bench.add_argument("--update-baseline", action="store_true", help="Record these latencies as the baseline")
+    bench.add_argument("--update-budgets", action="store_true", help="Accept these query counts as the budgets")
+
+    args = parser.parse_args()
+    if args.command == "generate":
+        generate(args)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+"""
+Serialization benchmark for large flight lists.
+
+Builds N in-memory flight rows sharing a realistic number of airlines and
+airports (no database needed) and compares the default FastAPI path
+(from_attributes validation, then JSON encoding) with the direct row
+serializer used by the list endpoints. Exits non-zero if the outputs differ
+or the row serializer is not faster, so it can run as a CI check.
+
+    python benchmarks/serialization.py --rows 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import models  # noqa: E402
+import schemas  # noqa: E402
+import serializers  # noqa: E402
+
+
+def build_flights(rows, airlines_count=20, airports_count=100, seed=42):
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 1)
+    airlines = [
+        models.Airline(id=f"al{i}", name=f"Airline {i}", code=f"A{i}", logo=None,
+                       description="Carrier", is_active=True, manager_id=None,
+                       created_at=now, updated_at=now)
+        for i in range(airlines_count)
+    ]
+    airports = [
+        models.Airport(id=f"ap{i}", name=f"Airport {i}", code=f"P{i:02d}", city="City",
+                       country="Country", timezone="UTC")
+        for i in range(airports_count)
+    ]
+    flights = []
+    for i in range(rows):
+        airline = rng.choice(airlines)
+        origin, destination = rng.sample(airports, 2)
+        departure = now + timedelta(minutes=rng.randrange(0, 60 * 24 * 90))
+        duration = rng.randrange(45, 900)
+        total = rng.choice([120, 180, 220, 300])
+        flights.append(models.Flight(
+            id=f"f{i}", flight_number=f"{airline.code}{i}", airline_id=airline.id,
+            origin_id=origin.id, destination_id=destination.id,
+            departure_time=departure, arrival_time=departure + timedelta(minutes=duration),
+            duration=duration, price=round(rng.uniform(40, 900), 2),
+            available_seats=rng.randrange(0, total), total_seats=total, status="scheduled",
+            created_at=now, updated_at=now,
+            airline=airline, origin=origin, destination=destination,
+        ))
+    return flights
+
+
+def pydantic_path(flights):
+    adapter = TypeAdapter(List[schemas.Flight])
+    validated = adapter.validate_python(flights, from_attributes=True)
+    # The price quote is only set on search results
+    content = adapter.dump_python(validated, mode="json", exclude={"__all__": {"quote"}})
+    # Starlette's JSONResponse rendering
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def row_serializer_path(flights):
+    serializer = serializers.RowSerializer()
+    return serializers.list_response(None, [serializer.flight(flight) for flight in flights]).body
+
+
+def best_of(func, flights, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = func(flights)
+        timings.append(time.perf_counter() - start)
+    return min(timings), body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    flights = build_flights(args.rows)
+    baseline, baseline_body = best_of(pydantic_path, flights, args.repeat)
+    fast, fast_body = best_of(row_serializer_path, flights, args.repeat)
+
+    print(f"rows: {args.rows}, payload: {len(fast_body) / 1024:.0f} KiB")
+    print(f"validate + json    {baseline * 1000:8.1f}ms")
+    print(f"row serializer     {fast * 1000:8.1f}ms  ({baseline / fast:.1f}x)")
+
+    if json.loads(baseline_body) != json.loads(fast_body):
+        print("FAIL: row serializer output differs from the response schema output")
+        return 1
+    if fast >= baseline:
+        print("FAIL: row serializer is not faster than the default path")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
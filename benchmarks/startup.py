@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+"""
+Startup time benchmark.
+
+Measures, over several runs, how long it takes to import the app and how long
+a fresh uvicorn process takes to answer its first /health request.
+
+    python benchmarks/startup.py --runs 5
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_import():
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import main"], cwd=ROOT, check=True)
+    return time.perf_counter() - start
+
+
+def time_first_response(port, timeout):
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise RuntimeError("server did not become ready")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(label, samples):
+    print(f"{label:<22} min={min(samples) * 1000:8.1f}ms median={statistics.median(samples) * 1000:8.1f}ms "
+          f"max={max(samples) * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    report("import main", [time_import() for _ in range(args.runs)])
+    report("first /health", [time_first_response(args.port, args.timeout) for _ in range(args.runs)])
+
+
+if __name__ == "__main__":
+    main()
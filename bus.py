@@ -0,0 +1,239 @@
+# Change notifications between workers over PostgreSQL LISTEN/NOTIFY.
+#
+# Writes announce what they changed with publish(session, kind, items). The
+# message is sent with pg_notify inside the writing transaction, so other
+# workers only hear about committed changes, and this worker's handlers run
+# right after the commit. Each worker listens on one dedicated connection and
+# hands incoming messages to the handlers registered with subscribe(), skipping
+# the ones it sent itself. Kinds in use:
+#
+#   principals      token subjects (emails) whose cached principal is stale
+#   airlines        reference data to reload (no items)
+#   offers          offer snapshot to rebuild (no items)
+#   flights         live seat/status changes, see live.py
+#   revoked_tokens  [jti, exp] pairs
+#
+# Without PostgreSQL, or with BUS_ENABLED=false, messages are only dispatched
+# locally, which is all a single process needs. LISTEN needs a session-level
+# connection, so behind PgBouncer in transaction mode set BUS_DATABASE_URL to
+# the database directly.
+import json
+import logging
+import os
+import select
+import threading
+import uuid
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+import database
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BUS_ENABLED = os.getenv("BUS_ENABLED", "true").lower() == "true"
+BUS_DATABASE_URL = os.getenv("BUS_DATABASE_URL")
+BUS_CHANNEL = os.getenv("BUS_CHANNEL", "app_changes")
+BUS_RECONNECT_SECONDS = float(os.getenv("BUS_RECONNECT_SECONDS", "5"))
+
+# PostgreSQL rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+# With the app preloaded, workers fork from one master and share this value,
+# so each message is tagged with it and the worker's pid
+_INSTANCE = uuid.uuid4().hex[:12]
+
+_handlers = {}  # kind -> [(handler, reset)]
+
+
+def subscribe(kind: str, handler, reset=None):
+    """Call handler(items) for every message of this kind, local or remote.
+
+    `reset` is called instead when messages may have been missed, e.g. after
+    the listener reconnects; it should drop everything the handler guards.
+    """
+    _handlers.setdefault(kind, []).append((handler, reset))
+
+
+def dispatch(kind: str, items):
+    for handler, _ in _handlers.get(kind, ()):
+        try:
+            handler(items)
+        except Exception:
+            logger.exception("Bus handler for %s failed", kind)
+
+
+def reset_all():
+    for kind, handlers in _handlers.items():
+        for _, reset in handlers:
+            if reset is not None:
+                try:
+                    reset()
+                except Exception:
+                    logger.exception("Bus reset for %s failed", kind)
+
+
+def publish(session: Session, kind: str, items=()):
+    """Announce a change made in the session's current transaction.
+
+    Nothing is sent if the transaction rolls back.
+    """
+    session.info.setdefault("bus_messages", []).append((kind, list(items)))
+
+
+def process_id() -> str:
+    """Identifies this process's own messages when they come back from the server."""
+    return f"{_INSTANCE}.{os.getpid()}"
+
+
+def _sends_notifications(bind) -> bool:
+    return BUS_ENABLED and bind is not None and bind.dialect.name == "postgresql"
+
+
+def payloads(messages):
+    """JSON payloads carrying the messages, each below MAX_PAYLOAD_BYTES."""
+    origin = process_id()
+    batch, size = [], 0
+    for kind, items in messages:
+        # Split long item lists so a single message never exceeds the limit
+        chunks = [[]]
+        chunk_size = 0
+        for item in items:
+            item_size = len(json.dumps(item, separators=(",", ":"))) + 1
+            if chunks[-1] and chunk_size + item_size > MAX_PAYLOAD_BYTES - 200:
+                chunks.append([])
+                chunk_size = 0
+            chunks[-1].append(item)
+            chunk_size += item_size
+        for chunk in chunks:
+            message = [kind, chunk]
+            message_size = len(json.dumps(message, separators=(",", ":"))) + 1
+            if batch and size + message_size > MAX_PAYLOAD_BYTES - 50:
+                yield json.dumps({"o": origin, "m": batch}, separators=(",", ":"))
+                batch, size = [], 0
+            batch.append(message)
+            size += message_size
+    if batch:
+        yield json.dumps({"o": origin, "m": batch}, separators=(",", ":"))
+
+
+def _notify(connection, messages):
+    for payload in payloads(messages):
+        connection.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": BUS_CHANNEL, "payload": payload})
+
+
+def publish_now(kind: str, items=()):
+    """Announce an already committed change, e.g. one made through Core by the scheduler."""
+    items = list(items)
+    dispatch(kind, items)
+    if _sends_notifications(database.engine):
+        with database.engine.begin() as connection:
+            _notify(connection, [(kind, items)])
+
+
+@event.listens_for(Session, "before_commit")
+def _send_pending(session):
+    messages = session.info.get("bus_messages")
+    if messages and _sends_notifications(session.get_bind()):
+        _notify(session, messages)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_pending(session):
+    for kind, items in session.info.pop("bus_messages", None) or ():
+        dispatch(kind, items)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("bus_messages", None)
+
+
+class Listener:
+    """Receives other workers' messages on a dedicated connection and dispatches them."""
+
+    def __init__(self, url: str, channel: str):
+        self.url = url
+        self.channel = channel
+        self.connected = False
+        self._listened = False
+        self._engine = None
+        self._connection = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="bus-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _connect(self):
+        if self._engine is None:
+            self._engine = create_engine(self.url, poolclass=NullPool)
+        connection = self._engine.raw_connection()
+        driver_connection = connection.driver_connection
+        driver_connection.autocommit = True
+        with driver_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return connection
+
+    def receive(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Bus ignored a malformed message: %s", payload[:200])
+            return
+        if message.get("o") == process_id():
+            return
+        for kind, items in message.get("m", ()):
+            dispatch(kind, items)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._connection = self._connect()
+                if self._listened:
+                    # Messages sent while this worker was reconnecting are lost
+                    logger.info("Bus listener reconnected; resetting subscribed caches")
+                    reset_all()
+                self.connected = self._listened = True
+                driver_connection = self._connection.driver_connection
+                while not self._stop.is_set():
+                    if select.select([driver_connection], [], [], 1.0)[0]:
+                        driver_connection.poll()
+                        while driver_connection.notifies:
+                            self.receive(driver_connection.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning("Bus listener disconnected, retrying in %.0fs: %s", BUS_RECONNECT_SECONDS, e)
+                self._stop.wait(BUS_RECONNECT_SECONDS)
+            finally:
+                self.connected = False
+                if self._connection is not None:
+                    try:
+                        self._connection.close()
+                    except Exception:
+                        pass
+                    self._connection = None
+
+
+listener = Listener(BUS_DATABASE_URL or database.DATABASE_URL, BUS_CHANNEL)
+
+
+def start():
+    """Listen for other workers' messages when notifications are in use."""
+    if _sends_notifications(database.engine):
+        listener.start()
+
+
+def stop(timeout: float = None):
+    listener.stop(timeout)
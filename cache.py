@@ -0,0 +1,72 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+import bus
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_SIZE = int(os.getenv("PRINCIPAL_CACHE_MAX_SIZE", "10000"))
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "10"))
+
+
+class TTLCache:
+    """Bounded in-process cache whose entries expire after a fixed TTL.
+
+    Least recently used entries are evicted once max_size is reached.
+    """
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Authenticated principals keyed by token subject (email)
+principal_cache = TTLCache(PRINCIPAL_CACHE_MAX_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+
+
+def _forget_principals(emails):
+    for email in emails:
+        principal_cache.pop(email)
+
+
+bus.subscribe("principals", _forget_principals, reset=principal_cache.clear)
+
+# Token subjects that wrote recently and must read from the primary
+recent_writers = TTLCache(PRINCIPAL_CACHE_MAX_SIZE, READ_YOUR_WRITES_SECONDS)
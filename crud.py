@@ -1,8 +1,18 @@
+from sqlalchemy import Numeric, cast, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, aliased
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
+import bus
+import live
 import models
+import quotes
 import schemas
-from auth import get_password_hash, verify_password
+from auth import (
+    get_password_hash, verify_password, password_needs_rehash,
+    verify_password_async, get_password_hash_async, DUMMY_PASSWORD_HASH,
+)
 import uuid
 from datetime import datetime, timedelta
 
@@ -20,8 +30,64 @@ def get_users(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.User).offset(skip).limit(limit).all()
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filter_users(
+    query,
+    role: Optional[str] = None,
+    is_blocked: Optional[bool] = None,
+    airline_id: Optional[str] = None,
+    email_prefix: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+):
+    if role is not None:
+        query = query.filter(models.User.role == role)
+    if is_blocked is not None:
+        query = query.filter(models.User.is_blocked == is_blocked)
+    if airline_id is not None:
+        query = query.filter(models.User.airline_id == airline_id)
+    if email_prefix:
+        query = query.filter(models.User.email.like(_escape_like(email_prefix) + "%", escape="\\"))
+    if name_prefix:
+        pattern = _escape_like(name_prefix.lower()) + "%"
+        query = query.filter(
+            func.lower(models.User.first_name).like(pattern, escape="\\") |
+            func.lower(models.User.last_name).like(pattern, escape="\\")
+        )
+    return query
+
+
+def query_users(db: Session, after: Optional[str] = None, limit: Optional[int] = 100, **filters):
+    """Filter users in SQL, ordered by id for keyset pagination.
+
+    Pass the id of the last user of the previous page as ``after``;
+    ``limit=None`` returns every matching user.
+    """
+    query = _filter_users(db.query(models.User), **filters)
+    if after is not None:
+        query = query.filter(models.User.id > after)
+    query = query.order_by(models.User.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+def count_users(db: Session, estimate: bool = False, **filters):
+    """Count users matching the filters, exactly or from the planner's row estimate."""
+    query = _filter_users(db.query(models.User.id), **filters)
+    if estimate and db.bind.dialect.name == "postgresql":
+        sql = query.statement.compile(dialect=db.bind.dialect, compile_kwargs={"literal_binds": True})
+        # Straight to the driver: text() would read a ':name' inside a literal as a bind parameter
+        plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+        return int(plan[0]["Plan"]["Plan Rows"])
+    return query.count()
+
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = models.User(
         id=str(uuid.uuid4()),
         email=user.email,
@@ -40,8 +106,11 @@ def create_user(db: Session, user: schemas.UserCreate):
 def update_user(db: Session, user_id: str, user_update: schemas.UserUpdate):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
+        previous_email = db_user.email
         for field, value in user_update.dict(exclude_unset=True).items():
             setattr(db_user, field, value)
+        # Role, airline and block state are cached per token subject, on every worker
+        bus.publish(db, "principals", {previous_email, db_user.email})
         db.commit()
         db.refresh(db_user)
     return db_user
@@ -50,9 +119,34 @@ def update_user(db: Session, user_id: str, user_update: schemas.UserUpdate):
 def authenticate_user(db: Session, email: str, password: str):
     user = get_user_by_email(db, email)
     if not user:
+        verify_password(password, DUMMY_PASSWORD_HASH)
         return False
     if not verify_password(password, user.password):
         return False
+    if password_needs_rehash(user.password):
+        user.password = get_password_hash(password)
+        db.commit()
+        db.refresh(user)
+    return user
+
+
+async def authenticate_user_async(db: Session, email: str, password: str):
+    """Like authenticate_user, but hashing runs on the password hashing pool."""
+    user = await run_in_threadpool(get_user_by_email, db, email)
+    if not user:
+        await verify_password_async(password, DUMMY_PASSWORD_HASH)
+        return False
+    if not await verify_password_async(password, user.password):
+        return False
+    if password_needs_rehash(user.password):
+        # Upgrade legacy plain text rows and outdated cost factors transparently
+        user.password = await get_password_hash_async(password)
+
+        def commit_rehash():
+            db.commit()
+            db.refresh(user)
+
+        await run_in_threadpool(commit_rehash)
     return user
 
 
@@ -93,6 +187,7 @@ def create_airline(db: Session, airline: schemas.AirlineCreate):
         manager_id=airline.manager_id,
     )
     db.add(db_airline)
+    bus.publish(db, "airlines")
     db.commit()
     db.refresh(db_airline)
     return db_airline
@@ -103,6 +198,7 @@ def update_airline(db: Session, airline_id: str, airline_update: schemas.Airline
     if db_airline:
         for field, value in airline_update.dict(exclude_unset=True).items():
             setattr(db_airline, field, value)
+        bus.publish(db, "airlines")
         db.commit()
         db.refresh(db_airline)
     return db_airline
@@ -112,6 +208,7 @@ def delete_airline(db: Session, airline_id: str):
     db_airline = db.query(models.Airline).filter(models.Airline.id == airline_id).first()
     if db_airline:
         db.delete(db_airline)
+        bus.publish(db, "airlines")
         db.commit()
     return db_airline
 
@@ -129,19 +226,20 @@ def get_company_flights(db: Session, airline_id: str):
     return db.query(models.Flight).filter(models.Flight.airline_id == airline_id).all()
 
 
-def search_flights(db: Session, search_params: schemas.FlightSearchParams, filters: Optional[schemas.FlightFilters] = None):
+def flight_search_statement(search_params: schemas.FlightSearchParams, filters: Optional[schemas.FlightFilters] = None):
+    """Build the flight search SELECT, shared by the sync and async paths."""
     # Create aliases for airports table to avoid duplicate table name error
     origin_airport = aliased(models.Airport)
     destination_airport = aliased(models.Airport)
     
-    query = db.query(models.Flight).join(
+    stmt = select(models.Flight).join(
         origin_airport, models.Flight.origin_id == origin_airport.id
     ).join(
         destination_airport, models.Flight.destination_id == destination_airport.id
     )
     
     # Basic search filters
-    query = query.filter(
+    stmt = stmt.where(
         origin_airport.code == search_params.origin,
         destination_airport.code == search_params.destination,
         models.Flight.departure_time >= datetime.fromisoformat(search_params.departure_date)
@@ -150,15 +248,31 @@ def search_flights(db: Session, search_params: schemas.FlightSearchParams, filte
     # Apply additional filters if provided
     if filters:
         if filters.price_min is not None:
-            query = query.filter(models.Flight.price >= filters.price_min)
+            stmt = stmt.where(models.Flight.price >= filters.price_min)
         if filters.price_max is not None:
-            query = query.filter(models.Flight.price <= filters.price_max)
+            stmt = stmt.where(models.Flight.price <= filters.price_max)
         if filters.airlines:
-            query = query.filter(models.Flight.airline_id.in_(filters.airlines))
+            stmt = stmt.where(models.Flight.airline_id.in_(filters.airlines))
         if filters.max_duration:
-            query = query.filter(models.Flight.duration <= filters.max_duration)
+            stmt = stmt.where(models.Flight.duration <= filters.max_duration)
     
-    return query.all()
+    return stmt
+
+
+def search_flights(db: Session, search_params: schemas.FlightSearchParams, filters: Optional[schemas.FlightFilters] = None):
+    return db.execute(flight_search_statement(search_params, filters)).scalars().all()
+
+
+def _commit_flight(db: Session):
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        # PostgreSQL names the index, SQLite the indexed columns
+        message = str(e.orig)
+        if "ix_flights_airline_number_departure" in message or "flights.flight_number" in message:
+            raise ValueError("The airline already has a flight with this number departing at this time")
+        raise
 
 
 def create_flight(db: Session, flight: schemas.FlightCreate):
@@ -177,11 +291,12 @@ def create_flight(db: Session, flight: schemas.FlightCreate):
         arrival_time=flight.arrival_time,
         duration=duration,
         price=flight.price,
+        base_price=flight.price,
         available_seats=flight.total_seats,
         total_seats=flight.total_seats,
     )
     db.add(db_flight)
-    db.commit()
+    _commit_flight(db)
     db.refresh(db_flight)
     return db_flight
 
@@ -191,13 +306,18 @@ def update_flight(db: Session, flight_id: str, flight_update: schemas.FlightUpda
     if db_flight:
         for field, value in flight_update.dict(exclude_unset=True).items():
             setattr(db_flight, field, value)
+        # A fare set by hand becomes the base that dynamic pricing works from
+        if flight_update.price is not None:
+            db_flight.base_price = flight_update.price
         
         # Recalculate duration if times changed
         if flight_update.departure_time or flight_update.arrival_time:
             duration = int((db_flight.arrival_time - db_flight.departure_time).total_seconds() / 60)
             db_flight.duration = duration
         
-        db.commit()
+        if flight_update.status is not None:
+            live.publish_flight(db, db_flight, "status")
+        _commit_flight(db)
         db.refresh(db_flight)
     return db_flight
 
@@ -210,6 +330,251 @@ def delete_flight(db: Session, flight_id: str):
     return db_flight
 
 
+# Schedule import
+SCHEDULE_IMPORT_MAX_FLIGHTS = 50000
+SCHEDULE_IMPORT_MAX_DAYS = 400
+SCHEDULE_IMPORT_CHUNK_SIZE = 1000
+
+
+def _schedule_pattern_error(pattern: schemas.SchedulePattern, airport_ids: dict):
+    """Why a pattern cannot be imported, or None."""
+    if not pattern.flight_number.strip():
+        return "flight_number is empty"
+    if pattern.origin.upper() not in airport_ids:
+        return f"Unknown origin airport {pattern.origin}"
+    if pattern.destination.upper() not in airport_ids:
+        return f"Unknown destination airport {pattern.destination}"
+    if pattern.origin.upper() == pattern.destination.upper():
+        return "origin and destination are the same"
+    days = pattern.days_of_week.replace(".", "")
+    if not days or any(day not in "1234567" for day in days):
+        return "days_of_week must list days 1 (Monday) to 7 (Sunday), e.g. 135"
+    if pattern.end_date < pattern.start_date:
+        return "end_date is before start_date"
+    if (pattern.end_date - pattern.start_date).days > SCHEDULE_IMPORT_MAX_DAYS:
+        return f"Date range is longer than {SCHEDULE_IMPORT_MAX_DAYS} days"
+    if not 0 < pattern.duration <= 24 * 60:
+        return "duration must be between 1 and 1440 minutes"
+    if pattern.price <= 0:
+        return "price must be positive"
+    if pattern.total_seats <= 0:
+        return "total_seats must be positive"
+    return None
+
+
+def expand_schedule_pattern(pattern: schemas.SchedulePattern):
+    """Departure times of every operating day in the pattern's date range."""
+    weekdays = {int(day) - 1 for day in pattern.days_of_week.replace(".", "")}
+    day = pattern.start_date
+    departures = []
+    while day <= pattern.end_date:
+        if day.weekday() in weekdays:
+            departures.append(datetime.combine(day, pattern.departure_time))
+        day += timedelta(days=1)
+    return departures
+
+
+def _insert_new_flights(db: Session, flights: List[dict]):
+    """Insert flights, skipping departures that already exist; returns the ids inserted.
+
+    ix_flights_airline_number_departure is unique, so concurrent imports of the
+    same schedule cannot both insert a departure.
+    """
+    dialect = db.bind.dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        db.execute(insert(models.Flight), flights)
+        return {flight["id"] for flight in flights}
+    dialect_insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    statement = (
+        dialect_insert(models.Flight)
+        .on_conflict_do_nothing(index_elements=["airline_id", "flight_number", "departure_time"])
+        .returning(models.Flight.id)
+    )
+    return set(db.execute(statement, flights).scalars().all())
+
+
+def import_schedule(
+    db: Session,
+    airline_id: str,
+    patterns: List[schemas.SchedulePattern],
+    dry_run: bool = False,
+    row_numbers: Optional[List[int]] = None,
+    rows: Optional[List[schemas.ScheduleRowResult]] = None,
+):
+    """Expand recurring patterns and insert the resulting flights in one transaction.
+
+    Invalid patterns and departures that already exist for the airline are
+    skipped and reported per row; everything else is inserted. `row_numbers`
+    gives each pattern's row in the source (default 1..n) and `rows` carries
+    failures found before this call, e.g. unparseable CSV lines.
+    """
+    rows = list(rows or [])
+    if row_numbers is None:
+        row_numbers = list(range(1, len(patterns) + 1))
+    codes = {code.upper() for pattern in patterns for code in (pattern.origin, pattern.destination)}
+    airport_ids = dict(
+        db.execute(select(models.Airport.code, models.Airport.id).where(models.Airport.code.in_(codes))).all()
+    ) if codes else {}
+
+    # Expand every valid pattern, dropping repeats within the import itself
+    planned = []  # (row result, pattern, departures)
+    seen = set()
+    total = 0
+    for row_number, pattern in zip(row_numbers, patterns):
+        result = schemas.ScheduleRowResult(row=row_number, flight_number=pattern.flight_number)
+        rows.append(result)
+        result.error = _schedule_pattern_error(pattern, airport_ids)
+        if result.error:
+            continue
+        departures = []
+        for departure in expand_schedule_pattern(pattern):
+            key = (pattern.flight_number, departure)
+            if key in seen:
+                result.duplicates_skipped += 1
+            else:
+                seen.add(key)
+                departures.append(departure)
+        total += len(departures)
+        planned.append((result, pattern, departures))
+    if total > SCHEDULE_IMPORT_MAX_FLIGHTS:
+        raise ValueError(f"Schedule expands to {total} flights; import at most {SCHEDULE_IMPORT_MAX_FLIGHTS} at a time")
+
+    # Departures already scheduled, read through ix_flights_airline_number_departure
+    existing = set()
+    if seen:
+        numbers = sorted({number for number, _ in seen})
+        first_departure = min(departure for _, departure in seen)
+        last_departure = max(departure for _, departure in seen)
+        for start in range(0, len(numbers), SCHEDULE_IMPORT_CHUNK_SIZE):
+            existing.update(db.execute(
+                select(models.Flight.flight_number, models.Flight.departure_time).where(
+                    models.Flight.airline_id == airline_id,
+                    models.Flight.flight_number.in_(numbers[start:start + SCHEDULE_IMPORT_CHUNK_SIZE]),
+                    models.Flight.departure_time.between(first_departure, last_departure),
+                )
+            ).tuples().all())
+
+    flights = []  # (row result, values)
+    for result, pattern, departures in planned:
+        for departure in departures:
+            if (pattern.flight_number, departure) in existing:
+                result.duplicates_skipped += 1
+                continue
+            flights.append((result, {
+                "id": str(uuid.uuid4()),
+                "flight_number": pattern.flight_number,
+                "airline_id": airline_id,
+                "origin_id": airport_ids[pattern.origin.upper()],
+                "destination_id": airport_ids[pattern.destination.upper()],
+                "departure_time": departure,
+                "arrival_time": departure + timedelta(minutes=pattern.duration),
+                "duration": pattern.duration,
+                "price": pattern.price,
+                "base_price": pattern.price,
+                "available_seats": pattern.total_seats,
+                "total_seats": pattern.total_seats,
+            }))
+            result.flights_created += 1
+
+    created = len(flights)
+    if not dry_run and flights:
+        try:
+            inserted = set()
+            for start in range(0, len(flights), SCHEDULE_IMPORT_CHUNK_SIZE):
+                chunk = [values for _, values in flights[start:start + SCHEDULE_IMPORT_CHUNK_SIZE]]
+                inserted.update(_insert_new_flights(db, chunk))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        # Departures a concurrent import inserted after the read above
+        for result, values in flights:
+            if values["id"] not in inserted:
+                result.flights_created -= 1
+                result.duplicates_skipped += 1
+        created = len(inserted)
+
+    rows.sort(key=lambda row: row.row)
+    return schemas.ScheduleImportResult(
+        dry_run=dry_run,
+        flights_created=created,
+        duplicates_skipped=sum(row.duplicates_skipped for row in rows),
+        rows_failed=sum(1 for row in rows if row.error),
+        rows=rows,
+    )
+
+
+# Bulk flight updates
+def _bulk_flight_conditions(db: Session, flight_filter: schemas.FlightBulkFilter):
+    conditions = [models.Flight.airline_id == flight_filter.airline_id]
+    for code, column in ((flight_filter.origin, models.Flight.origin_id), (flight_filter.destination, models.Flight.destination_id)):
+        if code:
+            airport_id = db.execute(select(models.Airport.id).where(models.Airport.code == code.upper())).scalar()
+            if airport_id is None:
+                raise ValueError(f"Unknown airport {code}")
+            conditions.append(column == airport_id)
+    if flight_filter.flight_number:
+        conditions.append(models.Flight.flight_number == flight_filter.flight_number)
+    if flight_filter.departure_from:
+        conditions.append(models.Flight.departure_time >= flight_filter.departure_from)
+    if flight_filter.departure_to:
+        conditions.append(models.Flight.departure_time <= flight_filter.departure_to)
+    if flight_filter.status:
+        conditions.append(models.Flight.status.in_(flight_filter.status))
+    return conditions
+
+
+def bulk_update_flights(
+    db: Session,
+    flight_filter: schemas.FlightBulkFilter,
+    changes: schemas.FlightBulkChanges,
+    dry_run: bool = False,
+):
+    """Apply the changes to every matching flight in a single UPDATE statement.
+
+    No flight rows are loaded; the result reports the matched and updated
+    counts. With `dry_run` only the matching flights are counted.
+    """
+    values = {}
+    if changes.price_multiplier is not None:
+        if changes.price_multiplier <= 0:
+            raise ValueError("price_multiplier must be positive")
+        values["price"] = func.round(cast(models.Flight.price * changes.price_multiplier, Numeric), 2)
+        values["base_price"] = func.round(
+            cast(func.coalesce(models.Flight.base_price, models.Flight.price) * changes.price_multiplier, Numeric), 2
+        )
+    if changes.status is not None:
+        values["status"] = changes.status
+    if not values:
+        raise ValueError("No changes given")
+
+    conditions = _bulk_flight_conditions(db, flight_filter)
+    if dry_run:
+        matched = db.execute(select(func.count()).select_from(models.Flight).where(*conditions)).scalar()
+        return schemas.FlightBulkUpdateResult(dry_run=True, flights_matched=matched, flights_updated=0)
+
+    statement = update(models.Flight).where(*conditions).values(**values)
+    if changes.status is not None:
+        # Ids for live status events; the rows themselves are still not loaded
+        statement = statement.returning(models.Flight.id, models.Flight.origin_id, models.Flight.destination_id)
+    try:
+        result = db.execute(statement, execution_options={"synchronize_session": False})
+        if changes.status is None:
+            updated = result.rowcount
+        else:
+            changed = result.all()
+            updated = len(changed)
+            bus.publish(db, "flights", [
+                {"flight_id": flight_id, "origin_id": origin_id, "destination_id": destination_id, "status": changes.status}
+                for flight_id, origin_id, destination_id in changed
+            ])
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return schemas.FlightBulkUpdateResult(dry_run=False, flights_matched=updated, flights_updated=updated)
+
+
 # Booking CRUD operations
 def get_user_bookings(db: Session, user_id: str):
     return db.query(models.Booking).filter(models.Booking.user_id == user_id).all()
@@ -235,7 +600,9 @@ def create_booking(db: Session, booking: schemas.BookingCreate, user_id: str):
     
     # Create booking
     confirmation_id = f"ASM-2025-{str(uuid.uuid4())[:6].upper()}"
-    total_price = flight.price * len(booking.passengers)
+    # Same best-offer quote that search results show
+    quote = quotes.offer_cache.snapshot_sync(db).quote([flight.price])[0]
+    total_price = round(quote["price"] * len(booking.passengers), 2)
     
     db_booking = models.Booking(
         id=str(uuid.uuid4()),
@@ -257,6 +624,7 @@ def create_booking(db: Session, booking: schemas.BookingCreate, user_id: str):
     
     # Update flight availability
     flight.available_seats -= len(booking.passengers)
+    live.publish_flight(db, flight, "available_seats")
     
     db.commit()
     db.refresh(db_booking)
@@ -312,6 +680,7 @@ def create_offer(db: Session, offer: schemas.OfferCreate):
         **offer.dict()
     )
     db.add(db_offer)
+    bus.publish(db, "offers")
     db.commit()
     db.refresh(db_offer)
     return db_offer
@@ -322,6 +691,7 @@ def update_offer(db: Session, offer_id: str, offer_update: schemas.OfferUpdate):
     if db_offer:
         for field, value in offer_update.dict(exclude_unset=True).items():
             setattr(db_offer, field, value)
+        bus.publish(db, "offers")
         db.commit()
         db.refresh(db_offer)
     return db_offer
@@ -331,5 +701,6 @@ def delete_offer(db: Session, offer_id: str):
     db_offer = db.query(models.Offer).filter(models.Offer.id == offer_id).first()
     if db_offer:
         db.delete(db_offer)
+        bus.publish(db, "offers")
         db.commit()
     return db_offer
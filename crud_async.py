@@ -0,0 +1,167 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from typing import Optional
+import models
+import schemas
+from crud import flight_search_statement
+from datetime import datetime
+
+# Read-only queries for the async endpoints. Relationships cannot lazy load on
+# an AsyncSession, so everything a response_model touches is loaded eagerly.
+
+FLIGHT_RELATIONS = ("airline", "origin", "destination")
+FLIGHT_FOREIGN_KEYS = {"airline": "airline_id", "origin": "origin_id", "destination": "destination_id"}
+
+BOOKING_RELATIONS = ("user", "flight", "passengers")
+BOOKING_FOREIGN_KEYS = {"user": "user_id", "flight": "flight_id"}
+
+
+def flight_options(columns=None, relations=FLIGHT_RELATIONS, embed=True):
+    """Loader options for flights.
+
+    ``columns`` restricts the loaded columns (None loads all). Relations are
+    joined when embedded; otherwise only their foreign keys are loaded.
+    """
+    options = []
+    if columns is not None:
+        loaded = set(columns) | {FLIGHT_FOREIGN_KEYS[name] for name in relations}
+        options.append(load_only(*(getattr(models.Flight, column) for column in loaded)))
+    if embed:
+        options.extend(joinedload(getattr(models.Flight, name)) for name in relations)
+    return options
+
+
+def booking_options(columns=None, relations=BOOKING_RELATIONS, embed=True):
+    """Loader options for bookings; see flight_options.
+
+    Users and flights are loaded either way, since included responses list
+    them once; only an embedded flight needs its airline and airports.
+    """
+    options = []
+    if columns is not None:
+        loaded = set(columns) | {BOOKING_FOREIGN_KEYS[name] for name in relations if name in BOOKING_FOREIGN_KEYS}
+        options.append(load_only(*(getattr(models.Booking, column) for column in loaded)))
+    if "user" in relations:
+        options.append(joinedload(models.Booking.user))
+    if "flight" in relations:
+        if embed:
+            options.extend(
+                joinedload(models.Booking.flight).joinedload(getattr(models.Flight, name))
+                for name in FLIGHT_RELATIONS
+            )
+        else:
+            options.append(joinedload(models.Booking.flight))
+    if "passengers" in relations:
+        options.append(selectinload(models.Booking.passengers))
+    return options
+
+
+# Airport queries
+async def get_airports(db: AsyncSession):
+    result = await db.execute(select(models.Airport))
+    return result.scalars().all()
+
+
+async def get_airport(db: AsyncSession, airport_id: str):
+    result = await db.execute(select(models.Airport).where(models.Airport.id == airport_id))
+    return result.scalars().first()
+
+
+async def search_airports(db: AsyncSession, query: str):
+    result = await db.execute(select(models.Airport).where(
+        models.Airport.name.ilike(f"%{query}%") |
+        models.Airport.code.ilike(f"%{query}%") |
+        models.Airport.city.ilike(f"%{query}%")
+    ))
+    return result.scalars().all()
+
+
+# Airline queries
+async def get_airlines(db: AsyncSession):
+    result = await db.execute(select(models.Airline))
+    return result.scalars().all()
+
+
+async def get_airline(db: AsyncSession, airline_id: str):
+    result = await db.execute(select(models.Airline).where(models.Airline.id == airline_id))
+    return result.scalars().first()
+
+
+# Flight queries
+async def get_flights(db: AsyncSession, skip: int = 0, limit: int = 100, options=None):
+    result = await db.execute(
+        select(models.Flight).options(*(flight_options() if options is None else options)).offset(skip).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def get_flight(db: AsyncSession, flight_id: str):
+    result = await db.execute(
+        select(models.Flight).options(*flight_options()).where(models.Flight.id == flight_id)
+    )
+    return result.scalars().first()
+
+
+async def get_flight_states(db: AsyncSession, flight_ids):
+    """Live fields of the given flights, for the initial events of a live stream."""
+    result = await db.execute(
+        select(models.Flight.id, models.Flight.available_seats, models.Flight.status).where(models.Flight.id.in_(flight_ids))
+    )
+    return [{"flight_id": row.id, "available_seats": row.available_seats, "status": row.status} for row in result]
+
+
+async def get_company_flights(db: AsyncSession, airline_id: str, options=None):
+    result = await db.execute(
+        select(models.Flight).options(*(flight_options() if options is None else options)).where(models.Flight.airline_id == airline_id)
+    )
+    return result.scalars().all()
+
+
+async def search_flights(db: AsyncSession, search_params: schemas.FlightSearchParams, filters: Optional[schemas.FlightFilters] = None, options=None):
+    stmt = flight_search_statement(search_params, filters).options(*(flight_options() if options is None else options))
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+
+# Booking queries
+async def get_user_bookings(db: AsyncSession, user_id: str, options=None):
+    result = await db.execute(
+        select(models.Booking).options(*(booking_options() if options is None else options)).where(models.Booking.user_id == user_id)
+    )
+    return result.unique().scalars().all()
+
+
+async def get_booking_by_confirmation(db: AsyncSession, confirmation_id: str):
+    result = await db.execute(
+        select(models.Booking).options(*booking_options()).where(models.Booking.confirmation_id == confirmation_id)
+    )
+    return result.unique().scalars().first()
+
+
+async def get_company_bookings(db: AsyncSession, airline_id: str, skip: int = 0, limit: int = 100, options=None):
+    result = await db.execute(
+        select(models.Booking).options(*(booking_options() if options is None else options))
+        .join(models.Flight, models.Booking.flight_id == models.Flight.id)
+        .where(models.Flight.airline_id == airline_id)
+        .order_by(models.Booking.booked_at.desc(), models.Booking.id)
+        .offset(skip).limit(limit)
+    )
+    return result.unique().scalars().all()
+
+
+# Content queries
+async def get_banners(db: AsyncSession):
+    result = await db.execute(
+        select(models.Banner).where(models.Banner.is_active == True).order_by(models.Banner.order)
+    )
+    return result.scalars().all()
+
+
+async def get_offers(db: AsyncSession):
+    result = await db.execute(select(models.Offer).where(
+        models.Offer.is_active == True,
+        models.Offer.valid_from <= datetime.utcnow(),
+        models.Offer.valid_to >= datetime.utcnow()
+    ))
+    return result.scalars().all()
@@ -0,0 +1,426 @@
+# Synthetic dataset for load and regression testing.
+#
+# Unlike seed_data.py, which adds a handful of rows through the ORM, this
+# streams airports, airlines, users, flights, bookings and passengers straight
+# into the tables: COPY on PostgreSQL, executemany elsewhere. Output depends
+# only on --seed and --anchor: two runs produce the same rows, apart from the
+# salt in the shared password hash.
+#
+#     python datagen.py --flights 60000 --users 200000 --replace   # ~10M rows
+import argparse
+import io
+import math
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select, text, update
+from auth import get_password_hash
+from database import engine
+import models
+
+# Every generated account shares this password; hashing millions of distinct ones would dominate the load
+DATAGEN_PASSWORD = "perf-password"
+ACCOUNTS = {
+    "regular": "perf-user@example.com",
+    "company_manager": "perf-manager@example.com",
+    "admin": "perf-admin@example.com",
+}
+
+# code, name, city, country, timezone, latitude, longitude, annual passengers (millions)
+AIRPORTS = [
+    ("ATL", "Hartsfield-Jackson Atlanta International Airport", "Atlanta", "USA", "America/New_York", 33.64, -84.43, 104),
+    ("DFW", "Dallas/Fort Worth International Airport", "Dallas", "USA", "America/Chicago", 32.90, -97.04, 81),
+    ("DEN", "Denver International Airport", "Denver", "USA", "America/Denver", 39.86, -104.67, 78),
+    ("ORD", "O'Hare International Airport", "Chicago", "USA", "America/Chicago", 41.97, -87.91, 74),
+    ("LAX", "Los Angeles International Airport", "Los Angeles", "USA", "America/Los_Angeles", 33.94, -118.41, 75),
+    ("JFK", "John F. Kennedy International Airport", "New York", "USA", "America/New_York", 40.64, -73.78, 62),
+    ("SFO", "San Francisco International Airport", "San Francisco", "USA", "America/Los_Angeles", 37.62, -122.38, 50),
+    ("SEA", "Seattle-Tacoma International Airport", "Seattle", "USA", "America/Los_Angeles", 47.45, -122.31, 50),
+    ("MIA", "Miami International Airport", "Miami", "USA", "America/New_York", 25.79, -80.29, 52),
+    ("BOS", "Logan International Airport", "Boston", "USA", "America/New_York", 42.37, -71.01, 40),
+    ("YYZ", "Toronto Pearson International Airport", "Toronto", "Canada", "America/Toronto", 43.68, -79.63, 45),
+    ("MEX", "Mexico City International Airport", "Mexico City", "Mexico", "America/Mexico_City", 19.44, -99.07, 48),
+    ("GRU", "Sao Paulo/Guarulhos International Airport", "Sao Paulo", "Brazil", "America/Sao_Paulo", -23.43, -46.47, 41),
+    ("LHR", "London Heathrow Airport", "London", "UK", "Europe/London", 51.47, -0.45, 79),
+    ("CDG", "Charles de Gaulle Airport", "Paris", "France", "Europe/Paris", 49.01, 2.55, 67),
+    ("AMS", "Amsterdam Airport Schiphol", "Amsterdam", "Netherlands", "Europe/Amsterdam", 52.31, 4.76, 62),
+    ("FRA", "Frankfurt Airport", "Frankfurt", "Germany", "Europe/Berlin", 50.04, 8.56, 59),
+    ("MAD", "Adolfo Suarez Madrid-Barajas Airport", "Madrid", "Spain", "Europe/Madrid", 40.49, -3.57, 60),
+    ("IST", "Istanbul Airport", "Istanbul", "Turkey", "Europe/Istanbul", 41.26, 28.74, 76),
+    ("DXB", "Dubai International Airport", "Dubai", "UAE", "Asia/Dubai", 25.25, 55.36, 87),
+    ("DOH", "Hamad International Airport", "Doha", "Qatar", "Asia/Qatar", 25.27, 51.61, 46),
+    ("DEL", "Indira Gandhi International Airport", "Delhi", "India", "Asia/Kolkata", 28.56, 77.10, 72),
+    ("SIN", "Singapore Changi Airport", "Singapore", "Singapore", "Asia/Singapore", 1.36, 103.99, 59),
+    ("HKG", "Hong Kong International Airport", "Hong Kong", "China", "Asia/Hong_Kong", 22.31, 113.92, 40),
+    ("PEK", "Beijing Capital International Airport", "Beijing", "China", "Asia/Shanghai", 40.08, 116.58, 53),
+    ("ICN", "Incheon International Airport", "Seoul", "South Korea", "Asia/Seoul", 37.46, 126.44, 56),
+    ("HND", "Tokyo Haneda Airport", "Tokyo", "Japan", "Asia/Tokyo", 35.55, 139.78, 79),
+    ("SYD", "Sydney Kingsford Smith Airport", "Sydney", "Australia", "Australia/Sydney", -33.95, 151.18, 41),
+    ("JNB", "O. R. Tambo International Airport", "Johannesburg", "South Africa", "Africa/Johannesburg", -26.14, 28.25, 18),
+    ("TAS", "Tashkent International Airport", "Tashkent", "Uzbekistan", "Asia/Tashkent", 41.26, 69.28, 8),
+]
+
+# code, name, hubs, fare level
+AIRLINES = [
+    ("AA", "American Airlines", ("DFW", "ORD", "MIA"), 1.0),
+    ("DL", "Delta Air Lines", ("ATL", "JFK", "SEA"), 1.05),
+    ("UA", "United Airlines", ("ORD", "DEN", "SFO"), 1.0),
+    ("WN", "Southwest Airlines", ("DEN", "DFW"), 0.7),
+    ("AC", "Air Canada", ("YYZ",), 1.0),
+    ("BA", "British Airways", ("LHR",), 1.15),
+    ("AF", "Air France", ("CDG",), 1.1),
+    ("LH", "Lufthansa", ("FRA",), 1.1),
+    ("TK", "Turkish Airlines", ("IST",), 0.9),
+    ("EK", "Emirates", ("DXB",), 1.2),
+    ("QR", "Qatar Airways", ("DOH",), 1.2),
+    ("SQ", "Singapore Airlines", ("SIN",), 1.25),
+    ("NH", "All Nippon Airways", ("HND",), 1.15),
+    ("HY", "Uzbekistan Airways", ("TAS",), 0.8),
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+    "Ahmed", "Fatima", "Yuki", "Haruto", "Olga", "Dmitri", "Carlos", "Lucia", "Aisha", "Omar",
+    "Liam", "Emma", "Mei", "Wei", "Noah", "Sofia", "Aziz", "Dilnoza", "Priya", "Arjun",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Garcia", "Martinez", "Khan", "Tanaka", "Sato", "Ivanova", "Petrov",
+    "Brown", "Okafor", "Muller", "Schmidt", "Chen", "Wang", "Silva", "Santos", "Karimov", "Rakhimova",
+    "Dubois", "Rossi", "Kim", "Lee", "Patel", "Sharma", "Nguyen", "Cohen", "Novak", "Jensen",
+]
+
+# Share of departures in each part of the day: morning and evening banks dominate
+DEPARTURE_BANKS = ((6, 9, 0.35), (10, 14, 0.2), (15, 20, 0.35), (21, 23, 0.1))
+# Monday first; Fridays and Sundays are busiest
+WEEKDAY_WEIGHTS = (1.0, 0.85, 0.9, 1.0, 1.25, 0.8, 1.2)
+WEEKDAY_FARES = (1.0, 0.95, 0.95, 1.0, 1.15, 0.9, 1.12)
+# Passengers per booking
+PARTY_SIZES = ((1, 0.55), (2, 0.26), (3, 0.09), (4, 0.07), (5, 0.02), (6, 0.01))
+CANCELLATION_RATE = 0.04
+
+
+def distance_km(a, b):
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[5], a[6], b[5], b[6]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(h))
+
+
+def build_routes(rng):
+    """Hub-and-spoke networks, weighted by a gravity model of airport traffic and distance."""
+    by_code = {airport[0]: airport for airport in AIRPORTS}
+    routes = []
+    for airline_index, (code, _, hubs, fare_level) in enumerate(AIRLINES):
+        route_number = 100
+        for hub_code in hubs:
+            hub = by_code[hub_code]
+            candidates = [a for a in AIRPORTS if a[0] != hub_code]
+            weights = [a[7] * hub[7] / (1 + distance_km(hub, a) / 4000) for a in candidates]
+            destinations = set()
+            while len(destinations) < min(12, len(candidates)):
+                destinations.add(rng.choices(candidates, weights)[0][0])
+            for destination_code in sorted(destinations):
+                destination = by_code[destination_code]
+                distance = distance_km(hub, destination)
+                weight = hub[7] * destination[7] / (1 + distance / 4000)
+                for origin, target in ((hub, destination), (destination, hub)):
+                    routes.append({
+                        "airline": airline_index,
+                        "flight_number": f"{code}{route_number}",
+                        "origin": origin[0],
+                        "destination": target[0],
+                        "distance": distance,
+                        "fare_level": fare_level,
+                        "weight": weight,
+                    })
+                    route_number += 1
+    return routes
+
+
+def aircraft_seats(rng, distance):
+    if distance < 1500:
+        return rng.choice((150, 174, 180, 186))
+    if distance < 5000:
+        return rng.choice((180, 210, 240, 254))
+    return rng.choice((270, 300, 340, 396))
+
+
+def base_fare(rng, route, departure):
+    fare = (45 + 0.11 * route["distance"] ** 0.97) * route["fare_level"]
+    fare *= WEEKDAY_FARES[departure.weekday()] * rng.lognormvariate(0, 0.15)
+    return round(fare, 2)
+
+
+def cumulative(weights):
+    total, result = 0.0, []
+    for weight in weights:
+        total += weight
+        result.append(total)
+    return result
+
+
+BANK_WEIGHTS = cumulative(bank[2] for bank in DEPARTURE_BANKS)
+PARTY_WEIGHTS = cumulative(weight for _, weight in PARTY_SIZES)
+
+
+def departure_time(rng, day):
+    start, end, _ = rng.choices(DEPARTURE_BANKS, cum_weights=BANK_WEIGHTS)[0]
+    return day + timedelta(hours=rng.randint(start, end), minutes=5 * rng.randrange(12))
+
+
+class TableWriter:
+    """Buffers rows for one table and writes them in batches."""
+
+    def __init__(self, connection, model, columns):
+        self.connection = connection
+        self.table = model.__table__
+        self.columns = columns
+        self.rows = []
+        self.written = 0
+        # COPY needs the raw psycopg2 cursor; other drivers use executemany
+        self.copy = connection.dialect.name == "postgresql" and connection.dialect.driver == "psycopg2"
+
+    def add(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.copy:
+            buffer = io.StringIO()
+            buffer.writelines("\t".join(map(copy_value, row)) + "\n" for row in self.rows)
+            buffer.seek(0)
+            cursor = self.connection.connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY {self.table.name} ({', '.join(self.columns)}) FROM STDIN", buffer)
+            finally:
+                cursor.close()
+        else:
+            self.connection.execute(insert(self.table), [dict(zip(self.columns, row)) for row in self.rows])
+        self.written += len(self.rows)
+        self.rows = []
+
+
+def copy_value(value):
+    # Generated text never contains tabs, newlines or backslashes, so no escaping is needed
+    if value is None:
+        return "\\N"
+    if value is True:
+        return "t"
+    if value is False:
+        return "f"
+    if isinstance(value, datetime):
+        return value.isoformat(" ")
+    return str(value)
+
+
+def clear(connection):
+    """Delete the rows datagen owns; banners and offers are left alone."""
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("TRUNCATE passengers, bookings, flights, revoked_tokens, users, airlines, airports CASCADE"))
+        return
+    for model in (models.Passenger, models.Booking, models.Flight, models.RevokedToken):
+        connection.execute(delete(model))
+    connection.execute(update(models.Airline).values(manager_id=None))
+    for model in (models.User, models.Airline, models.Airport):
+        connection.execute(delete(model))
+
+
+def generate(flights=60000, users=200000, seed=42, anchor=None, days_back=60, days_ahead=120,
+             batch_size=20000, replace=False, log=print):
+    """Generate a dataset around `anchor` (default: today, UTC midnight) and return row counts."""
+    rng = random.Random(seed)
+    anchor = anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def new_id():
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    password = get_password_hash(DATAGEN_PASSWORD)
+    routes = build_routes(rng)
+    route_weights = cumulative(route["weight"] for route in routes)
+    days = [anchor + timedelta(days=offset) for offset in range(-days_back, days_ahead + 1)]
+    day_weights = cumulative(WEEKDAY_WEIGHTS[day.weekday()] for day in days)
+    party_sizes = [size for size, _ in PARTY_SIZES]
+
+    with engine.begin() as connection:
+        if connection.execute(select(models.User.id).limit(1)).first() is not None:
+            if not replace:
+                raise RuntimeError("Database already has data; pass replace=True (--replace) to delete it first")
+            clear(connection)
+
+        writers = {
+            "airports": TableWriter(connection, models.Airport, ("id", "code", "name", "city", "country", "timezone")),
+            "airlines": TableWriter(connection, models.Airline, ("id", "code", "name", "description", "is_active", "created_at", "updated_at")),
+            "users": TableWriter(connection, models.User, (
+                "id", "email", "password", "first_name", "last_name", "phone", "role", "airline_id",
+                "is_blocked", "created_at", "updated_at",
+            )),
+            "flights": TableWriter(connection, models.Flight, (
+                "id", "flight_number", "airline_id", "origin_id", "destination_id", "departure_time",
+                "arrival_time", "duration", "price", "base_price", "available_seats", "total_seats", "status",
+                "created_at", "updated_at",
+            )),
+            "bookings": TableWriter(connection, models.Booking, (
+                "id", "confirmation_id", "user_id", "flight_id", "total_price", "status", "payment_status", "booked_at",
+            )),
+            "passengers": TableWriter(connection, models.Passenger, (
+                "id", "booking_id", "first_name", "last_name", "email", "phone", "date_of_birth",
+                "passport_number", "nationality",
+            )),
+        }
+
+        def flush():
+            # Parents before children, so foreign keys always resolve
+            for writer in writers.values():
+                writer.flush()
+
+        airport_ids = {}
+        for code, name, city, country, timezone, *_ in AIRPORTS:
+            airport_ids[code] = new_id()
+            writers["airports"].add((airport_ids[code], code, name, city, country, timezone))
+        airline_ids = []
+        for code, name, _, _ in AIRLINES:
+            airline_ids.append(new_id())
+            writers["airlines"].add((airline_ids[-1], code, name, f"{name} ({code})", True, anchor - timedelta(days=730), anchor))
+
+        def add_user(email, first_name, last_name, role="regular", airline_id=None, is_blocked=False):
+            user_id = new_id()
+            created_at = anchor - timedelta(days=rng.uniform(1, 730))
+            phone = f"+1{rng.randrange(10 ** 9, 10 ** 10)}"
+            writers["users"].add((user_id, email, password, first_name, last_name, phone, role, airline_id, is_blocked, created_at, created_at))
+            return user_id
+
+        account_ids = {role: add_user(email, "Perf", role.replace("_", " ").title(), role,
+                                      airline_ids[0] if role == "company_manager" else None)
+                       for role, email in ACCOUNTS.items()}
+        managers = {airline_ids[0]: account_ids["company_manager"]}
+        for airline_id, (code, _, _, _) in zip(airline_ids[1:], AIRLINES[1:]):
+            managers[airline_id] = add_user(f"manager-{code.lower()}@example.com", code, "Manager", "company_manager", airline_id)
+        customer_ids = []
+        for n in range(users):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            email = f"{first_name}.{last_name}.{n}@example.com".lower()
+            customer_ids.append(add_user(email, first_name, last_name, is_blocked=rng.random() < 0.005))
+        flush()
+        for airline_id, manager_id in managers.items():
+            connection.execute(update(models.Airline).where(models.Airline.id == airline_id).values(manager_id=manager_id))
+
+        booking_count = 0
+        flushes = 0
+        departures = set()
+        for _ in range(flights):
+            route = rng.choices(routes, cum_weights=route_weights)[0]
+            departure = departure_time(rng, rng.choices(days, cum_weights=day_weights)[0])
+            while (route["flight_number"], departure) in departures:
+                # A flight number departs at most once per slot, see ix_flights_airline_number_departure
+                departure = departure_time(rng, rng.choices(days, cum_weights=day_weights)[0])
+            departures.add((route["flight_number"], departure))
+            duration = 5 * round((40 + route["distance"] / 13.5) / 5)
+            arrival = departure + timedelta(minutes=duration)
+            total_seats = aircraft_seats(rng, route["distance"])
+            price = base_fare(rng, route, departure)
+            flight_id = new_id()
+
+            if rng.random() < 0.01:
+                status = "cancelled"
+            elif arrival <= anchor:
+                status = "arrived"
+            elif departure <= anchor:
+                status = "departed"
+            else:
+                status = "scheduled"
+
+            # Final load factor, and the share of it already booked by the anchor date
+            days_out = (departure - anchor).total_seconds() / 86400
+            load = min(1.0, rng.betavariate(8, 2.2))
+            booked_share = 1.0 if days_out <= 0 else math.exp(-days_out / 35)
+            target = 0 if status == "cancelled" else int(total_seats * load * booked_share)
+
+            seats_sold = 0
+            while seats_sold < target:
+                party = min(rng.choices(party_sizes, cum_weights=PARTY_WEIGHTS)[0], total_seats - seats_sold)
+                lead_days = rng.expovariate(1 / 28) + max(days_out, 0) + 0.05
+                booked_at = departure - timedelta(days=min(lead_days, 330))
+                cancelled = rng.random() < CANCELLATION_RATE
+                if not cancelled:
+                    seats_sold += party
+                # Frequent flyers: a small share of customers makes most bookings
+                user_id = customer_ids[int(len(customer_ids) * rng.random() ** 3)] if customer_ids else account_ids["regular"]
+                if booking_count % 500 == 0:
+                    # The perf account always has bookings to list and cancel
+                    user_id = account_ids["regular"]
+                booking_id = new_id()
+                writers["bookings"].add((
+                    booking_id,
+                    f"ASM-{booked_at.year}-{booking_count:08X}",
+                    user_id,
+                    flight_id,
+                    round(price * party, 2),
+                    "cancelled" if cancelled else ("completed" if status == "arrived" else "confirmed"),
+                    "refunded" if cancelled else "paid",
+                    booked_at,
+                ))
+                booking_count += 1
+                for _ in range(party):
+                    first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                    writers["passengers"].add((
+                        new_id(), booking_id, first_name, last_name,
+                        f"{first_name}.{last_name}.{rng.randrange(10 ** 6)}@example.com".lower(),
+                        None,
+                        f"{rng.randint(1940, 2020)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+                        f"P{rng.randrange(10 ** 7, 10 ** 8)}",
+                        rng.choice(AIRPORTS)[3],
+                    ))
+
+            created_at = min(departure, anchor) - timedelta(days=rng.uniform(30, 200))
+            writers["flights"].add((
+                flight_id, route["flight_number"], airline_ids[route["airline"]], airport_ids[route["origin"]],
+                airport_ids[route["destination"]], departure, arrival, duration, price, price,
+                total_seats - seats_sold, total_seats, status, created_at, created_at,
+            ))
+            # Flights go out first on every flush, so the flight is written before its bookings
+            if len(writers["passengers"].rows) >= batch_size:
+                flush()
+                flushes += 1
+                if flushes % 10 == 0:
+                    log(f"  {writers['flights'].written} flights, {writers['bookings'].written} bookings, "
+                        f"{writers['passengers'].written} passengers")
+        flush()
+
+        if connection.dialect.name == "postgresql":
+            # Fresh statistics for the planner and for estimated counts
+            connection.execute(text("ANALYZE"))
+
+    return {name: writer.written for name, writer in writers.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load a deterministic synthetic dataset into DATABASE_URL")
+    parser.add_argument("--flights", type=int, default=60000, help="Flights to generate; bookings and passengers scale with load factors")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--anchor", type=datetime.fromisoformat, help="Date the data is centred on (default: today)")
+    parser.add_argument("--days-back", type=int, default=60, help="Days of past flights")
+    parser.add_argument("--days-ahead", type=int, default=120, help="Days of future flights")
+    parser.add_argument("--batch-size", type=int, default=20000, help="Rows per COPY or executemany batch")
+    parser.add_argument("--replace", action="store_true", help="Delete existing users, flights and bookings first")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        counts = generate(
+            flights=args.flights, users=args.users, seed=args.seed, anchor=args.anchor,
+            days_back=args.days_back, days_ahead=args.days_ahead, batch_size=args.batch_size,
+            replace=args.replace,
+        )
+    except RuntimeError as e:
+        sys.exit(str(e))
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    print(", ".join(f"{count} {name}" for name, count in counts.items()))
+    print(f"{rows} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,81 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import HTTPBearer
+from jose import JWTError, jwt
+import hashlib
+import hmac
+import time
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+import database
 from database import get_db
-from auth import verify_token
+from auth import SECRET_KEY, verify_token
+from cache import READ_YOUR_WRITES_SECONDS, principal_cache, recent_writers
 import models
+import schemas
 
 security = HTTPBearer()
 
+# Carries a caller's recent write between workers: set as a cookie and exposed
+# as a response header, and accepted back from either
+READ_YOUR_WRITES_COOKIE = "read_your_writes"
+READ_YOUR_WRITES_HEADER = "X-Read-Your-Writes"
 
-def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)):
-    """Get current authenticated user."""
+
+def resolve_principal(db: Session, email: str):
+    """Resolve a token subject to a principal, served from the principal cache when possible."""
+    principal = principal_cache.get(email)
+    if principal is None:
+        row = db.query(
+            models.User.id,
+            models.User.email,
+            models.User.role,
+            models.User.airline_id,
+            models.User.is_blocked,
+        ).filter(models.User.email == email).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
+        principal = schemas.Principal(
+            id=row.id,
+            email=row.email,
+            role=row.role,
+            airline_id=row.airline_id,
+            is_blocked=bool(row.is_blocked),
+        )
+        principal_cache.set(email, principal)
+
+    if principal.is_blocked:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is blocked",
+        )
+
+    return principal
+
+
+def get_current_principal(token: str = Depends(security), db: Session = Depends(get_db)):
+    """Get the authenticated principal without loading the full user row."""
     payload = verify_token(token.credentials)
-    email = payload.get("sub")
-    
-    user = db.query(models.User).filter(models.User.email == email).first()
+    return resolve_principal(db, payload.get("sub"))
+
+
+def get_current_user(principal: schemas.Principal = Depends(get_current_principal), db: Session = Depends(get_db)):
+    """Get current authenticated user."""
+    user = db.query(models.User).filter(models.User.id == principal.id).first()
     if user is None:
+        principal_cache.pop(principal.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found",
         )
-    
-    if user.is_blocked:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="User is blocked",
-        )
-    
+
     return user
 
 
-def require_admin(current_user: models.User = Depends(get_current_user)):
+def require_admin(current_user: schemas.Principal = Depends(get_current_principal)):
     """Require admin role."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -39,7 +85,7 @@ def require_admin(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 
-def require_company_manager(current_user: models.User = Depends(get_current_user)):
+def require_company_manager(current_user: schemas.Principal = Depends(get_current_principal)):
     """Require company manager role."""
     if current_user.role != "company_manager":
         raise HTTPException(
@@ -49,7 +95,7 @@ def require_company_manager(current_user: models.User = Depends(get_current_user
     return current_user
 
 
-def require_company_manager_or_admin(current_user: models.User = Depends(get_current_user)):
+def require_company_manager_or_admin(current_user: schemas.Principal = Depends(get_current_principal)):
     """Require company manager or admin role."""
     if current_user.role not in ["company_manager", "admin"]:
         raise HTTPException(
@@ -57,3 +103,112 @@ def require_company_manager_or_admin(current_user: models.User = Depends(get_cur
             detail="Company manager or admin access required",
         )
     return current_user
+
+
+def request_subject(request: Request):
+    """Token subject of a request, for routing decisions only (not authentication)."""
+    authorization = request.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return jwt.get_unverified_claims(token).get("sub")
+    except JWTError:
+        return None
+
+
+def _read_your_writes_signature(subject: str, until: int) -> str:
+    message = f"{subject}:{until}".encode()
+    return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()[:32]
+
+
+def read_your_writes_token(subject: str, until: int) -> str:
+    """Signed marker that the subject's reads go to the primary until `until` (epoch seconds)."""
+    return f"{until}.{_read_your_writes_signature(subject, until)}"
+
+
+def _pinned_by_client(request: Request, subject: str) -> bool:
+    marker = request.headers.get(READ_YOUR_WRITES_HEADER) or request.cookies.get(READ_YOUR_WRITES_COOKIE)
+    if not marker:
+        return False
+    until, _, signature = marker.partition(".")
+    try:
+        until = int(until)
+    except ValueError:
+        return False
+    if until < time.time():
+        return False
+    return hmac.compare_digest(signature, _read_your_writes_signature(subject, until))
+
+
+def mark_recent_writer(request: Request, response_headers: MutableHeaders):
+    """Pin the caller's reads to the primary for READ_YOUR_WRITES_SECONDS, on every worker."""
+    subject = request_subject(request)
+    if subject is None:
+        return
+    recent_writers.set(subject, True)
+    # The next read usually lands on another worker, so the client carries the pin
+    max_age = int(READ_YOUR_WRITES_SECONDS) + 1
+    marker = read_your_writes_token(subject, int(time.time()) + max_age)
+    response_headers[READ_YOUR_WRITES_HEADER] = marker
+    response_headers.append(
+        "set-cookie",
+        f"{READ_YOUR_WRITES_COOKIE}={marker}; HttpOnly; Max-Age={max_age}; Path=/; SameSite=none; Secure",
+    )
+
+
+class ReadYourWritesMiddleware:
+    """Successful writes pin the caller's subsequent reads to the primary."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] in ("GET", "HEAD", "OPTIONS"):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_marked(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                mark_recent_writer(Request(scope), MutableHeaders(scope=message))
+            await send(message)
+
+        await self.app(scope, receive, send_marked)
+
+
+def use_replica(request: Request) -> bool:
+    if not database.replica_monitor.is_available():
+        return False
+    subject = request_subject(request)
+    if subject is None:
+        return True
+    return recent_writers.get(subject) is None and not _pinned_by_client(request, subject)
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: the replica when healthy, else the primary."""
+    if not use_replica(request):
+        yield from get_db()
+        return
+    db = database.ReplicaSessionLocal()
+    try:
+        yield db
+    except DBAPIError:
+        database.replica_monitor.mark_unhealthy()
+        raise
+    finally:
+        db.close()
+
+
+async def get_async_read_db(request: Request):
+    """Async session for read-only endpoints: the replica when healthy, else the primary."""
+    session_factory = database.AsyncSessionLocal
+    if use_replica(request):
+        session_factory = database.AsyncReplicaSessionLocal
+    async with session_factory() as db:
+        try:
+            yield db
+        except DBAPIError:
+            if session_factory is database.AsyncReplicaSessionLocal:
+                database.replica_monitor.mark_unhealthy()
+            raise
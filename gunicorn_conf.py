@@ -0,0 +1,91 @@
+"""
+Gunicorn configuration for production.
+
+Runs uvicorn workers (uvloop + httptools), one per available core by default,
+with the app preloaded in the master before forking. Database pools are sized
+per worker so that all workers together stay under DB_MAX_CONNECTIONS.
+"""
+
+import os
+from dotenv import load_dotenv
+from uvicorn.workers import UvicornWorker
+
+load_dotenv()
+
+
+def available_cores() -> int:
+    # Respect CPU affinity / container limits where the platform exposes them
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+workers = int(os.getenv("WEB_CONCURRENCY", str(available_cores())))
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+worker_class = "gunicorn_conf.ProductionUvicornWorker"
+preload_app = True
+
+# Recycle workers after a number of requests to bound memory growth; the
+# jitter keeps workers from restarting all at once
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.getenv("WEB_MAX_REQUESTS_JITTER", "1000"))
+
+# On shutdown or recycle, workers stop accepting connections and get this long
+# to finish in-flight requests (bookings included) before being killed
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WEB_TIMEOUT", "60"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+loglevel = os.getenv("WEB_LOG_LEVEL", "info")
+
+
+# Per-worker pool sizing. Each worker owns a sync and an async engine, so a
+# worker's connection budget is split between them.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+DB_RESERVED_CONNECTIONS = int(os.getenv("DB_RESERVED_CONNECTIONS", "10"))
+
+# Connections opened outside the pools: every worker listens for bus messages
+# and tries for the scheduler's advisory lock on connections of their own, and
+# with SCHEDULER_DATABASE_URL the leader runs its jobs on one more (see bus.py
+# and scheduler.py)
+BUS_ENABLED = os.getenv("BUS_ENABLED", "true").lower() == "true"
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+unpooled_per_worker = (1 if BUS_ENABLED else 0) + (1 if SCHEDULER_ENABLED else 0)
+unpooled_per_cluster = 1 if SCHEDULER_ENABLED and os.getenv("SCHEDULER_DATABASE_URL") else 0
+
+worker_budget = max(
+    2,
+    (DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS - unpooled_per_cluster) // workers - unpooled_per_worker,
+)
+engine_budget = max(1, worker_budget // 2)
+# Must be set before the app is preloaded, since database.py reads them at import
+os.environ.setdefault("DB_POOL_SIZE", str(max(1, engine_budget // 2)))
+os.environ.setdefault("DB_MAX_OVERFLOW", str(max(0, engine_budget - int(os.environ["DB_POOL_SIZE"]))))
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+        "timeout_graceful_shutdown": graceful_timeout,
+    }
+
+
+def post_fork(server, worker):
+    # Connections opened in the master while preloading must not be shared
+    import database
+    database.engine.dispose(close=False)
+    database.async_engine.sync_engine.dispose(close=False)
+    if database.replica_engine is not None:
+        database.replica_engine.dispose(close=False)
+        database.async_replica_engine.sync_engine.dispose(close=False)
+
+
+def on_starting(server):
+    server.log.info(
+        "Starting %d workers; per-engine pool %s + %s overflow",
+        workers, os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"],
+    )
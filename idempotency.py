@@ -0,0 +1,270 @@
+# Idempotency-Key support for write requests.
+#
+# A client that retries a write after a timeout sends the same Idempotency-Key
+# header again. The first request claims the key with an in-progress row in
+# idempotency_keys and runs; its response is stored on the row. Retries with
+# the same key and body get the stored response back without running the
+# endpoint again, and retries arriving while the first request still runs
+# wait for it. Keys are scoped to the authenticated token subject, so requests
+# without a valid access token of an active user are not deduplicated.
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from auth import verify_token
+from dependencies import resolve_principal
+import database
+import models
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_KEY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+# How long a duplicate waits for the in-flight request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "30"))
+# An in-progress claim older than this belongs to a worker that died; a retry takes it over
+IDEMPOTENCY_LOCK_SECONDS = float(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "300"))
+IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "1000"))
+
+MAX_KEY_LENGTH = 255
+IDEMPOTENT_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+# Responses a retry should not get back: server errors, and answers that depend
+# on the token or the request rate rather than on the request itself
+RETRYABLE_STATUSES = (401, 408, 429)
+
+
+def request_fingerprint(method: str, path: str, query_string: bytes, body: bytes) -> str:
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query_string, body):
+        digest.update(part)
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def verified_subject(headers: Headers):
+    """Subject of an access token that get_current_principal would accept, or None.
+
+    Checks revocation and blocked users as well as the signature, so a token
+    that was logged out or belongs to a blocked user gets no stored responses.
+    """
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        payload = verify_token(token)
+        db = database.SessionLocal()
+        try:
+            return resolve_principal(db, payload.get("sub")).email
+        finally:
+            db.close()
+    except HTTPException:
+        return None
+
+
+# Returned by _claim when the key was released between the insert and the read
+_RETRY = object()
+
+
+def _key_filter(subject: str, key: str):
+    return (models.IdempotencyKey.subject == subject, models.IdempotencyKey.key == key)
+
+
+async def _claim(subject: str, key: str, fingerprint: str):
+    """Claim the key for this request; returns None when claimed, otherwise the existing row."""
+    now = datetime.utcnow()
+    try:
+        async with database.async_engine.begin() as connection:
+            await connection.execute(insert(models.IdempotencyKey).values(
+                subject=subject,
+                key=key,
+                fingerprint=fingerprint,
+                locked_at=now,
+                created_at=now,
+                expires_at=now + timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS),
+            ))
+        return None
+    except IntegrityError:
+        pass
+    async with database.async_engine.begin() as connection:
+        row = (await connection.execute(
+            select(
+                models.IdempotencyKey.fingerprint,
+                models.IdempotencyKey.locked_at,
+                models.IdempotencyKey.response_status,
+                models.IdempotencyKey.response_headers,
+                models.IdempotencyKey.response_body,
+            ).where(*_key_filter(subject, key))
+        )).first()
+        if row is None:
+            # Released by a failed first request in the meantime
+            return _RETRY
+        if row.response_status is not None or row.fingerprint != fingerprint:
+            return row
+        if row.locked_at <= now - timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS):
+            taken = await connection.execute(
+                update(models.IdempotencyKey)
+                .where(*_key_filter(subject, key), models.IdempotencyKey.locked_at == row.locked_at)
+                .values(locked_at=now)
+            )
+            if taken.rowcount:
+                return None
+        return row
+
+
+async def _store(subject: str, key: str, status: int, headers, body: bytes):
+    async with database.async_engine.begin() as connection:
+        await connection.execute(
+            update(models.IdempotencyKey)
+            .where(*_key_filter(subject, key))
+            .values(
+                locked_at=None,
+                response_status=status,
+                response_headers=json.dumps(headers),
+                response_body=body,
+            )
+        )
+
+
+async def _release(subject: str, key: str):
+    """Drop the claim so that a retry runs the request again."""
+    async with database.async_engine.begin() as connection:
+        await connection.execute(delete(models.IdempotencyKey).where(*_key_filter(subject, key)))
+
+
+def _error(status_code: int, detail: str) -> JSONResponse:
+    return JSONResponse({"detail": detail}, status_code=status_code)
+
+
+class IdempotencyMiddleware:
+    """Stores and replays write responses per Idempotency-Key header.
+
+    Sits inside the compression middleware, so stored bodies are uncompressed
+    and every replay is encoded for the retrying client like a fresh response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS:
+            await self.app(scope, receive, send)
+            return
+        headers = Headers(scope=scope)
+        key = headers.get("idempotency-key")
+        # Revocation syncs and principal lookups may hit the database
+        subject = await run_in_threadpool(verified_subject, headers) if key is not None else None
+        if subject is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")(scope, receive, send)
+            return
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # The client went away before sending its body
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = request_fingerprint(scope["method"], scope["path"], scope.get("query_string", b""), body)
+
+        deadline = asyncio.get_running_loop().time() + IDEMPOTENCY_WAIT_SECONDS
+        delay = 0.05
+        while True:
+            row = await _claim(subject, key, fingerprint)
+            if row is None:
+                break
+            if row is _RETRY:
+                continue
+            if row.fingerprint != fingerprint:
+                await _error(422, "Idempotency-Key was already used for a different request")(scope, receive, send)
+                return
+            if row.response_status is not None:
+                await self._replay(row, send)
+                return
+            if asyncio.get_running_loop().time() + delay > deadline:
+                await _error(409, "A request with this Idempotency-Key is still in progress")(scope, receive, send)
+                return
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 1.0)
+
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        response = {"status": None, "headers": [], "body": []}
+
+        async def recording_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode("latin-1"), value.decode("latin-1")] for name, value in message.get("headers", [])
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, replay_receive, recording_send)
+        except Exception:
+            await _release(subject, key)
+            raise
+
+        status = response["status"]
+        try:
+            if status is None or status >= 500 or status in RETRYABLE_STATUSES:
+                await _release(subject, key)
+            else:
+                await _store(subject, key, status, response["headers"], b"".join(response["body"]))
+        except Exception:
+            # The response is already sent; a retry takes the claim over once its lock times out
+            logger.exception("Idempotency key %r could not be saved", key)
+
+    @staticmethod
+    async def _replay(row, send):
+        headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(row.response_headers)]
+        headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": row.response_status, "headers": headers})
+        await send({"type": "http.response.body", "body": row.response_body or b""})
+
+
+def purge_expired(bind=None, batch_size: int = IDEMPOTENCY_PURGE_BATCH_SIZE) -> dict:
+    """Delete expired keys in batches, one short transaction each."""
+    bind = bind or database.engine
+    now = datetime.utcnow()
+    deleted = 0
+    while True:
+        with bind.begin() as connection:
+            expired = (
+                select(models.IdempotencyKey.subject, models.IdempotencyKey.key)
+                .where(models.IdempotencyKey.expires_at <= now)
+                .limit(batch_size)
+            )
+            count = connection.execute(
+                delete(models.IdempotencyKey)
+                .where(tuple_(models.IdempotencyKey.subject, models.IdempotencyKey.key).in_(expired))
+            ).rowcount
+        deleted += count
+        if count < batch_size:
+            break
+    return {"idempotency_keys_deleted": deleted}
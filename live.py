@@ -0,0 +1,162 @@
+import asyncio
+import os
+from dotenv import load_dotenv
+import orjson
+import bus
+
+load_dotenv()
+
+# Comment lines sent to idle streams so proxies keep them open
+LIVE_HEARTBEAT_SECONDS = float(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_MAX_TOPICS = int(os.getenv("LIVE_MAX_TOPICS", "100"))
+
+# Flight fields pushed to subscribers when they change
+LIVE_FIELDS = ("available_seats", "status")
+
+
+def flight_topic(flight_id: str) -> str:
+    return f"flight:{flight_id}"
+
+
+def route_topic(origin_id: str, destination_id: str) -> str:
+    return f"route:{origin_id}:{destination_id}"
+
+
+class Subscription:
+    """One live stream's topics and its undelivered changes.
+
+    Changes are merged per flight until the stream wakes up, so a slow client
+    holds at most one pending delta per flight instead of a growing queue.
+    """
+
+    def __init__(self, topics):
+        self.topics = topics
+        self.pending = {}
+        self.heartbeat = False
+        self.wakeup = asyncio.Event()
+
+    def push(self, change: dict):
+        self.pending.setdefault(change["flight_id"], {}).update(change)
+        self.wakeup.set()
+
+    async def next_batch(self):
+        """Wait for changes or a heartbeat; returns (changes, heartbeat)."""
+        await self.wakeup.wait()
+        self.wakeup.clear()
+        changes, self.pending = list(self.pending.values()), {}
+        heartbeat, self.heartbeat = self.heartbeat, False
+        return changes, heartbeat
+
+
+class LiveBroker:
+    """In-process fan-out of flight changes to the live streams of this worker.
+
+    Idle streams cost one Event wait each: there is no per-stream timer, since
+    a single task wakes every stream for its heartbeat. publish() may be called
+    from any thread; delivery always happens on the event loop.
+    """
+
+    def __init__(self, heartbeat_seconds: float):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.topics = {}
+        self.subscriptions = set()
+        self._loop = None
+        self._heartbeat_task = None
+
+    def subscribe(self, topics) -> Subscription:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._heartbeat_task = None
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = loop.create_task(self._beat())
+        subscription = Subscription(topics)
+        self.subscriptions.add(subscription)
+        for topic in topics:
+            self.topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self.subscriptions.discard(subscription)
+        for topic in subscription.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.topics[topic]
+
+    def publish(self, changes):
+        """Queue flight changes for delivery.
+
+        Each change carries flight_id, origin_id and destination_id plus the
+        changed LIVE_FIELDS; subscribers receive flight_id and those fields.
+        """
+        loop = self._loop
+        if loop is None or not self.subscriptions or not changes:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._deliver(changes)
+            return
+        try:
+            loop.call_soon_threadsafe(self._deliver, changes)
+        except RuntimeError:
+            # The loop has shut down; nobody is listening any more
+            pass
+
+    def _deliver(self, changes):
+        for change in changes:
+            payload = {"flight_id": change["flight_id"]}
+            payload.update((field, change[field]) for field in LIVE_FIELDS if field in change)
+            for topic in (flight_topic(change["flight_id"]), route_topic(change["origin_id"], change["destination_id"])):
+                for subscription in self.topics.get(topic, ()):
+                    subscription.push(payload)
+
+    async def _beat(self):
+        while self.subscriptions:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscription in list(self.subscriptions):
+                subscription.heartbeat = True
+                subscription.wakeup.set()
+
+
+broker = LiveBroker(LIVE_HEARTBEAT_SECONDS)
+# Changes from every worker reach this worker's streams through the bus
+bus.subscribe("flights", broker.publish)
+
+
+def flight_change(flight, *fields) -> dict:
+    """A change message for the given fields of a Flight row."""
+    change = {"flight_id": flight.id, "origin_id": flight.origin_id, "destination_id": flight.destination_id}
+    change.update((field, getattr(flight, field)) for field in fields)
+    return change
+
+
+def publish_flight(db, flight, *fields):
+    """Announce changed fields of a flight, delivered once the session commits."""
+    bus.publish(db, "flights", [flight_change(flight, *fields)])
+
+
+def sse_event(event: str, data) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+async def event_stream(topics, initial=()):
+    """Server-sent events for the topics: the initial states, then deltas as they happen."""
+    # Subscribed once the response starts, so a stream that never starts leaves nothing behind
+    subscription = broker.subscribe(topics)
+    try:
+        yield b"retry: 5000\n\n"
+        for state in initial:
+            yield sse_event("flight", state)
+        while True:
+            changes, heartbeat = await subscription.next_batch()
+            if changes:
+                yield b"".join(sse_event("flight", change) for change in changes)
+            elif heartbeat:
+                yield b": ping\n\n"
+    finally:
+        broker.unsubscribe(subscription)
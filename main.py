@@ -1,18 +1,84 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine, Base
-import models
-from routers import auth, flights, bookings, airports, airlines, users, content, statistics
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+import asyncio
+import os
+import bus
+import database
+import idempotency
+import pool_metrics
+import metrics
+import query_tracking
+import scheduler
+from compression import CompressionMiddleware
+import reference_data
+from dependencies import READ_YOUR_WRITES_HEADER, ReadYourWritesMiddleware
+from routers import auth, flights, bookings, airports, airlines, users, content, statistics, live
+
+# The schema is managed by migrations (`alembic upgrade head`), not at import time
+
+# Connections each pool opens at startup, so the first requests skip connection setup
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", str(min(2, database.DB_POOL_SIZE))))
+STARTUP_WARM_TIMEOUT_SECONDS = float(os.getenv("STARTUP_WARM_TIMEOUT_SECONDS", "10"))
+
+
+def warm_sync_pool():
+    with database.engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+async def warm_async_connection():
+    async with database.async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def warm_up():
+    await asyncio.gather(
+        run_in_threadpool(warm_sync_pool),
+        *(warm_async_connection() for _ in range(DB_POOL_WARM_CONNECTIONS)),
+    )
+    async with database.AsyncSessionLocal() as db:
+        await reference_data.airports.load(db)
+        await reference_data.airlines.load(db)
+    await run_in_threadpool(database.replica_monitor.start, True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pool connections and load reference data; failures only delay the first requests
+    try:
+        await asyncio.wait_for(warm_up(), STARTUP_WARM_TIMEOUT_SECONDS)
+    except Exception as e:
+        print(f"Startup warm-up skipped: {e!r}")
+    # Cache invalidations and live changes from the other workers
+    bus.start()
+    # Flight status transitions and other periodic jobs; one worker in the cluster runs them
+    if scheduler.SCHEDULER_ENABLED:
+        scheduler.scheduler.start()
+    yield
+    await run_in_threadpool(scheduler.scheduler.stop, 5)
+    await run_in_threadpool(bus.stop, 5)
+    await database.async_engine.dispose()
+    database.engine.dispose()
+    if database.async_replica_engine is not None:
+        await database.async_replica_engine.dispose()
+        database.replica_engine.dispose()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Asmanga - Flight Ticketing Service",
     description="A comprehensive flight ticketing web service with user management, flight booking, and admin features",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Replays of Idempotency-Key writes; innermost, so replays are compressed and get CORS headers like fresh responses
+app.add_middleware(idempotency.IdempotencyMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -26,8 +92,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[READ_YOUR_WRITES_HEADER],
 )
 
+# Negotiated brotli/gzip for responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Per-request statement counts and N+1 warnings; X-DB-* headers outside production
+app.add_middleware(query_tracking.QueryTrackingMiddleware)
+
+# Added after compression and CORS, so recorded latency includes both
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Outermost, so writes answered by any layer (idempotent replays included) pin reads to the primary
+app.add_middleware(ReadYourWritesMiddleware)
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(flights.router)
@@ -37,6 +117,7 @@ app.include_router(airlines.router)
 app.include_router(users.router)
 app.include_router(content.router)
 app.include_router(statistics.router)
+app.include_router(live.router)
 
 
 @app.get("/")
@@ -49,6 +130,18 @@ def health_check():
     return {"status": "healthy", "message": "API is running"}
 
 
+@app.get("/health/pool")
+def pool_health():
+    """Connection pool occupancy and checkout-wait histograms for this worker."""
+    return pool_metrics.snapshot()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus scrape endpoint; values are per worker process."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
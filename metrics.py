@@ -0,0 +1,209 @@
+import bisect
+import threading
+import time
+import pool_metrics
+
+# Prometheus text exposition for this worker. Every metric keeps one shard per
+# thread, so the hot path never takes a lock: a thread only ever writes its
+# own shard, and a scrape sums copies of all shards. Under gunicorn each
+# worker reports its own values.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Sharded:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            # Only taken once per thread
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshots(self):
+        with self._lock:
+            shards = list(self._shards)
+        return [dict(shard) for shard in shards]
+
+    def _labels(self, values, extra=()) -> str:
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        rendered = ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs)
+        return "{" + rendered + "}"
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def inc(self, *labelvalues, amount: float = 1):
+        shard = self._shard()
+        shard[labelvalues] = shard.get(labelvalues, 0) + amount
+
+    def collect(self) -> dict:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+    def render(self):
+        for labels, value in sorted(self.collect().items()):
+            yield f"{self.name}{self._labels(labels)} {_number(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labelvalues, amount: float = 1):
+        self.inc(*labelvalues, amount=-amount)
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labelvalues):
+        shard = self._shard()
+        series = shard.get(labelvalues)
+        if series is None:
+            # Per-bucket counts, then +Inf, sum and count
+            series = shard[labelvalues] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self):
+        totals = {}
+        for shard in self._snapshots():
+            for labels, series in shard.items():
+                current = totals.setdefault(labels, [0] * len(series))
+                for i, value in enumerate(list(series)):
+                    current[i] += value
+        for labels, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], series):
+                cumulative += count
+                yield f"{self.name}_bucket{self._labels(labels, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_sum{self._labels(labels)} {_number(series[-2])}"
+            yield f"{self.name}_count{self._labels(labels)} {series[-1]}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# HTTP metrics
+http_requests = Counter("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"))
+http_in_flight = Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+
+# Business metrics
+flight_searches = Counter("flight_searches_total", "Flight searches performed.")
+bookings_created = Counter("bookings_created_total", "Bookings created.")
+bookings_cancelled = Counter("bookings_cancelled_total", "Bookings cancelled by refund status.", ("refund_status",))
+seats_sold = Counter("seats_sold_total", "Seats sold through bookings.")
+
+REGISTRY = [
+    http_requests,
+    http_request_duration,
+    http_in_flight,
+    flight_searches,
+    bookings_created,
+    bookings_cancelled,
+    seats_sold,
+]
+
+
+class MetricsMiddleware:
+    """Records latency, status and in-flight count per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+        http_in_flight.inc()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded
+            path = route.path if route is not None else "unmatched"
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - start, method, path)
+            http_requests.inc(method, path, str(status_code))
+
+
+def _render_pools():
+    pools = pool_metrics.snapshot()
+    if not pools:
+        return
+    gauges = (
+        ("db_pool_size", "Configured pool size.", "size"),
+        ("db_pool_connections_in_use", "Connections checked out.", "in_use"),
+        ("db_pool_connections_idle", "Connections idle in the pool.", "idle"),
+        ("db_pool_overflow", "Connections open beyond the pool size.", "overflow"),
+    )
+    for name, documentation, key in gauges:
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} gauge"
+        for pool, stats in pools.items():
+            yield f'{name}{{pool="{pool}"}} {stats[key]}'
+    for name, documentation, key in (
+        ("db_pool_checkouts_total", "Successful connection checkouts.", "checkouts"),
+        ("db_pool_checkout_timeouts_total", "Checkouts that timed out waiting for a free connection.", "timeouts"),
+        ("db_pool_checkout_errors_total", "Checkouts that failed to open a connection.", "errors"),
+    ):
+        yield f"# HELP {name} {documentation}"
+        yield f"# TYPE {name} counter"
+        for pool, stats in pools.items():
+            yield f'{name}{{pool="{pool}"}} {stats[key]}'
+    yield "# HELP db_pool_checkout_wait_seconds Time spent waiting for a connection."
+    yield "# TYPE db_pool_checkout_wait_seconds histogram"
+    for pool, stats in pools.items():
+        for bound, count in stats["wait_seconds_buckets"].items():
+            yield f'db_pool_checkout_wait_seconds_bucket{{pool="{pool}",le="{bound}"}} {count}'
+        yield f'db_pool_checkout_wait_seconds_sum{{pool="{pool}"}} {stats["wait_seconds_sum"]}'
+        yield f'db_pool_checkout_wait_seconds_count{{pool="{pool}"}} {stats["checkouts"] + stats["timeouts"] + stats["errors"]}'
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.render())
+    lines.extend(_render_pools())
+    return "\n".join(lines) + "\n"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, DateTime, Boolean, Float, ForeignKey, Text, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -15,7 +15,7 @@ class User(Base):
     last_name = Column(String, nullable=False)
     phone = Column(String)
     role = Column(String, nullable=False, default="regular")  # regular, company_manager, admin
-    airline_id = Column(String, ForeignKey("airlines.id"))
+    airline_id = Column(String, ForeignKey("airlines.id"), index=True)
     is_blocked = Column(Boolean, default=False)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
@@ -23,6 +23,26 @@ class User(Base):
     # Relationships
     bookings = relationship("Booking", back_populates="user")
 
+    __table_args__ = (
+        # Role filters with keyset pagination on id
+        Index("ix_users_role_id", "role", "id"),
+        # Email prefix search (LIKE 'abc%') regardless of collation
+        Index("ix_users_email_pattern", "email", postgresql_ops={"email": "varchar_pattern_ops"}),
+    )
+
+
+# Case-insensitive name prefix search
+Index(
+    "ix_users_first_name_lower",
+    func.lower(User.first_name).label("first_name_lower"),
+    postgresql_ops={"first_name_lower": "text_pattern_ops"},
+)
+Index(
+    "ix_users_last_name_lower",
+    func.lower(User.last_name).label("last_name_lower"),
+    postgresql_ops={"last_name_lower": "text_pattern_ops"},
+)
+
 
 class Airport(Base):
     __tablename__ = "airports"
@@ -68,6 +88,7 @@ class Flight(Base):
     arrival_time = Column(DateTime, nullable=False)
     duration = Column(Integer, nullable=False)  # in minutes
     price = Column(Float, nullable=False)
+    base_price = Column(Float)  # fare set by the airline; pricing.py derives price from it
     available_seats = Column(Integer, nullable=False)
     total_seats = Column(Integer, nullable=False)
     status = Column(String, default="scheduled")  # scheduled, boarding, departed, arrived, cancelled, delayed
@@ -80,6 +101,14 @@ class Flight(Base):
     destination = relationship("Airport", foreign_keys=[destination_id], back_populates="arriving_flights")
     bookings = relationship("Booking", back_populates="flight")
 
+    __table_args__ = (
+        # One departure per airline flight number; schedule imports skip existing ones
+        Index("ix_flights_airline_number_departure", "airline_id", "flight_number", "departure_time", unique=True),
+        # Status transitions made by scheduler.py
+        Index("ix_flights_status_departure", "status", "departure_time"),
+        Index("ix_flights_status_arrival", "status", "arrival_time"),
+    )
+
 
 class Booking(Base):
     __tablename__ = "bookings"
@@ -98,6 +127,10 @@ class Booking(Base):
     flight = relationship("Flight", back_populates="bookings")
     passengers = relationship("Passenger", back_populates="booking")
 
+    __table_args__ = (
+        Index("ix_bookings_flight_id_status", "flight_id", "status"),
+    )
+
 
 class Passenger(Base):
     __tablename__ = "passengers"
@@ -144,3 +177,27 @@ class Offer(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
+
+class RevokedToken(Base):
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    token_type = Column(String, nullable=False)  # access, refresh
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=func.now(), nullable=False, index=True)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # Keys are scoped to the token subject that sent them
+    subject = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)  # sha256 of method, path, query and body
+    locked_at = Column(DateTime)  # set while the first request is running
+    response_status = Column(Integer)  # null until the response is stored
+    response_headers = Column(Text)  # JSON list of [name, value]
+    response_body = Column(LargeBinary)
+    created_at = Column(DateTime, default=func.now(), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -0,0 +1,112 @@
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# Upper bounds, in seconds, of the checkout wait histogram buckets
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    """Checkout counters and a checkout-wait histogram for one connection pool."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool = None
+        self.bucket_counts = [0] * (len(WAIT_BUCKETS) + 1)
+        self.wait_sum = 0.0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe_wait(self, seconds: float, timed_out: bool = False, failed: bool = False):
+        index = len(WAIT_BUCKETS)
+        for i, bound in enumerate(WAIT_BUCKETS):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self.bucket_counts[index] += 1
+            self.wait_sum += seconds
+            if timed_out:
+                self.timeouts += 1
+            elif failed:
+                self.errors += 1
+            else:
+                self.checkouts += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(WAIT_BUCKETS) + ["+Inf"], self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "max_overflow": pool._max_overflow,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "wait_seconds_sum": round(self.wait_sum, 6),
+            "wait_seconds_buckets": buckets,
+        }
+
+
+class InstrumentedPoolMixin:
+    """Times every checkout, including the wait for a free connection."""
+
+    metrics = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        except Exception:
+            # Refused connections, authentication failures and the like; not pool pressure
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - start, failed=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.observe_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        if self.metrics is not None:
+            self.metrics.pool = pool
+        return pool
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+registry = {}
+
+
+def instrument(engine, name: str) -> PoolMetrics:
+    """Attach metrics to an engine created with an instrumented pool class."""
+    metrics = PoolMetrics(name)
+    metrics.pool = engine.pool
+    engine.pool.metrics = metrics
+    registry[name] = metrics
+    return metrics
+
+
+def snapshot() -> dict:
+    return {name: metrics.snapshot() for name, metrics in registry.items()}
@@ -0,0 +1,208 @@
+# Batch dynamic pricing for upcoming flights.
+#
+# Each run reads the pricing inputs of every upcoming flight in one query,
+# computes the new fares as NumPy column arithmetic and writes back only the
+# fares that changed, in one UPDATE ... FROM unnest(...) on PostgreSQL
+# (executemany elsewhere). A fare is the airline's base price scaled by
+#
+#   demand:  how far the load factor is ahead of or behind the expected booking
+#            curve for the days left before departure
+#   urgency: a premium that grows as departure approaches, or a discount for
+#            departures far out
+#
+# clipped to the airline's multiplier range and rounded to its price step.
+# Airlines override the default rule through PRICING_RULES, a JSON object
+# keyed by airline code or id, e.g. {"EK": {"max_multiplier": 3.0}}.
+#
+#     python pricing.py                  # one run
+#     python pricing.py --interval 300   # every five minutes
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import bindparam, func, select, text, update
+from database import engine
+import models
+
+load_dotenv()
+
+DEFAULT_RULE = {
+    "target_load_factor": 0.85,  # load factor expected at departure
+    "booking_curve_days": 30.0,  # expected load factor decays by e over this many days out
+    "demand_sensitivity": 0.8,  # multiplier change per unit of load factor ahead of the curve
+    "late_premium": 0.3,  # extra multiplier on the day of departure
+    "late_window_days": 10.0,  # the premium decays by e over this many days
+    "early_discount": 0.1,  # discount for departures more than early_window_days out
+    "early_window_days": 90.0,
+    "min_multiplier": 0.7,
+    "max_multiplier": 2.5,
+    "price_step": 1.0,  # fares are rounded to a multiple of this
+}
+RULE_PARAMETERS = tuple(DEFAULT_RULE)
+
+# Only these flights are repriced; the rest keep their last fare
+REPRICED_STATUSES = ("scheduled", "delayed")
+
+
+def load_rules(raw=None) -> dict:
+    """Per-airline rule overrides from PRICING_RULES, keyed by airline code or id."""
+    raw = os.getenv("PRICING_RULES", "") if raw is None else raw
+    if not raw.strip():
+        return {}
+    rules = json.loads(raw)
+    for key, overrides in rules.items():
+        unknown = set(overrides) - set(DEFAULT_RULE)
+        if unknown:
+            raise ValueError(f"Unknown pricing parameters for {key}: {', '.join(sorted(unknown))}")
+    return rules
+
+
+def rule_table(airlines, rules: dict):
+    """One row of rule parameters per airline, and each airline id's row index.
+
+    `airlines` are (id, code) pairs. Row 0 is the default rule, used for
+    airlines without overrides.
+    """
+    table = [[DEFAULT_RULE[name] for name in RULE_PARAMETERS]]
+    index = {}
+    for airline_id, code in airlines:
+        overrides = rules.get(code) or rules.get(airline_id)
+        if overrides:
+            index[airline_id] = len(table)
+            table.append([overrides.get(name, DEFAULT_RULE[name]) for name in RULE_PARAMETERS])
+    return np.array(table, dtype=np.float64), index
+
+
+def compute_prices(base_price, available_seats, total_seats, days_out, params):
+    """New fares for equal-length columns of flights.
+
+    `params` maps every rule parameter name to a column of per-flight values.
+    """
+    load_factor = 1.0 - available_seats / np.maximum(total_seats, 1)
+    expected_load = params["target_load_factor"] * np.exp(-days_out / params["booking_curve_days"])
+    demand = 1.0 + params["demand_sensitivity"] * (load_factor - expected_load)
+    urgency = 1.0 + params["late_premium"] * np.exp(-days_out / params["late_window_days"])
+    urgency = np.where(days_out > params["early_window_days"], 1.0 - params["early_discount"], urgency)
+    multiplier = np.clip(demand * urgency, params["min_multiplier"], params["max_multiplier"])
+    step = params["price_step"]
+    return np.round(np.maximum(np.round(base_price * multiplier / step) * step, step), 2)
+
+
+def _write_prices(connection, ids, old_prices, prices, base_prices) -> int:
+    """Store the new fares, skipping flights whose fare was edited since it was read."""
+    if connection.dialect.name == "postgresql":
+        return connection.execute(
+            text(
+                "UPDATE flights AS f SET price = v.price, base_price = v.base_price, updated_at = now() "
+                "FROM unnest(CAST(:ids AS varchar[]), CAST(:old_prices AS double precision[]), "
+                "CAST(:prices AS double precision[]), CAST(:base_prices AS double precision[])) "
+                "AS v(id, old_price, price, base_price) "
+                "WHERE f.id = v.id AND f.price = v.old_price"
+            ),
+            {"ids": ids, "old_prices": old_prices, "prices": prices, "base_prices": base_prices},
+        ).rowcount
+    statement = (
+        update(models.Flight)
+        .where(models.Flight.id == bindparam("b_id"), models.Flight.price == bindparam("b_old_price"))
+        .values(price=bindparam("b_price"), base_price=bindparam("b_base_price"), updated_at=func.now())
+    )
+    result = connection.execute(statement, [
+        {"b_id": i, "b_old_price": o, "b_price": p, "b_base_price": b}
+        for i, o, p, b in zip(ids, old_prices, prices, base_prices)
+    ])
+    return result.rowcount
+
+
+def reprice(bind=engine, now=None, rules=None, dry_run=False) -> dict:
+    """Recompute the fares of all upcoming flights and write back the changed ones."""
+    start = time.perf_counter()
+    now = now or datetime.utcnow()
+    rules = load_rules() if rules is None else rules
+    with bind.begin() as connection:
+        airlines = connection.execute(select(models.Airline.id, models.Airline.code)).all()
+        rows = connection.execute(
+            select(
+                models.Flight.id,
+                models.Flight.airline_id,
+                models.Flight.price,
+                func.coalesce(models.Flight.base_price, models.Flight.price),
+                models.Flight.available_seats,
+                models.Flight.total_seats,
+                models.Flight.departure_time,
+            ).where(
+                models.Flight.departure_time > now,
+                models.Flight.status.in_(REPRICED_STATUSES),
+            )
+        ).all()
+        fetched = time.perf_counter()
+        if not rows:
+            return {"flights": 0, "changed": 0, "updated": 0, "seconds": round(fetched - start, 3)}
+
+        ids, airline_ids, old_prices, base_prices, available, total, departures = zip(*rows)
+        table, rule_index = rule_table(airlines, rules)
+        params = table[np.fromiter((rule_index.get(a, 0) for a in airline_ids), dtype=np.intp, count=len(rows))]
+        days_out = (
+            np.array(departures, dtype="datetime64[us]") - np.datetime64(now, "us")
+        ) / np.timedelta64(1, "D")
+        old_prices = np.array(old_prices, dtype=np.float64)
+        base_prices = np.array(base_prices, dtype=np.float64)
+        prices = compute_prices(
+            base_prices,
+            np.array(available, dtype=np.float64),
+            np.array(total, dtype=np.float64),
+            days_out,
+            {name: params[:, i] for i, name in enumerate(RULE_PARAMETERS)},
+        )
+        changed = np.flatnonzero(np.abs(prices - old_prices) >= 0.005)
+        computed = time.perf_counter()
+
+        updated = 0
+        if len(changed) and not dry_run:
+            updated = _write_prices(
+                connection,
+                [ids[i] for i in changed],
+                old_prices[changed].tolist(),
+                prices[changed].tolist(),
+                base_prices[changed].tolist(),
+            )
+    end = time.perf_counter()
+    return {
+        "flights": len(rows),
+        "changed": int(len(changed)),
+        "updated": updated,
+        "seconds": round(end - start, 3),
+        "fetch_seconds": round(fetched - start, 3),
+        "compute_seconds": round(computed - fetched, 3),
+        "write_seconds": round(end - computed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute fares for upcoming flights in DATABASE_URL")
+    parser.add_argument("--interval", type=float, help="Keep running, repricing every this many seconds")
+    parser.add_argument("--dry-run", action="store_true", help="Compute fares and report changes without writing them")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules()
+    except ValueError as e:
+        sys.exit(f"Invalid PRICING_RULES: {e}")
+    while True:
+        try:
+            stats = reprice(rules=rules, dry_run=args.dry_run)
+            print(", ".join(f"{name}={value}" for name, value in stats.items()))
+        except Exception as e:
+            if args.interval is None:
+                raise
+            print(f"Pricing run failed: {e}")
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import contextvars
+import logging
+import os
+import re
+import time
+from functools import lru_cache
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+APP_ENV = os.getenv("APP_ENV", "development")
+# Same statement shape executed more often than this in one request is logged as a likely N+1
+QUERY_REPEAT_WARN_THRESHOLD = int(os.getenv("QUERY_REPEAT_WARN_THRESHOLD", "10"))
+# Query count and DB time headers are for development and benchmarks only
+QUERY_STATS_HEADERS = os.getenv("QUERY_STATS_HEADERS", str(APP_ENV != "production")).lower() in ("1", "true", "yes")
+
+_WHITESPACE = re.compile(r"\s+")
+# Expanded IN lists differ only in their placeholder count
+_PLACEHOLDER_LIST = re.compile(r"\((?:\s*(?:\?|\$\d+|%\(\w+\)s|%s|:\w+)\s*,)+\s*(?:\?|\$\d+|%\(\w+\)s|%s|:\w+)\s*\)")
+
+
+class QueryStats:
+    """Statements and DB time spent by one request."""
+
+    __slots__ = ("count", "duration", "shapes")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = {}
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        shape = statement_shape(statement)
+        self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def repeated(self, threshold: int):
+        return [(shape, count) for shape, count in self.shapes.items() if count > threshold]
+
+
+current_stats = contextvars.ContextVar("query_stats", default=None)
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(statement: str) -> str:
+    return _PLACEHOLDER_LIST.sub("(...)", _WHITESPACE.sub(" ", statement).strip())
+
+
+# Registered on the Engine class, so every sync engine and the sync side of
+# every async engine report into the stats of the request that is running.
+# Context variables follow requests into the threadpool and SQLAlchemy's
+# greenlets, so sync and async endpoints are both covered.
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_stats.get() is not None:
+        conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_stats.get()
+    if stats is None:
+        return
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    stats.record(statement, time.perf_counter() - start_times.pop())
+
+
+class QueryTrackingMiddleware:
+    """Counts statements per request and flags statement shapes repeated like an N+1."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_stats.set(stats)
+
+        async def send_with_stats(message):
+            if QUERY_STATS_HEADERS and message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Query-Count"] = str(stats.count)
+                headers["X-DB-Time-ms"] = f"{stats.duration * 1000:.2f}"
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_stats)
+        finally:
+            current_stats.reset(token)
+            for shape, count in stats.repeated(QUERY_REPEAT_WARN_THRESHOLD):
+                logger.warning(
+                    "Repeated query: %s %s ran %dx (queries=%d, db_ms=%.2f): %s",
+                    scope["method"], scope["path"], count, stats.count, stats.duration * 1000, shape[:300],
+                )
@@ -0,0 +1,118 @@
+import asyncio
+import bisect
+import os
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from dotenv import load_dotenv
+from sqlalchemy import select
+import bus
+import models
+
+load_dotenv()
+
+OFFER_SNAPSHOT_TTL_SECONDS = float(os.getenv("OFFER_SNAPSHOT_TTL_SECONDS", "60"))
+
+
+class OfferSnapshot:
+    """Active offers compiled into time segments for batch price quotes.
+
+    Every valid_from and valid_to splits the timeline; each segment holds the
+    offers valid throughout it as parallel arrays of discount rate, minimum
+    fare and discount cap. Quoting finds the segment once and then compares
+    every fare with every offer of that segment in one array operation.
+    """
+
+    def __init__(self, offers):
+        self.boundaries = sorted({offer.valid_from for offer in offers} | {offer.valid_to for offer in offers})
+        self.segments = []
+        for start in self.boundaries:
+            active = [offer for offer in offers if offer.valid_from <= start < offer.valid_to]
+            self.segments.append((
+                [(offer.id, offer.title) for offer in active],
+                np.array([offer.discount / 100 for offer in active], dtype=np.float64),
+                np.array([offer.min_price or 0.0 for offer in active], dtype=np.float64),
+                np.array([np.inf if offer.max_discount is None else offer.max_discount for offer in active], dtype=np.float64),
+            ))
+
+    def _segment(self, at: datetime):
+        index = bisect.bisect_right(self.boundaries, at) - 1
+        if index < 0:
+            return None
+        return self.segments[index]
+
+    def quote(self, prices, at: datetime = None):
+        """Original and discounted fare of each price, using its best offer at `at` (default now)."""
+        prices = np.asarray(prices, dtype=np.float64)
+        segment = self._segment(at or datetime.utcnow())
+        if segment is None or not segment[0] or not len(prices):
+            discounts, best = np.zeros(len(prices)), np.full(len(prices), -1)
+        else:
+            offers, rates, min_prices, caps = segment
+            # fares x offers: the discount each offer would give, zero where the fare is below its minimum
+            amounts = np.minimum(prices[:, None] * rates, caps)
+            amounts = np.where(prices[:, None] >= min_prices, amounts, 0.0)
+            best = amounts.argmax(axis=1)
+            discounts = np.round(amounts[np.arange(len(prices)), best], 2)
+            best = np.where(discounts > 0, best, -1)
+        quotes = []
+        for price, discount, index in zip(prices.tolist(), discounts.tolist(), best.tolist()):
+            offer_id, offer_title = segment[0][index] if index >= 0 else (None, None)
+            quotes.append({
+                "original_price": price,
+                "price": round(price - discount, 2),
+                "discount": discount,
+                "offer_id": offer_id,
+                "offer_title": offer_title,
+            })
+        return quotes
+
+
+def active_offers_statement():
+    # Offers that start later are kept, so the snapshot stays correct as time passes
+    return select(models.Offer).where(models.Offer.is_active == True, models.Offer.valid_to >= datetime.utcnow())
+
+
+class OfferCache:
+    """The current OfferSnapshot, rebuilt after the TTL or immediately after invalidate()."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot = None
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+        self._sync_lock = threading.Lock()
+
+    def is_fresh(self) -> bool:
+        return self._snapshot is not None and time.monotonic() < self._expires_at
+
+    def _store(self, offers):
+        self._snapshot = OfferSnapshot(offers)
+        self._expires_at = time.monotonic() + self.ttl
+        return self._snapshot
+
+    async def snapshot(self, db):
+        """Snapshot for an AsyncSession."""
+        if not self.is_fresh():
+            async with self._lock:
+                # Another request may have reloaded while we waited
+                if not self.is_fresh():
+                    result = await db.execute(active_offers_statement())
+                    self._store(result.scalars().all())
+        return self._snapshot
+
+    def snapshot_sync(self, db):
+        """Snapshot for a synchronous Session."""
+        if not self.is_fresh():
+            with self._sync_lock:
+                if not self.is_fresh():
+                    self._store(db.execute(active_offers_statement()).scalars().all())
+        return self._snapshot
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+
+offer_cache = OfferCache(OFFER_SNAPSHOT_TTL_SECONDS)
+bus.subscribe("offers", lambda items: offer_cache.invalidate(), reset=offer_cache.invalidate)
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+import bus
+import crud_async
+import schemas
+
+load_dotenv()
+
+REFERENCE_CACHE_TTL_SECONDS = float(os.getenv("REFERENCE_CACHE_TTL_SECONDS", "300"))
+
+
+class ReferenceData:
+    """Small, rarely changing table held in memory as validated schema objects.
+
+    Entries are reloaded after the TTL, or immediately after invalidate().
+    """
+
+    def __init__(self, loader, schema, ttl: float):
+        self.loader = loader
+        self.schema = schema
+        self.ttl = ttl
+        self._items = []
+        self._by_id = {}
+        self._expires_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self._expires_at
+
+    async def load(self, db):
+        rows = await self.loader(db)
+        items = [self.schema.model_validate(row) for row in rows]
+        self._items = items
+        self._by_id = {item.id: item for item in items}
+        self._expires_at = time.monotonic() + self.ttl
+
+    async def all(self, db):
+        if not self.is_fresh():
+            async with self._lock:
+                # Another request may have reloaded while we waited
+                if not self.is_fresh():
+                    await self.load(db)
+        return self._items
+
+    async def get(self, db, item_id: str):
+        await self.all(db)
+        return self._by_id.get(item_id)
+
+    def get_cached(self, item_id: str):
+        """Lookup without touching the database; None when unknown or not loaded."""
+        return self._by_id.get(item_id)
+
+    def invalidate(self):
+        self._expires_at = 0.0
+
+
+airports = ReferenceData(crud_async.get_airports, schemas.Airport, REFERENCE_CACHE_TTL_SECONDS)
+airlines = ReferenceData(crud_async.get_airlines, schemas.Airline, REFERENCE_CACHE_TTL_SECONDS)
+
+bus.subscribe("airports", lambda items: airports.invalidate(), reset=airports.invalidate)
+bus.subscribe("airlines", lambda items: airlines.invalidate(), reset=airlines.invalidate)
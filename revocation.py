@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from database import SessionLocal
+import bus
+import models
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL_SECONDS", "10"))
+REVOCATION_PURGE_INTERVAL_SECONDS = float(os.getenv("REVOCATION_PURGE_INTERVAL_SECONDS", "3600"))
+# revoked_at is the revoking transaction's start time, so a row can commit with
+# a timestamp older than the watermark; each sync re-reads this much history
+REVOCATION_SYNC_OVERLAP_SECONDS = float(os.getenv("REVOCATION_SYNC_OVERLAP_SECONDS", "300"))
+
+
+class RevocationList:
+    """In-memory set of revoked token ids, synced periodically from revoked_tokens.
+
+    Lookups are a dict membership test; the store is only queried once per
+    sync interval, by whichever request first notices the interval has elapsed.
+    """
+
+    def __init__(self, sync_interval: float, purge_interval: float, overlap: float):
+        self.sync_interval = sync_interval
+        self.purge_interval = purge_interval
+        self.overlap = timedelta(seconds=overlap)
+        self._revoked = {}  # jti -> expires_at
+        self._watermark = None
+        self._next_sync = 0.0
+        self._next_purge = time.monotonic() + purge_interval
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._revoked
+
+    def add(self, jti: str, expires_at: datetime):
+        self._revoked[jti] = expires_at
+
+    def resync(self):
+        """Reload all unexpired revocations on the next check, e.g. after missed messages."""
+        self._watermark = None
+        self._next_sync = 0.0
+
+    def sync(self):
+        """Pull revocations recorded since the last sync, by any worker."""
+        # Only one thread syncs; the others keep answering from the current set
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sync = time.monotonic() + self.sync_interval
+            db = SessionLocal()
+            try:
+                query = db.query(
+                    models.RevokedToken.jti,
+                    models.RevokedToken.expires_at,
+                    models.RevokedToken.revoked_at,
+                )
+                if self._watermark is None:
+                    query = query.filter(models.RevokedToken.expires_at > datetime.utcnow())
+                else:
+                    query = query.filter(models.RevokedToken.revoked_at >= self._watermark - self.overlap)
+                for jti, expires_at, revoked_at in query.all():
+                    self._revoked[jti] = expires_at
+                    if self._watermark is None or revoked_at > self._watermark:
+                        self._watermark = revoked_at
+
+                if time.monotonic() >= self._next_purge:
+                    self._next_purge = time.monotonic() + self.purge_interval
+                    purge_expired(db)
+            finally:
+                db.close()
+
+            now = datetime.utcnow()
+            for jti, expires_at in list(self._revoked.items()):
+                if expires_at <= now:
+                    self._revoked.pop(jti, None)
+        except Exception:
+            # Keep serving from the current set and retry on the next interval
+            logger.exception("Revocation list sync failed")
+        finally:
+            self._lock.release()
+
+
+revocation_list = RevocationList(
+    REVOCATION_SYNC_INTERVAL_SECONDS,
+    REVOCATION_PURGE_INTERVAL_SECONDS,
+    REVOCATION_SYNC_OVERLAP_SECONDS,
+)
+
+
+def _add_revoked(items):
+    for jti, exp in items:
+        revocation_list.add(jti, datetime.utcfromtimestamp(exp))
+
+
+bus.subscribe("revoked_tokens", _add_revoked, revocation_list.resync)
+
+
+def revoke_token(db: Session, payload: dict) -> bool:
+    """Record a decoded token as revoked, locally and in the shared store.
+
+    Returns True only for the call that revoked it; False when the token has
+    no id or another request, possibly on another worker, revoked it first.
+    """
+    jti = payload.get("jti")
+    if not jti:
+        return False
+    expires_at = datetime.utcfromtimestamp(payload["exp"])
+    db.add(models.RevokedToken(
+        jti=jti,
+        token_type=payload.get("type", "access"),
+        expires_at=expires_at,
+    ))
+    # Other workers learn of it right away instead of at their next sync
+    bus.publish(db, "revoked_tokens", [[jti, payload["exp"]]])
+    try:
+        db.commit()
+        revoked = True
+    except IntegrityError:
+        # The primary key settles concurrent revocations of the same token
+        db.rollback()
+        revoked = False
+    revocation_list.add(jti, expires_at)
+    return revoked
+
+
+def purge_expired(db: Session):
+    """Delete revocations for tokens that have expired anyway."""
+    db.query(models.RevokedToken).filter(
+        models.RevokedToken.expires_at <= datetime.utcnow()
+    ).delete(synchronize_session=False)
+    db.commit()
@@ -1,23 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import schemas
 import crud
+import crud_async
+import reference_data
+import serializers
 from database import get_db
-from dependencies import require_admin
+from dependencies import require_admin, get_async_read_db
 
 router = APIRouter(prefix="/airlines", tags=["airlines"])
 
 
 @router.get("/", response_model=List[schemas.Airline])
-def get_all_airlines(db: Session = Depends(get_db)):
-    airlines = crud.get_airlines(db)
-    return airlines
+async def get_all_airlines(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    airlines = await reference_data.airlines.all(db)
+    return serializers.schemas_response(airlines, request)
 
 
 @router.get("/{airline_id}", response_model=schemas.Airline)
-def get_airline(airline_id: str, db: Session = Depends(get_db)):
-    airline = crud.get_airline(db, airline_id=airline_id)
+async def get_airline(airline_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    airline = await reference_data.airlines.get(db, airline_id)
+    if airline is None:
+        # Added since the cache was loaded
+        airline = await crud_async.get_airline(db, airline_id=airline_id)
     if airline is None:
         raise HTTPException(status_code=404, detail="Airline not found")
     return airline
@@ -1,28 +1,33 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import schemas
-import crud
-from database import get_db
+import crud_async
+import reference_data
+import serializers
+from dependencies import get_async_read_db
 
 router = APIRouter(prefix="/airports", tags=["airports"])
 
 
 @router.get("/", response_model=List[schemas.Airport])
-def get_all_airports(db: Session = Depends(get_db)):
-    airports = crud.get_airports(db)
-    return airports
+async def get_all_airports(request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    airports = await reference_data.airports.all(db)
+    return serializers.schemas_response(airports, request)
 
 
 @router.get("/search", response_model=List[schemas.Airport])
-def search_airports(query: str, db: Session = Depends(get_db)):
-    airports = crud.search_airports(db, query=query)
+async def search_airports(query: str, db: AsyncSession = Depends(get_async_read_db)):
+    airports = await crud_async.search_airports(db, query=query)
     return airports
 
 
 @router.get("/{airport_id}", response_model=schemas.Airport)
-def get_airport(airport_id: str, db: Session = Depends(get_db)):
-    airport = crud.get_airport(db, airport_id=airport_id)
+async def get_airport(airport_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    airport = await reference_data.airports.get(db, airport_id)
+    if airport is None:
+        # Added since the cache was loaded
+        airport = await crud_async.get_airport(db, airport_id=airport_id)
     if airport is None:
         raise HTTPException(status_code=404, detail="Airport not found")
     return airport
@@ -1,45 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPBearer
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
 from datetime import timedelta
 import schemas
 import crud
 from database import get_db
-from auth import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from dependencies import get_current_user
+from auth import create_access_token, create_refresh_token, verify_token, get_password_hash_async, ACCESS_TOKEN_EXPIRE_MINUTES
+from dependencies import get_current_user, resolve_principal
+from revocation import revoke_token
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
+optional_security = HTTPBearer(auto_error=False)
+
+
+def create_token_pair(email: str):
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": email}, expires_delta=access_token_expires
+    )
+    refresh_token = create_refresh_token(data={"sub": email})
+    return access_token, refresh_token
+
 
 @router.post("/register", response_model=schemas.Token)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
     # Check if user already exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    db_user = crud.create_user(db=db, user=user)
+    # Create new user, hashing off the request threadpool
+    hashed_password = await get_password_hash_async(user.password)
+    db_user = await run_in_threadpool(crud.create_user, db=db, user=user, hashed_password=hashed_password)
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
-    )
+    # Create access and refresh tokens
+    access_token, refresh_token = create_token_pair(db_user.email)
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": db_user
     }
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
     # Authenticate user
-    user = crud.authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await crud.authenticate_user_async(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,22 +68,60 @@ def login(user_credentials: schemas.UserLogin, db: Session = Depends(get_db)):
             detail="User account is blocked"
         )
     
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
+    # Create access and refresh tokens
+    access_token, refresh_token = create_token_pair(user.email)
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": user
     }
 
 
+@router.post("/refresh", response_model=schemas.TokenPair)
+def refresh(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    payload = verify_token(request.refresh_token, token_type="refresh")
+    
+    # Blocked or deleted users cannot refresh
+    principal = resolve_principal(db, payload.get("sub"))
+    
+    # Rotate: each refresh token can be exchanged once, even when another
+    # worker has not heard of the first exchange yet
+    if not revoke_token(db, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    access_token, refresh_token = create_token_pair(principal.email)
+    
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
+
+
 @router.post("/logout")
-def logout():
-    # In a real implementation, you might want to blacklist the token
+def logout(
+    request: Optional[schemas.LogoutRequest] = None,
+    token = Depends(optional_security),
+    db: Session = Depends(get_db)
+):
+    if token is not None:
+        try:
+            revoke_token(db, verify_token(token.credentials))
+        except HTTPException:
+            # Already expired or revoked
+            pass
+    
+    if request is not None and request.refresh_token:
+        try:
+            revoke_token(db, verify_token(request.refresh_token, token_type="refresh"))
+        except HTTPException:
+            pass
+    
     return {"message": "Successfully logged out"}
 
 
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
 from datetime import datetime, timedelta
 import schemas
 import crud
-from database import get_db
-from dependencies import get_current_user
+import crud_async
+import serializers
+import metrics
+import live
+from database import get_db, get_async_db
+from dependencies import get_current_principal
 import traceback
 
 router = APIRouter(prefix="/bookings", tags=["bookings"])
@@ -15,7 +20,7 @@ router = APIRouter(prefix="/bookings", tags=["bookings"])
 def create_booking(
     booking: schemas.BookingCreate,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_principal)
 ):
     try:
         print(f"Creating booking for user {current_user.id}")
@@ -39,6 +44,8 @@ def create_booking(
                 detail="Failed to create booking"
             )
         
+        metrics.bookings_created.inc()
+        metrics.seats_sold.inc(amount=len(booking.passengers))
         return db_booking
     except Exception as e:
         print(f"Booking creation error: {e}")
@@ -46,31 +53,41 @@ def create_booking(
         raise
 
 
-@router.get("/my-bookings", response_model=List[schemas.Booking])
-def get_my_bookings(
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+@router.get("/my-bookings", response_model=Union[List[schemas.Booking], schemas.IncludedBookings])
+async def get_my_bookings(
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,price,airline"),
+    refs: Literal["embedded", "included"] = Query("embedded", description="Embed related objects in every row, or send them once under 'included'"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_principal)
 ):
-    bookings = crud.get_user_bookings(db, user_id=current_user.id)
-    return bookings
+    columns, relations = serializers.select_fields(fields, serializers.BOOKING_FIELDS, serializers.BOOKING_RELATIONS)
+    options = crud_async.booking_options(columns, relations, embed=refs == "embedded")
+    bookings = await crud_async.get_user_bookings(db, user_id=current_user.id, options=options)
+    return await serializers.shaped_bookings_response(bookings, request, db, columns, relations, refs)
 
 
 @router.get("/confirmation/{confirmation_id}", response_model=schemas.Booking)
-def get_booking_by_confirmation(
+async def get_booking_by_confirmation(
     confirmation_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    booking = crud.get_booking_by_confirmation(db, confirmation_id=confirmation_id)
+    booking = await crud_async.get_booking_by_confirmation(db, confirmation_id=confirmation_id)
     if booking is None:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
 
 
-@router.get("/company/{airline_id}", response_model=List[schemas.Booking])
-def get_company_bookings(
+@router.get("/company/{airline_id}", response_model=Union[List[schemas.Booking], schemas.IncludedBookings])
+async def get_company_bookings(
     airline_id: str,
-    db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    request: Request,
+    skip: int = Query(0, description="Number of bookings to skip"),
+    limit: int = Query(100, description="Maximum number of bookings to return, newest first"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,price,airline"),
+    refs: Literal["embedded", "included"] = Query("embedded", description="Embed related objects in every row, or send them once under 'included'"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user = Depends(get_current_principal)
 ):
     # Check permissions - only company managers of the airline or admins can access
     if current_user.role == "company_manager":
@@ -85,15 +102,17 @@ def get_company_bookings(
             detail="Admin or company manager access required"
         )
     
-    bookings = crud.get_company_bookings(db, airline_id=airline_id)
-    return bookings
+    columns, relations = serializers.select_fields(fields, serializers.BOOKING_FIELDS, serializers.BOOKING_RELATIONS)
+    options = crud_async.booking_options(columns, relations, embed=refs == "embedded")
+    bookings = await crud_async.get_company_bookings(db, airline_id=airline_id, skip=skip, limit=limit, options=options)
+    return await serializers.shaped_bookings_response(bookings, request, db, columns, relations, refs)
 
 
 @router.post("/{booking_id}/cancel")
 def cancel_booking(
     booking_id: str,
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_principal)
 ):
     # Get the booking
     booking = crud.get_booking(db, booking_id=booking_id)
@@ -132,6 +151,7 @@ def cancel_booking(
         
         # Don't restore seats for non-refundable cancellations
         db.commit()
+        metrics.bookings_cancelled.inc("non_refundable")
         
         return {
             "message": "Booking cancelled successfully. No refund available for cancellations less than 24 hours before departure.",
@@ -144,8 +164,10 @@ def cancel_booking(
         
         # Restore seats to flight
         flight.available_seats += len(booking.passengers)
+        live.publish_flight(db, flight, "available_seats")
         
         db.commit()
+        metrics.bookings_cancelled.inc("refunded")
         
         return {
             "message": "Booking cancelled successfully. Refund will be processed.",
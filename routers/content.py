@@ -1,18 +1,20 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 import schemas
 import crud
+import crud_async
 from database import get_db
-from dependencies import require_admin
+from dependencies import require_admin, get_async_read_db
 
 router = APIRouter(prefix="/content", tags=["content"])
 
 
 # Banner endpoints
 @router.get("/banners", response_model=List[schemas.Banner])
-def get_banners(db: Session = Depends(get_db)):
-    banners = crud.get_banners(db)
+async def get_banners(db: AsyncSession = Depends(get_async_read_db)):
+    banners = await crud_async.get_banners(db)
     return banners
 
 
@@ -52,8 +54,8 @@ def delete_banner(
 
 # Offer endpoints
 @router.get("/offers", response_model=List[schemas.Offer])
-def get_offers(db: Session = Depends(get_db)):
-    offers = crud.get_offers(db)
+async def get_offers(db: AsyncSession = Depends(get_async_read_db)):
+    offers = await crud_async.get_offers(db)
     return offers
 
 
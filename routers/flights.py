@@ -1,16 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile, status, Query
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Union
+import csv
+import io
 import schemas
 import crud
-from database import get_db
-from dependencies import get_current_user, require_company_manager_or_admin
+import crud_async
+import serializers
+import metrics
+import quotes
+from database import get_db, get_async_db
+from dependencies import get_current_user, require_company_manager_or_admin, get_async_read_db
 
 router = APIRouter(prefix="/flights", tags=["flights"])
 
 
-@router.get("/search", response_model=List[schemas.Flight])
-def search_flights(
+@router.get("/search", response_model=Union[List[schemas.Flight], schemas.IncludedFlights])
+async def search_flights(
+    request: Request,
     origin: str = Query(..., description="Origin airport code"),
     destination: str = Query(..., description="Destination airport code"),
     departure_date: str = Query(..., description="Departure date"),
@@ -19,7 +28,9 @@ def search_flights(
     price_max: Optional[float] = Query(None, description="Maximum price"),
     airlines: Optional[str] = Query(None, description="Comma-separated airline IDs"),
     max_duration: Optional[int] = Query(None, description="Maximum duration in minutes"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,price,airline"),
+    refs: Literal["embedded", "included"] = Query("embedded", description="Embed related objects in every row, or send them once under 'included'"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     # Create search parameters
     search_params = schemas.FlightSearchParams(
@@ -37,23 +48,35 @@ def search_flights(
         max_duration=max_duration
     )
     
-    flights = crud.search_flights(db, search_params, filters)
-    return flights
+    columns, relations = serializers.select_fields(fields, serializers.FLIGHT_FIELDS, serializers.FLIGHT_RELATIONS)
+    options = crud_async.flight_options(columns, relations, embed=refs == "embedded")
+    flights = await crud_async.search_flights(db, search_params, filters, options=options)
+    metrics.flight_searches.inc()
+    flight_quotes = None
+    if "price" in columns:
+        # Best offer for every result from the in-memory offer snapshot
+        flight_quotes = (await quotes.offer_cache.snapshot(db)).quote([flight.price for flight in flights])
+    return await serializers.shaped_flights_response(flights, request, db, columns, relations, refs, quotes=flight_quotes)
 
 
-@router.get("/", response_model=List[schemas.Flight])
-def get_all_flights(
+@router.get("/", response_model=Union[List[schemas.Flight], schemas.IncludedFlights])
+async def get_all_flights(
+    request: Request,
     skip: int = Query(0, description="Number of flights to skip"),
     limit: int = Query(100, description="Maximum number of flights to return"),
-    db: Session = Depends(get_db)
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,price,airline"),
+    refs: Literal["embedded", "included"] = Query("embedded", description="Embed related objects in every row, or send them once under 'included'"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    flights = crud.get_flights(db, skip=skip, limit=limit)
-    return flights
+    columns, relations = serializers.select_fields(fields, serializers.FLIGHT_FIELDS, serializers.FLIGHT_RELATIONS)
+    options = crud_async.flight_options(columns, relations, embed=refs == "embedded")
+    flights = await crud_async.get_flights(db, skip=skip, limit=limit, options=options)
+    return await serializers.shaped_flights_response(flights, request, db, columns, relations, refs)
 
 
 @router.get("/{flight_id}", response_model=schemas.Flight)
-def get_flight(flight_id: str, db: Session = Depends(get_db)):
-    flight = crud.get_flight(db, flight_id=flight_id)
+async def get_flight(flight_id: str, db: AsyncSession = Depends(get_async_read_db)):
+    flight = await crud_async.get_flight(db, flight_id=flight_id)
     if flight is None:
         raise HTTPException(status_code=404, detail="Flight not found")
     return flight
@@ -73,7 +96,82 @@ def create_flight(
                 detail="Company managers can only create flights for their own airline"
             )
     
-    return crud.create_flight(db=db, flight=flight)
+    try:
+        return crud.create_flight(db=db, flight=flight)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+def _run_schedule_import(db: Session, current_user, airline_id: str, patterns, dry_run: bool, row_numbers=None, rows=None):
+    # Company managers can only import schedules for their own airline
+    if current_user.role == "company_manager" and current_user.airline_id != airline_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Company managers can only import schedules for their own airline"
+        )
+    if crud.get_airline(db, airline_id) is None:
+        raise HTTPException(status_code=404, detail="Airline not found")
+    try:
+        return crud.import_schedule(db, airline_id, patterns, dry_run=dry_run, row_numbers=row_numbers, rows=rows)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/schedules/import", response_model=schemas.ScheduleImportResult)
+def import_schedule(
+    schedule: schemas.ScheduleImport,
+    dry_run: bool = Query(False, description="Validate and report without inserting"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_company_manager_or_admin)
+):
+    """Expand recurring schedule patterns into flights, inserted in one transaction."""
+    return _run_schedule_import(db, current_user, schedule.airline_id, schedule.patterns, dry_run)
+
+
+@router.post("/schedules/import/csv", response_model=schemas.ScheduleImportResult)
+def import_schedule_csv(
+    airline_id: str = Form(...),
+    file: UploadFile = File(..., description="CSV with a header row naming the SchedulePattern fields"),
+    dry_run: bool = Query(False, description="Validate and report without inserting"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_company_manager_or_admin)
+):
+    """CSV variant of the schedule import; rows are numbered by line, header included."""
+    try:
+        content = file.file.read().decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="CSV must be UTF-8 encoded")
+
+    patterns, row_numbers, rows = [], [], []
+    reader = csv.DictReader(io.StringIO(content))
+    for line, record in enumerate(reader, start=2):
+        try:
+            patterns.append(schemas.SchedulePattern(**{key.strip(): value.strip() for key, value in record.items() if key and value is not None}))
+            row_numbers.append(line)
+        except ValidationError as e:
+            errors = "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+            rows.append(schemas.ScheduleRowResult(row=line, flight_number=record.get("flight_number"), error=errors))
+    return _run_schedule_import(db, current_user, airline_id, patterns, dry_run, row_numbers, rows)
+
+
+@router.patch("/bulk", response_model=schemas.FlightBulkUpdateResult)
+def bulk_update_flights(
+    bulk_update: schemas.FlightBulkUpdate,
+    dry_run: bool = Query(False, description="Count the matching flights without updating them"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_company_manager_or_admin)
+):
+    """Reprice or change the status of every flight matching the filter in one UPDATE."""
+    # Company managers can only update flights for their airline
+    if current_user.role == "company_manager" and current_user.airline_id != bulk_update.filter.airline_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Company managers can only update flights for their own airline"
+        )
+    try:
+        return crud.bulk_update_flights(db, bulk_update.filter, bulk_update.changes, dry_run=dry_run)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.put("/{flight_id}", response_model=schemas.Flight)
@@ -96,7 +194,10 @@ def update_flight(
                 detail="Company managers can only update flights for their own airline"
             )
     
-    return crud.update_flight(db=db, flight_id=flight_id, flight_update=flight_update)
+    try:
+        return crud.update_flight(db=db, flight_id=flight_id, flight_update=flight_update)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
 @router.delete("/{flight_id}")
@@ -129,10 +230,13 @@ def delete_flight(
     return {"success": True, "message": "Flight deleted successfully"}
 
 
-@router.get("/company/{airline_id}", response_model=List[schemas.Flight])
-def get_company_flights(
+@router.get("/company/{airline_id}", response_model=Union[List[schemas.Flight], schemas.IncludedFlights])
+async def get_company_flights(
     airline_id: str,
-    db: Session = Depends(get_db),
+    request: Request,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,price,airline"),
+    refs: Literal["embedded", "included"] = Query("embedded", description="Embed related objects in every row, or send them once under 'included'"),
+    db: AsyncSession = Depends(get_async_db),
     current_user = Depends(require_company_manager_or_admin)
 ):
     # If user is company manager, they can only view flights for their airline
@@ -143,5 +247,7 @@ def get_company_flights(
                 detail="Company managers can only view flights for their own airline"
             )
     
-    flights = crud.get_company_flights(db, airline_id=airline_id)
-    return flights
+    columns, relations = serializers.select_fields(fields, serializers.FLIGHT_FIELDS, serializers.FLIGHT_RELATIONS)
+    options = crud_async.flight_options(columns, relations, embed=refs == "embedded")
+    flights = await crud_async.get_company_flights(db, airline_id=airline_id, options=options)
+    return await serializers.shaped_flights_response(flights, request, db, columns, relations, refs)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import crud_async
+import live
+import reference_data
+from dependencies import get_async_read_db
+
+router = APIRouter(prefix="/live", tags=["live"])
+
+
+@router.get("/flights")
+async def flight_events(
+    flight_ids: Optional[str] = Query(None, description="Comma-separated flight IDs"),
+    routes: Optional[str] = Query(None, description="Comma-separated routes as airport codes, e.g. JFK-LAX"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Server-sent events with seat availability and status changes.
+
+    Subscribed flights are sent once with their current state, then every
+    flight on the subscribed flights and routes is sent as it changes.
+    """
+    ids = [flight_id.strip() for flight_id in (flight_ids or "").split(",") if flight_id.strip()]
+    topics = {live.flight_topic(flight_id) for flight_id in ids}
+    if routes:
+        airport_ids = {airport.code.upper(): airport.id for airport in await reference_data.airports.all(db)}
+        for route in routes.split(","):
+            origin, _, destination = route.strip().upper().partition("-")
+            if origin not in airport_ids or destination not in airport_ids:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown route {route.strip()}")
+            topics.add(live.route_topic(airport_ids[origin], airport_ids[destination]))
+    if not topics:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Subscribe to at least one flight or route")
+    if len(topics) > live.LIVE_MAX_TOPICS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Subscribe to at most {live.LIVE_MAX_TOPICS} flights and routes per stream"
+        )
+
+    initial = await crud_async.get_flight_states(db, ids) if ids else []
+    # The stream may stay open for hours; do not hold a database connection for it
+    await db.close()
+    return StreamingResponse(
+        live.event_stream(topics, initial),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,11 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import case, func, select
 from datetime import datetime, timedelta
 import models
 import schemas
 from database import get_db
-from dependencies import get_current_user, require_admin
+from dependencies import get_current_principal, require_admin
 
 router = APIRouter(prefix="/statistics", tags=["statistics"])
 
@@ -25,12 +25,48 @@ def get_date_filter(period: str):
     return start_date
 
 
+def flight_counts(db: Session, *conditions):
+    """Total, active and completed flights in one aggregate query."""
+    # Active means future flights; scheduler.py keeps statuses current as departure times pass
+    return db.execute(
+        select(
+            func.count(models.Flight.id),
+            func.count(case((models.Flight.status.in_(["scheduled", "boarding"]), 1))),
+            func.count(case((models.Flight.status.in_(["departed", "arrived"]), 1))),
+        ).where(*conditions)
+    ).one()
+
+
+def booking_totals(db: Session, *conditions, join_flights: bool = False):
+    """Bookings, passengers and revenue in one aggregate query.
+
+    Passengers are counted per booking first, so each booking's price is
+    summed once however many passengers it has.
+    """
+    per_booking = (
+        select(models.Booking.total_price, func.count(models.Passenger.id).label("passengers"))
+        .outerjoin(models.Passenger, models.Passenger.booking_id == models.Booking.id)
+    )
+    if join_flights:
+        per_booking = per_booking.join(models.Flight, models.Booking.flight_id == models.Flight.id)
+    per_booking = per_booking.where(*conditions).group_by(models.Booking.id, models.Booking.total_price).subquery()
+    bookings, passengers, revenue = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(per_booking.c.passengers), 0),
+            func.coalesce(func.sum(per_booking.c.total_price), 0),
+        ).select_from(per_booking)
+    ).one()
+    # PostgreSQL sums integer counts as numeric
+    return bookings, int(passengers), float(revenue)
+
+
 @router.get("/company/{airline_id}", response_model=schemas.CompanyStatistics)
 def get_company_statistics(
     airline_id: str,
     period: str = Query("all", description="Statistics period: today, week, month, all"),
     db: Session = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_principal)
 ):
     # Check permissions
     if current_user.role == "company_manager":
@@ -47,37 +83,14 @@ def get_company_statistics(
     
     start_date = get_date_filter(period)
     
-    # Base query for flights
-    flights_query = db.query(models.Flight).filter(models.Flight.airline_id == airline_id)
-    if start_date:
-        flights_query = flights_query.filter(models.Flight.created_at >= start_date)
-    
-    # Total flights
-    total_flights = flights_query.count()
-    
-    # Active flights (future flights)
-    active_flights = flights_query.filter(
-        models.Flight.departure_time > datetime.utcnow(),
-        models.Flight.status.in_(["scheduled", "boarding"])
-    ).count()
-    
-    # Completed flights
-    completed_flights = flights_query.filter(
-        models.Flight.departure_time <= datetime.utcnow(),
-        models.Flight.status.in_(["departed", "arrived"])
-    ).count()
-    
-    # Bookings query
-    bookings_query = db.query(models.Booking).join(models.Flight).filter(
-        models.Flight.airline_id == airline_id
-    )
+    flight_conditions = [models.Flight.airline_id == airline_id]
+    booking_conditions = [models.Flight.airline_id == airline_id]
     if start_date:
-        bookings_query = bookings_query.filter(models.Booking.booked_at >= start_date)
+        flight_conditions.append(models.Flight.created_at >= start_date)
+        booking_conditions.append(models.Booking.booked_at >= start_date)
     
-    # Total passengers and revenue
-    bookings = bookings_query.all()
-    total_passengers = sum(len(booking.passengers) for booking in bookings)
-    total_revenue = sum(booking.total_price for booking in bookings)
+    total_flights, active_flights, completed_flights = flight_counts(db, *flight_conditions)
+    _, total_passengers, total_revenue = booking_totals(db, *booking_conditions, join_flights=True)
     
     return schemas.CompanyStatistics(
         total_flights=total_flights,
@@ -97,40 +110,20 @@ def get_admin_statistics(
 ):
     start_date = get_date_filter(period)
     
-    # Base queries
-    flights_query = db.query(models.Flight)
-    bookings_query = db.query(models.Booking)
-    users_query = db.query(models.User)
-    
+    flight_conditions = []
+    booking_conditions = []
+    users_query = db.query(func.count(models.User.id))
     if start_date:
-        flights_query = flights_query.filter(models.Flight.created_at >= start_date)
-        bookings_query = bookings_query.filter(models.Booking.booked_at >= start_date)
+        flight_conditions.append(models.Flight.created_at >= start_date)
+        booking_conditions.append(models.Booking.booked_at >= start_date)
         users_query = users_query.filter(models.User.created_at >= start_date)
     
-    # Total flights
-    total_flights = flights_query.count()
-    
-    # Active flights
-    active_flights = flights_query.filter(
-        models.Flight.departure_time > datetime.utcnow(),
-        models.Flight.status.in_(["scheduled", "boarding"])
-    ).count()
-    
-    # Completed flights
-    completed_flights = flights_query.filter(
-        models.Flight.departure_time <= datetime.utcnow(),
-        models.Flight.status.in_(["departed", "arrived"])
-    ).count()
-    
-    # Bookings and passengers
-    bookings = bookings_query.all()
-    total_bookings = len(bookings)
-    total_passengers = sum(len(booking.passengers) for booking in bookings)
-    total_revenue = sum(booking.total_price for booking in bookings)
+    total_flights, active_flights, completed_flights = flight_counts(db, *flight_conditions)
+    total_bookings, total_passengers, total_revenue = booking_totals(db, *booking_conditions)
     
     # Users and airlines
-    total_users = users_query.count()
-    total_airlines = db.query(models.Airline).filter(models.Airline.is_active == True).count()
+    total_users = users_query.scalar()
+    total_airlines = db.query(func.count(models.Airline.id)).filter(models.Airline.is_active == True).scalar()
     
     return schemas.AdminStatistics(
         total_flights=total_flights,
@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional, Literal
 import schemas
 import crud
 from database import get_db
@@ -20,6 +20,45 @@ def get_all_users(
     return users
 
 
+@router.get("/query", response_model=schemas.UserPage)
+def query_users(
+    role: Optional[Literal["regular", "company_manager", "admin"]] = Query(None, description="Filter by role"),
+    is_blocked: Optional[bool] = Query(None, description="Filter by blocked state"),
+    airline_id: Optional[str] = Query(None, description="Filter by airline"),
+    email_prefix: Optional[str] = Query(None, description="Email starts with"),
+    name_prefix: Optional[str] = Query(None, description="First or last name starts with (case-insensitive)"),
+    after: Optional[str] = Query(None, description="Cursor returned as next_cursor by the previous page"),
+    limit: int = Query(100, ge=1, le=500, description="Maximum number of users to return"),
+    count: Literal["none", "exact", "estimate"] = Query("none", description="Include a total count"),
+    db: Session = Depends(get_db),
+    current_user = Depends(require_admin)
+):
+    filters = dict(
+        role=role,
+        is_blocked=is_blocked,
+        airline_id=airline_id,
+        email_prefix=email_prefix,
+        name_prefix=name_prefix,
+    )
+    # Fetch one extra row to know whether another page exists
+    users = crud.query_users(db, after=after, limit=limit + 1, **filters)
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = users[-1].id
+    
+    total = None
+    if count != "none":
+        total = crud.count_users(db, estimate=count == "estimate", **filters)
+    
+    return {
+        "data": users,
+        "next_cursor": next_cursor,
+        "total": total,
+        "total_is_estimate": count == "estimate"
+    }
+
+
 @router.get("/{user_id}", response_model=schemas.User)
 def get_user(
     user_id: str,
@@ -76,9 +115,7 @@ def get_company_managers(
     db: Session = Depends(get_db),
     current_user = Depends(require_admin)
 ):
-    users = crud.get_users(db)
-    company_managers = [user for user in users if user.role == "company_manager"]
-    return company_managers
+    return crud.query_users(db, role="company_manager", limit=None)
 
 
 @router.post("/", response_model=schemas.User)
@@ -0,0 +1,229 @@
+# Periodic maintenance jobs, run by one process per cluster.
+#
+# Every worker starts a Scheduler thread from the app's lifespan hook, but only
+# the worker holding a PostgreSQL session advisory lock runs jobs; the others
+# retry the lock each tick and take over when the leader's connection goes
+# away. Other databases have no cluster to coordinate, so every process runs
+# the jobs. The lock is held on a dedicated connection outside the request
+# pools; it needs a session-level connection, so behind PgBouncer in
+# transaction mode point SCHEDULER_DATABASE_URL at the database directly.
+#
+#     python scheduler.py   # run the jobs in a dedicated process
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, select, text, update
+from sqlalchemy.pool import NullPool
+import database
+import bus
+import idempotency
+import models
+import pricing
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+SCHEDULER_DATABASE_URL = os.getenv("SCHEDULER_DATABASE_URL")
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "15"))
+# Any 64-bit key unique to this application within the database
+SCHEDULER_LOCK_KEY = int(os.getenv("SCHEDULER_LOCK_KEY", "727061"))
+
+FLIGHT_STATUS_INTERVAL_SECONDS = float(os.getenv("FLIGHT_STATUS_INTERVAL_SECONDS", "60"))
+FLIGHT_STATUS_BATCH_SIZE = int(os.getenv("FLIGHT_STATUS_BATCH_SIZE", "1000"))
+# Reprice upcoming flights every this many seconds; 0 leaves pricing to `python pricing.py`
+PRICING_INTERVAL_SECONDS = float(os.getenv("PRICING_INTERVAL_SECONDS", "0"))
+
+# Flights still waiting to leave on time. A delay does not have to move
+# departure_time (PATCH /flights/bulk only sets the status), so delayed flights
+# are left alone until a manager sets them back to scheduled or boarding
+DEPARTING_STATUSES = ("scheduled", "boarding")
+
+
+def _advance(bind, from_statuses, due_column, to_status: str, now: datetime, batch_size: int):
+    """Move due flights to `to_status` in batches, one transaction each.
+
+    Each batch is read through the (status, time) index. Arriving flights
+    also complete their confirmed bookings in the same transaction.
+    """
+    flights = bookings = 0
+    while True:
+        with bind.begin() as connection:
+            query = (
+                select(models.Flight.id, models.Flight.origin_id, models.Flight.destination_id)
+                .where(models.Flight.status.in_(from_statuses), due_column <= now)
+                .limit(batch_size)
+            )
+            if connection.dialect.name == "postgresql":
+                # Leave rows a manager is editing for the next run
+                query = query.with_for_update(skip_locked=True)
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+            ids = [row.id for row in rows]
+            flights += connection.execute(
+                update(models.Flight)
+                .where(models.Flight.id.in_(ids), models.Flight.status.in_(from_statuses))
+                .values(status=to_status)
+            ).rowcount
+            if to_status == "arrived":
+                bookings += connection.execute(
+                    update(models.Booking)
+                    .where(models.Booking.flight_id.in_(ids), models.Booking.status == "confirmed")
+                    .values(status="completed")
+                ).rowcount
+        bus.publish_now("flights", [
+            {"flight_id": row.id, "origin_id": row.origin_id, "destination_id": row.destination_id, "status": to_status}
+            for row in rows
+        ])
+        if len(ids) < batch_size:
+            break
+    return flights, bookings
+
+
+def advance_flight_statuses(bind=None, now=None, batch_size: int = FLIGHT_STATUS_BATCH_SIZE) -> dict:
+    """Mark flights departed and arrived as their times pass, and complete their bookings."""
+    bind = bind or database.engine
+    now = now or datetime.utcnow()
+    departed, _ = _advance(bind, DEPARTING_STATUSES, models.Flight.departure_time, "departed", now, batch_size)
+    arrived, completed = _advance(bind, ("departed",), models.Flight.arrival_time, "arrived", now, batch_size)
+    return {"departed": departed, "arrived": arrived, "bookings_completed": completed}
+
+
+class Job:
+    def __init__(self, name: str, interval: float, func):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.next_run = 0.0
+
+
+class Scheduler:
+    """Runs jobs on a daemon thread while this process holds the cluster lock."""
+
+    def __init__(self, bind, tick: float, lock_key: int, lock_url: str = None):
+        self.bind = bind
+        self.tick = tick
+        self.lock_key = lock_key
+        self.lock_url = lock_url
+        self._lock_engine = None
+        self.jobs = []
+        self.is_leader = False
+        self._lock_connection = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def add_job(self, name: str, interval: float, func):
+        self.jobs.append(Job(name, interval, func))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._release()
+
+    def _acquire(self) -> bool:
+        """Whether this process leads, taking the lock if it is free."""
+        if self.bind.dialect.name != "postgresql":
+            return True
+        if self._lock_connection is not None:
+            try:
+                # The lock lives as long as this session does
+                self._lock_connection.execute(text("SELECT 1"))
+                return True
+            except Exception as e:
+                logger.warning("Scheduler lost its lock connection: %s", e)
+                self._release()
+        if self._lock_engine is None:
+            # Not from the request pool, which would lose a connection for as long as this process leads
+            self._lock_engine = create_engine(self.lock_url or self.bind.url, poolclass=NullPool)
+        connection = self._lock_engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+        try:
+            acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}).scalar()
+        except Exception:
+            connection.close()
+            raise
+        if not acquired:
+            connection.close()
+            return False
+        self._lock_connection = connection
+        return True
+
+    def _release(self):
+        if self._lock_connection is not None:
+            try:
+                self._lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            except Exception:
+                # A broken session has lost the lock along with it
+                pass
+            try:
+                self._lock_connection.close()
+            except Exception:
+                pass
+            self._lock_connection = None
+
+    def run_pending(self):
+        for job in self.jobs:
+            if time.monotonic() < job.next_run:
+                continue
+            start = time.perf_counter()
+            try:
+                result = job.func()
+                if result and any(result.values()):
+                    logger.info("Scheduler job %s: %s in %.2fs", job.name, result, time.perf_counter() - start)
+            except Exception:
+                logger.exception("Scheduler job %s failed", job.name)
+            job.next_run = time.monotonic() + job.interval
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                leader = self._acquire()
+            except Exception as e:
+                logger.warning("Scheduler could not reach the database: %s", e)
+                leader = False
+            if leader != self.is_leader:
+                logger.info("Scheduler: this process now runs the jobs" if leader else "Scheduler: another process runs the jobs")
+                self.is_leader = leader
+            if leader:
+                self.run_pending()
+            self._stop.wait(self.tick)
+
+
+scheduler = Scheduler(
+    # Jobs run one at a time, so a single connection serves them
+    create_engine(SCHEDULER_DATABASE_URL, pool_size=1, max_overflow=0) if SCHEDULER_DATABASE_URL else database.engine,
+    SCHEDULER_TICK_SECONDS,
+    SCHEDULER_LOCK_KEY,
+    SCHEDULER_DATABASE_URL or database.DATABASE_URL,
+)
+scheduler.add_job("flight_status", FLIGHT_STATUS_INTERVAL_SECONDS, lambda: advance_flight_statuses(scheduler.bind))
+scheduler.add_job("idempotency_keys", idempotency.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, lambda: idempotency.purge_expired(scheduler.bind))
+if PRICING_INTERVAL_SECONDS > 0:
+    scheduler.add_job("pricing", PRICING_INTERVAL_SECONDS, lambda: pricing.reprice(scheduler.bind))
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    scheduler.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List, Literal
-from datetime import datetime
+from typing import Dict, Optional, List, Literal
+from datetime import date, datetime, time
 
 
 # Base schemas
@@ -37,6 +37,18 @@ class User(UserBase):
         from_attributes = True
 
 
+class Principal(BaseModel):
+    """Authenticated identity resolved from a token, without the full user row."""
+    id: str
+    email: str
+    role: Literal["regular", "company_manager", "admin"]
+    airline_id: Optional[str] = None
+    is_blocked: bool = False
+
+    class Config:
+        from_attributes = True
+
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -44,10 +56,25 @@ class UserLogin(BaseModel):
 
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
     user: User
 
 
+class TokenPair(BaseModel):
+    access_token: str
+    refresh_token: str
+    token_type: str
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
 # Airport schemas
 class AirportBase(BaseModel):
     name: str
@@ -127,13 +154,30 @@ class FlightUpdate(BaseModel):
     status: Optional[str] = None
 
 
-class Flight(FlightBase):
+class FlightQuote(BaseModel):
+    """Per-passenger fare after the best active offer."""
+    original_price: float
+    price: float
+    discount: float = 0.0
+    offer_id: Optional[str] = None
+    offer_title: Optional[str] = None
+
+
+class FlightRow(FlightBase):
+    """A flight referencing its airline and airports by id only."""
     id: str
     duration: int
     available_seats: int
     status: str = "scheduled"
     created_at: datetime
     updated_at: datetime
+    quote: Optional[FlightQuote] = None  # set on search results
+
+    class Config:
+        from_attributes = True
+
+
+class Flight(FlightRow):
     airline: Airline
     origin: Airport
     destination: Airport
@@ -142,6 +186,71 @@ class Flight(FlightBase):
         from_attributes = True
 
 
+# Schedule import schemas
+class SchedulePattern(BaseModel):
+    flight_number: str
+    origin: str  # airport code
+    destination: str  # airport code
+    days_of_week: str  # operating days, 1 = Monday ... 7 = Sunday, e.g. "135" or "1.3.5.."
+    departure_time: time
+    duration: int  # in minutes
+    start_date: date
+    end_date: date
+    price: float
+    total_seats: int
+
+
+class ScheduleImport(BaseModel):
+    airline_id: str
+    patterns: List[SchedulePattern]
+
+
+class ScheduleRowResult(BaseModel):
+    row: int
+    flight_number: Optional[str] = None
+    flights_created: int = 0
+    duplicates_skipped: int = 0
+    error: Optional[str] = None
+
+
+class ScheduleImportResult(BaseModel):
+    dry_run: bool
+    flights_created: int
+    duplicates_skipped: int
+    rows_failed: int
+    rows: List[ScheduleRowResult]
+
+
+# Bulk flight update schemas
+FlightStatus = Literal["scheduled", "boarding", "departed", "arrived", "cancelled", "delayed"]
+
+
+class FlightBulkFilter(BaseModel):
+    airline_id: str
+    origin: Optional[str] = None  # airport code
+    destination: Optional[str] = None  # airport code
+    flight_number: Optional[str] = None
+    departure_from: Optional[datetime] = None
+    departure_to: Optional[datetime] = None
+    status: Optional[List[FlightStatus]] = None  # only flights currently in one of these
+
+
+class FlightBulkChanges(BaseModel):
+    price_multiplier: Optional[float] = None
+    status: Optional[FlightStatus] = None
+
+
+class FlightBulkUpdate(BaseModel):
+    filter: FlightBulkFilter
+    changes: FlightBulkChanges
+
+
+class FlightBulkUpdateResult(BaseModel):
+    dry_run: bool
+    flights_matched: int
+    flights_updated: int
+
+
 # Passenger schemas
 class PassengerBase(BaseModel):
     first_name: str
@@ -174,7 +283,8 @@ class BookingCreate(BookingBase):
     pass
 
 
-class Booking(BaseModel):
+class BookingRow(BaseModel):
+    """A booking referencing its user and flight by id only."""
     id: str
     confirmation_id: str
     user_id: str
@@ -183,14 +293,38 @@ class Booking(BaseModel):
     status: str = "confirmed"
     payment_status: str = "paid"
     booked_at: datetime
+    passengers: List[Passenger]
+
+    class Config:
+        from_attributes = True
+
+
+class Booking(BookingRow):
     user: User
     flight: Flight
-    passengers: List[Passenger]
 
     class Config:
         from_attributes = True
 
 
+# Responses with refs=included: rows carry ids, related objects are sent once
+class IncludedTables(BaseModel):
+    users: Dict[str, User] = {}
+    flights: Dict[str, FlightRow] = {}
+    airlines: Dict[str, Airline] = {}
+    airports: Dict[str, Airport] = {}
+
+
+class IncludedFlights(BaseModel):
+    data: List[FlightRow]
+    included: IncludedTables
+
+
+class IncludedBookings(BaseModel):
+    data: List[BookingRow]
+    included: IncludedTables
+
+
 # Banner schemas
 class BannerBase(BaseModel):
     title: str
@@ -306,6 +440,13 @@ class PaginatedResponse(BaseModel):
     total_pages: int
 
 
+class UserPage(BaseModel):
+    data: List[User]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    total_is_estimate: bool = False
+
+
 class ApiResponse(BaseModel):
     success: bool
     data: Optional[dict] = None
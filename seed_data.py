@@ -1,11 +1,14 @@
 # Seed data for the database
+import os
 from datetime import datetime, timedelta, timezone
-from database import SessionLocal, engine
+from alembic import command
+from alembic.config import Config
+from database import SessionLocal
 import models
 # from auth import get_password_hash  # Commented out due to bcrypt issues
 
 # Create tables
-models.Base.metadata.create_all(bind=engine)
+command.upgrade(Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini")), "head")
 
 db = SessionLocal()
 
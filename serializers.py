@@ -0,0 +1,234 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from fastapi.responses import ORJSONResponse, Response
+import msgpack
+import reference_data
+from crud_async import FLIGHT_RELATIONS, BOOKING_RELATIONS
+
+# Direct ORM-row-to-JSON path for large list responses. The field lists mirror
+# the response schemas in schemas.py; returning an ORJSONResponse from an
+# endpoint skips response_model validation, which only re-checks what the
+# database already guarantees.
+
+AIRPORT_FIELDS = ("id", "name", "code", "city", "country", "timezone")
+AIRLINE_FIELDS = (
+    "id", "name", "code", "logo", "description", "is_active", "manager_id",
+    "created_at", "updated_at",
+)
+FLIGHT_FIELDS = (
+    "id", "flight_number", "airline_id", "origin_id", "destination_id",
+    "departure_time", "arrival_time", "price", "total_seats", "duration",
+    "available_seats", "status", "created_at", "updated_at",
+)
+USER_FIELDS = (
+    "id", "email", "first_name", "last_name", "phone", "role", "airline_id",
+    "is_blocked", "created_at", "updated_at",
+)
+PASSENGER_FIELDS = (
+    "id", "first_name", "last_name", "email", "phone", "date_of_birth",
+    "passport_number", "nationality",
+)
+BOOKING_FIELDS = (
+    "id", "confirmation_id", "user_id", "flight_id", "total_price", "status",
+    "payment_status", "booked_at",
+)
+
+
+def row_dict(obj, fields) -> dict:
+    return {field: getattr(obj, field) for field in fields}
+
+
+# Relation -> (foreign key column, table in the "included" side table)
+FLIGHT_REFERENCES = {
+    "airline": ("airline_id", "airlines"),
+    "origin": ("origin_id", "airports"),
+    "destination": ("destination_id", "airports"),
+}
+
+
+def select_fields(fields: Optional[str], columns, relations):
+    """Split a ``fields=`` selector into requested columns and relations.
+
+    No selector selects everything; ``id`` is always returned.
+    """
+    if not fields:
+        return list(columns), list(relations)
+    requested = {field.strip() for field in fields.split(",") if field.strip()}
+    unknown = requested - set(columns) - set(relations)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+        )
+    selected_columns = [column for column in columns if column in requested or column == "id"]
+    selected_relations = [relation for relation in relations if relation in requested]
+    return selected_columns, selected_relations
+
+
+class RowSerializer:
+    """Converts ORM rows to plain dicts matching the response schemas.
+
+    Related rows that repeat across a response (airlines, airports, users,
+    flights) are converted once and shared. With ``included=True`` rows keep
+    only the related ids, and the related objects are collected into side
+    tables returned by ``included_tables``.
+    """
+
+    def __init__(self, included: bool = False):
+        self.included = included
+        self._airlines = {}
+        self._airports = {}
+        self._users = {}
+        self._flights = {}
+        self._references = {"airlines": set(), "airports": set()}
+
+    def airline(self, airline) -> dict:
+        data = self._airlines.get(airline.id)
+        if data is None:
+            data = self._airlines[airline.id] = row_dict(airline, AIRLINE_FIELDS)
+        return data
+
+    def airport(self, airport) -> dict:
+        data = self._airports.get(airport.id)
+        if data is None:
+            data = self._airports[airport.id] = row_dict(airport, AIRPORT_FIELDS)
+        return data
+
+    def user(self, user) -> dict:
+        data = self._users.get(user.id)
+        if data is None:
+            data = self._users[user.id] = row_dict(user, USER_FIELDS)
+        return data
+
+    def flight(self, flight, columns=FLIGHT_FIELDS, relations=FLIGHT_RELATIONS) -> dict:
+        data = row_dict(flight, columns)
+        for name in relations:
+            if self.included:
+                foreign_key, table = FLIGHT_REFERENCES[name]
+                data[foreign_key] = getattr(flight, foreign_key)
+                self._references[table].add(data[foreign_key])
+            elif name == "airline":
+                data["airline"] = self.airline(flight.airline)
+            else:
+                data[name] = self.airport(getattr(flight, name))
+        return data
+
+    def shared_flight(self, flight) -> dict:
+        data = self._flights.get(flight.id)
+        if data is None:
+            data = self._flights[flight.id] = self.flight(flight)
+        return data
+
+    def booking(self, booking, columns=BOOKING_FIELDS, relations=BOOKING_RELATIONS) -> dict:
+        data = row_dict(booking, columns)
+        if "user" in relations:
+            user = self.user(booking.user)
+            if self.included:
+                data["user_id"] = booking.user_id
+            else:
+                data["user"] = user
+        if "flight" in relations:
+            flight = self.shared_flight(booking.flight)
+            if self.included:
+                data["flight_id"] = booking.flight_id
+            else:
+                data["flight"] = flight
+        if "passengers" in relations:
+            data["passengers"] = [row_dict(p, PASSENGER_FIELDS) for p in booking.passengers]
+        return data
+
+    async def included_tables(self, db) -> dict:
+        """Side tables for an included response, keyed by table then id."""
+        tables = {}
+        if self._users:
+            tables["users"] = self._users
+        if self._flights:
+            tables["flights"] = self._flights
+        for table, cache in (("airlines", reference_data.airlines), ("airports", reference_data.airports)):
+            ids = self._references[table]
+            if not ids:
+                continue
+            await cache.all(db)
+            if any(cache.get_cached(item_id) is None for item_id in ids):
+                # Created since the cache was loaded
+                cache.invalidate()
+                await cache.all(db)
+            tables[table] = {
+                item_id: cache.get_cached(item_id).model_dump()
+                for item_id in ids
+                if cache.get_cached(item_id) is not None
+            }
+        return tables
+
+
+def _msgpack_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class MsgPackResponse(Response):
+    media_type = "application/msgpack"
+
+    def render(self, content) -> bytes:
+        return msgpack.packb(content, default=_msgpack_default)
+
+
+def wants_msgpack(request: Request) -> bool:
+    """True when the client's Accept header prefers MessagePack over JSON."""
+    accept = request.headers.get("accept", "")
+    if "msgpack" not in accept:
+        return False
+    preferences = {}
+    for part in accept.split(","):
+        media_type, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        preferences[media_type.strip().lower()] = q
+    msgpack_q = max(preferences.get("application/msgpack", 0.0), preferences.get("application/x-msgpack", 0.0))
+    return msgpack_q > 0 and msgpack_q >= preferences.get("application/json", 0.0)
+
+
+def list_response(request: Request, content) -> Response:
+    """JSON by default, MessagePack when the client asks for it."""
+    if request is not None and wants_msgpack(request):
+        response = MsgPackResponse(content)
+    else:
+        response = ORJSONResponse(content)
+    response.headers["Vary"] = "Accept"
+    return response
+
+
+async def shaped_flights_response(flights, request: Request, db, columns, relations, refs: str, quotes=None) -> Response:
+    """Flights limited to the selected fields, with references embedded or included once.
+
+    ``quotes``, when given, holds one price quote per flight.
+    """
+    serializer = RowSerializer(included=refs == "included")
+    data = [serializer.flight(flight, columns, relations) for flight in flights]
+    if quotes is not None:
+        for row, quote in zip(data, quotes):
+            row["quote"] = quote
+    if refs == "included":
+        return list_response(request, {"data": data, "included": await serializer.included_tables(db)})
+    return list_response(request, data)
+
+
+async def shaped_bookings_response(bookings, request: Request, db, columns, relations, refs: str) -> Response:
+    """Bookings limited to the selected fields, with references embedded or included once."""
+    serializer = RowSerializer(included=refs == "included")
+    data = [serializer.booking(booking, columns, relations) for booking in bookings]
+    if refs == "included":
+        return list_response(request, {"data": data, "included": await serializer.included_tables(db)})
+    return list_response(request, data)
+
+
+def schemas_response(items, request: Request = None) -> Response:
+    """List response for already validated schema objects, e.g. cached reference data."""
+    return list_response(request, [item.model_dump() for item in items])
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+
+"""
+Script to run the FastAPI server in production with gunicorn and uvicorn workers.
+
+Settings are read from gunicorn_conf.py (WEB_CONCURRENCY, WEB_MAX_REQUESTS,
+WEB_GRACEFUL_TIMEOUT, DB_MAX_CONNECTIONS, ...).
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+if __name__ == "__main__":
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    os.execvp(
+        sys.executable,
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn_conf.py", "main:app"],
+    )
@@ -0,0 +1,126 @@
+import os
+import sys
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+
+# Configure the app for a throwaway database before any module reads the environment:
+# SQLite by default, or the PostgreSQL database in TEST_DATABASE_URL, whose tables are emptied
+_TMPDIR = tempfile.mkdtemp(prefix="asmanga-tests-")
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL", f"sqlite:///{os.path.join(_TMPDIR, 'test.db')}")
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.pop("DATABASE_REPLICA_URL", None)
+os.environ["BUS_ENABLED"] = "false"
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["PASSWORD_HASH_ITERATIONS"] = "1000"
+os.environ["APP_ENV"] = "test"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+import bus  # noqa: E402
+import cache  # noqa: E402
+import database  # noqa: E402
+import models  # noqa: E402
+from auth import create_access_token, get_password_hash  # noqa: E402
+from main import app  # noqa: E402
+
+
+models.Base.metadata.create_all(database.engine)
+
+
+@pytest.fixture(autouse=True)
+def fresh_database():
+    """Empty tables and caches for every test."""
+    with database.engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            tables = ", ".join(models.Base.metadata.tables)
+            connection.exec_driver_sql(f"TRUNCATE {tables} CASCADE")
+        else:
+            # SQLite does not enforce foreign keys by default, so the order does not matter
+            for table in models.Base.metadata.tables.values():
+                connection.execute(table.delete())
+    bus.reset_all()
+    cache.recent_writers.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def new_id() -> str:
+    return str(uuid.uuid4())
+
+
+def add_user(db, email: str, role: str = "regular", airline_id: str = None, is_blocked: bool = False):
+    user = models.User(
+        id=new_id(),
+        email=email,
+        password=get_password_hash("secret123"),
+        first_name=email.split("@")[0].title(),
+        last_name="Tester",
+        role=role,
+        airline_id=airline_id,
+        is_blocked=is_blocked,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth_headers(email: str) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': email})}"}
+
+
+@pytest.fixture
+def network(db):
+    """Two airports, an airline with its manager, and an admin."""
+    origin = models.Airport(id=new_id(), name="Origin", code="ORG", city="Origin", country="X", timezone="UTC")
+    destination = models.Airport(id=new_id(), name="Destination", code="DST", city="Destination", country="X", timezone="UTC")
+    airline = models.Airline(id=new_id(), name="Test Air", code="TA")
+    db.add_all([origin, destination, airline])
+    db.commit()
+    manager = add_user(db, "manager@example.com", role="company_manager", airline_id=airline.id)
+    admin = add_user(db, "admin@example.com", role="admin")
+    return {
+        "origin": origin.id,
+        "destination": destination.id,
+        "airline": airline.id,
+        "manager": manager.email,
+        "admin": admin.email,
+    }
+
+
+def add_flight(db, network, departure: datetime = None, **values):
+    departure = departure or datetime.utcnow() + timedelta(days=10)
+    flight = models.Flight(
+        id=new_id(),
+        flight_number=values.pop("flight_number", "TA100"),
+        airline_id=network["airline"],
+        origin_id=network["origin"],
+        destination_id=network["destination"],
+        departure_time=departure,
+        arrival_time=departure + timedelta(hours=2),
+        duration=120,
+        price=values.pop("price", 100.0),
+        base_price=values.pop("base_price", 100.0),
+        available_seats=values.pop("available_seats", 100),
+        total_seats=values.pop("total_seats", 100),
+        **values,
+    )
+    db.add(flight)
+    db.commit()
+    return flight
@@ -0,0 +1,65 @@
+import revocation
+
+
+def register(client, email="traveller@example.com"):
+    response = client.post("/auth/register", json={
+        "email": email,
+        "password": "secret123",
+        "first_name": "Travel",
+        "last_name": "Ler",
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_refresh_rotates_the_token_pair(client):
+    tokens = register(client)
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 200
+    rotated = response.json()
+    assert rotated["refresh_token"] != tokens["refresh_token"]
+    me = client.get("/auth/me", headers={"Authorization": f"Bearer {rotated['access_token']}"})
+    assert me.status_code == 200
+
+
+def test_refresh_token_is_single_use(client):
+    tokens = register(client)
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+
+
+def test_refresh_token_is_single_use_across_workers(client):
+    tokens = register(client)
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+    # A worker that has not heard of the first exchange yet
+    revocation.revocation_list._revoked.clear()
+
+    response = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    assert response.status_code == 401
+
+
+def test_logout_revokes_the_access_token(client):
+    tokens = register(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    assert client.post("/auth/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}).status_code == 200
+
+    assert client.get("/auth/me", headers=headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_resync_reloads_revocations_from_the_store(client):
+    tokens = register(client)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    client.post("/auth/logout", headers=headers)
+    revocation.revocation_list._revoked.clear()
+
+    revocation.revocation_list.resync()
+
+    assert client.get("/auth/me", headers=headers).status_code == 401
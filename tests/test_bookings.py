@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+import models
+from conftest import add_flight, add_user, auth_headers, new_id
+
+
+def add_booking(db, flight, user, booked_at):
+    booking = models.Booking(
+        id=new_id(),
+        confirmation_id=new_id()[:8],
+        user_id=user.id,
+        flight_id=flight.id,
+        total_price=flight.price,
+        booked_at=booked_at,
+    )
+    db.add(booking)
+    db.commit()
+    return booking
+
+
+def test_company_bookings_are_paged_newest_first(client, db, network):
+    user = add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    now = datetime.utcnow()
+    bookings = [add_booking(db, flight, user, now - timedelta(hours=hours)) for hours in range(5)]
+
+    pages = [
+        client.get(
+            f"/bookings/company/{network['airline']}",
+            params={"skip": skip, "limit": 2},
+            headers=auth_headers(network["manager"]),
+        ).json()
+        for skip in (0, 2, 4)
+    ]
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row["id"] for page in pages for row in page] == [booking.id for booking in bookings]
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import models
+from conftest import add_flight, add_user, auth_headers, new_id
+
+
+def bulk_update(client, network, flight_filter, changes, email=None, **params):
+    return client.patch(
+        "/flights/bulk",
+        params=params,
+        json={"filter": {"airline_id": network["airline"], **flight_filter}, "changes": changes},
+        headers=auth_headers(email or network["manager"]),
+    )
+
+
+def test_reprices_matching_flights_only(client, db, network):
+    now = datetime.utcnow()
+    near = add_flight(db, network, departure=now + timedelta(days=5), flight_number="TA1", price=100.0)
+    far = add_flight(db, network, departure=now + timedelta(days=50), flight_number="TA2", price=100.0)
+
+    response = bulk_update(client, network, {"departure_to": (now + timedelta(days=10)).isoformat()}, {"price_multiplier": 1.15})
+
+    assert response.status_code == 200
+    assert response.json() == {"dry_run": False, "flights_matched": 1, "flights_updated": 1}
+    db.expire_all()
+    assert db.get(models.Flight, near.id).price == 115.0
+    assert db.get(models.Flight, near.id).base_price == 115.0
+    assert db.get(models.Flight, far.id).price == 100.0
+
+
+def test_status_change_respects_the_status_filter(client, db, network):
+    scheduled = add_flight(db, network, flight_number="TA1")
+    cancelled = add_flight(db, network, flight_number="TA2", status="cancelled")
+
+    response = bulk_update(client, network, {"status": ["scheduled"]}, {"status": "delayed"})
+
+    assert response.json()["flights_updated"] == 1
+    db.expire_all()
+    assert db.get(models.Flight, scheduled.id).status == "delayed"
+    assert db.get(models.Flight, cancelled.id).status == "cancelled"
+
+
+def test_dry_run_counts_without_updating(client, db, network):
+    flight = add_flight(db, network)
+
+    response = bulk_update(client, network, {}, {"price_multiplier": 2}, dry_run=True)
+
+    assert response.json() == {"dry_run": True, "flights_matched": 1, "flights_updated": 0}
+    db.expire_all()
+    assert db.get(models.Flight, flight.id).price == 100.0
+
+
+def test_rejects_invalid_changes(client, network):
+    assert bulk_update(client, network, {}, {}).status_code == 400
+    assert bulk_update(client, network, {}, {"price_multiplier": 0}).status_code == 400
+    assert bulk_update(client, network, {"origin": "XXX"}, {"status": "delayed"}).status_code == 400
+
+
+def test_managers_cannot_update_other_airlines(client, db, network):
+    other_airline = models.Airline(id=new_id(), name="Other Air", code="OA")
+    db.add(other_airline)
+    db.commit()
+    other_manager = add_user(db, "other@example.com", role="company_manager", airline_id=other_airline.id)
+
+    response = bulk_update(client, network, {}, {"status": "delayed"}, email=other_manager.email)
+
+    assert response.status_code == 403
@@ -0,0 +1,29 @@
+import schemas
+from conftest import add_flight
+
+
+def test_included_refs_send_related_objects_once(client, db, network):
+    add_flight(db, network, flight_number="TA1")
+    add_flight(db, network, flight_number="TA2")
+
+    response = client.get("/flights/", params={"refs": "included"})
+
+    assert response.status_code == 200
+    body = schemas.IncludedFlights.model_validate(response.json())
+    assert len(body.data) == 2
+    assert set(body.included.airlines) == {network["airline"]}
+    assert set(body.included.airports) == {network["origin"], network["destination"]}
+    assert "airline" not in response.json()["data"][0]
+
+
+def test_list_routes_document_both_response_shapes(client):
+    paths = client.get("/openapi.json").json()["paths"]
+
+    for path, envelope in (
+        ("/flights/", "IncludedFlights"),
+        ("/flights/search", "IncludedFlights"),
+        ("/bookings/my-bookings", "IncludedBookings"),
+    ):
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        refs = {option.get("$ref", "").rsplit("/", 1)[-1] for option in schema["anyOf"]}
+        assert envelope in refs
@@ -0,0 +1,98 @@
+import json
+from datetime import datetime, timedelta
+import idempotency
+import models
+from conftest import add_flight, add_user, auth_headers
+
+
+def booking_body(flight_id: str) -> bytes:
+    return json.dumps({
+        "flight_id": flight_id,
+        "passengers": [{
+            "first_name": "Ada",
+            "last_name": "Lovelace",
+            "email": "ada@example.com",
+            "date_of_birth": "1990-01-01",
+        }],
+    }).encode()
+
+
+def post_booking(client, body: bytes, key: str, email: str = "traveller@example.com"):
+    headers = {**auth_headers(email), "Idempotency-Key": key, "Content-Type": "application/json"}
+    return client.post("/bookings/", content=body, headers=headers)
+
+
+def test_retry_replays_the_stored_response(client, db, network):
+    add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    body = booking_body(flight.id)
+
+    first = post_booking(client, body, "key-1")
+    retry = post_booking(client, body, "key-1")
+
+    assert first.status_code == 200
+    assert retry.status_code == 200
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert db.query(models.Booking).count() == 1
+
+
+def test_key_reused_for_a_different_request_is_rejected(client, db, network):
+    add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    other = add_flight(db, network, flight_number="TA200")
+    assert post_booking(client, booking_body(flight.id), "key-1").status_code == 200
+
+    response = post_booking(client, booking_body(other.id), "key-1")
+
+    assert response.status_code == 422
+    assert db.query(models.Booking).count() == 1
+
+
+def test_duplicate_of_an_in_flight_request_gets_409(client, db, network, monkeypatch):
+    add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    body = booking_body(flight.id)
+    now = datetime.utcnow()
+    db.add(models.IdempotencyKey(
+        subject="traveller@example.com",
+        key="key-1",
+        fingerprint=idempotency.request_fingerprint("POST", "/bookings/", b"", body),
+        locked_at=now,
+        created_at=now,
+        expires_at=now + timedelta(hours=1),
+    ))
+    db.commit()
+    monkeypatch.setattr(idempotency, "IDEMPOTENCY_WAIT_SECONDS", 0.2)
+
+    response = post_booking(client, body, "key-1")
+
+    assert response.status_code == 409
+    assert db.query(models.Booking).count() == 0
+
+
+def test_blocked_user_gets_no_replay(client, db, network):
+    user = add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    body = booking_body(flight.id)
+    assert post_booking(client, body, "key-1").status_code == 200
+    assert client.post(f"/users/{user.id}/block", headers=auth_headers(network["admin"])).status_code == 200
+
+    response = post_booking(client, body, "key-1")
+
+    assert response.status_code == 403
+    assert "idempotent-replayed" not in response.headers
+
+
+def test_revoked_token_gets_no_replay(client, db, network):
+    add_user(db, "traveller@example.com")
+    flight = add_flight(db, network)
+    body = booking_body(flight.id)
+    headers = {**auth_headers("traveller@example.com"), "Content-Type": "application/json"}
+    assert client.post("/bookings/", content=body, headers={**headers, "Idempotency-Key": "key-1"}).status_code == 200
+    client.post("/auth/logout", headers=headers)
+
+    response = client.post("/bookings/", content=body, headers={**headers, "Idempotency-Key": "key-1"})
+
+    assert response.status_code == 401
+    assert "idempotent-replayed" not in response.headers
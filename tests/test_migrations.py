@@ -0,0 +1,100 @@
+import os
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from alembic.config import Config
+import database
+
+pytestmark = pytest.mark.skipif(
+    database.engine.dialect.name != "postgresql", reason="the migrations target PostgreSQL"
+)
+
+SCRIPT_LOCATION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+
+@pytest.fixture
+def connection():
+    # A schema of its own, so the migrations run beside the test tables
+    with database.engine.connect() as connection:
+        connection.execute(sa.text("CREATE SCHEMA migration_test"))
+        connection.execute(sa.text("SET search_path TO migration_test"))
+        connection.commit()
+        try:
+            yield connection
+        finally:
+            connection.rollback()
+            connection.execute(sa.text("DROP SCHEMA migration_test CASCADE"))
+            connection.execute(sa.text("SET search_path TO DEFAULT"))
+            connection.commit()
+
+
+def upgrade(connection, revision="head"):
+    config = Config()
+    config.set_main_option("script_location", SCRIPT_LOCATION)
+    config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+    connection.commit()
+
+
+def execute(connection, sql, **params):
+    result = connection.execute(sa.text(sql), params)
+    connection.commit()
+    return result
+
+
+@pytest.mark.parametrize("created_at", ["0001", "0002"])
+def test_upgrades_databases_created_without_migrations(connection, created_at):
+    # The tables create_all made before, with no alembic_version to go by
+    upgrade(connection, created_at)
+    execute(connection, "DROP TABLE alembic_version")
+
+    upgrade(connection)
+
+    assert execute(connection, "SELECT version_num FROM alembic_version").scalar() == "0006"
+    assert sa.inspect(connection).has_table("idempotency_keys")
+
+
+def add_departure(connection, flight_id, booked=False):
+    execute(connection, """
+        INSERT INTO flights (id, flight_number, airline_id, origin_id, destination_id, departure_time,
+                             arrival_time, duration, price, available_seats, total_seats)
+        VALUES (:id, 'TA100', 'a1', 'p1', 'p2', '2026-12-01 08:00', '2026-12-01 10:00', 120, 100, 100, 100)
+    """, id=flight_id)
+    if booked:
+        execute(connection, """
+            INSERT INTO bookings (id, confirmation_id, user_id, flight_id, total_price)
+            VALUES (:id, :id, 'u1', :flight_id, 100)
+        """, id=f"b-{flight_id}", flight_id=flight_id)
+
+
+def add_network(connection):
+    execute(connection, """
+        INSERT INTO users (id, email, password, first_name, last_name, role)
+        VALUES ('u1', 'traveller@example.com', 'x', 'Ada', 'Lovelace', 'regular')
+    """)
+    execute(connection, "INSERT INTO airlines (id, name, code) VALUES ('a1', 'Test Air', 'TA')")
+    execute(connection, """
+        INSERT INTO airports (id, name, code, city, country, timezone)
+        VALUES ('p1', 'Origin', 'ORG', 'Origin', 'X', 'UTC'), ('p2', 'Destination', 'DST', 'Destination', 'X', 'UTC')
+    """)
+
+
+def test_unbooked_duplicate_departures_are_removed(connection):
+    upgrade(connection, "0002")
+    add_network(connection)
+    for flight_id, booked in (("f1", False), ("f2", True), ("f3", False)):
+        add_departure(connection, flight_id, booked)
+
+    upgrade(connection)
+
+    assert execute(connection, "SELECT id FROM flights").scalars().all() == ["f2"]
+
+
+def test_booked_duplicate_departures_stop_the_upgrade(connection):
+    upgrade(connection, "0002")
+    add_network(connection)
+    add_departure(connection, "f1", booked=True)
+    add_departure(connection, "f2", booked=True)
+
+    with pytest.raises(RuntimeError, match="TA100"):
+        upgrade(connection)
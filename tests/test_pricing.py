@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+import database
+import models
+import pricing
+from conftest import add_flight
+
+
+def prices(base_price, available_seats, total_seats, days_out, **overrides):
+    rule = {**pricing.DEFAULT_RULE, **overrides}
+    params = {name: np.full(1, value, dtype=np.float64) for name, value in rule.items()}
+    return pricing.compute_prices(
+        np.array([base_price], dtype=np.float64),
+        np.array([available_seats], dtype=np.float64),
+        np.array([total_seats], dtype=np.float64),
+        np.array([days_out], dtype=np.float64),
+        params,
+    )[0]
+
+
+def test_fuller_flights_cost_more():
+    assert prices(100, 20, 100, 20) > prices(100, 80, 100, 20)
+
+
+def test_flights_behind_the_booking_curve_get_cheaper_closer_to_departure():
+    # Half full is ahead of the curve a month out and far behind it the day before
+    assert prices(100, 50, 100, 1) < prices(100, 50, 100, 30)
+
+
+def test_late_departures_carry_the_premium():
+    assert prices(100, 10, 100, 1) > prices(100, 10, 100, 1, late_premium=0.0)
+
+
+def test_departures_far_out_get_the_early_discount():
+    undiscounted = prices(1000, 100, 100, 120, early_discount=0.0)
+    assert prices(1000, 100, 100, 120) == pytest.approx(undiscounted * 0.9, abs=1.0)
+
+
+def test_multiplier_is_clipped_and_rounded_to_the_step():
+    assert prices(100, 0, 100, 0, max_multiplier=1.2) == 120.0
+    assert prices(100, 100, 100, 60, min_multiplier=0.95, price_step=5.0) == 95.0
+    assert prices(99, 50, 100, 30, price_step=10.0) % 10 == 0
+
+
+def test_load_rules_rejects_unknown_parameters():
+    assert pricing.load_rules('{"TA": {"max_multiplier": 3}}') == {"TA": {"max_multiplier": 3}}
+    assert pricing.load_rules("") == {}
+    with pytest.raises(ValueError):
+        pricing.load_rules('{"TA": {"max_multipler": 3}}')
+
+
+def test_rule_table_applies_overrides_by_code_or_id():
+    table, index = pricing.rule_table([("a1", "TA"), ("a2", "OA"), ("a3", "NA")], {"TA": {"max_multiplier": 3.0}, "a2": {"price_step": 5.0}})
+
+    assert set(index) == {"a1", "a2"}
+    assert table[index["a1"]][pricing.RULE_PARAMETERS.index("max_multiplier")] == 3.0
+    assert table[index["a2"]][pricing.RULE_PARAMETERS.index("price_step")] == 5.0
+    assert table[0][pricing.RULE_PARAMETERS.index("max_multiplier")] == pricing.DEFAULT_RULE["max_multiplier"]
+
+
+def test_reprice_writes_changed_upcoming_fares(db, network):
+    now = datetime.utcnow()
+    upcoming = add_flight(db, network, departure=now + timedelta(days=2), flight_number="TA1", available_seats=10)
+    departed = add_flight(db, network, departure=now - timedelta(days=1), flight_number="TA2", status="departed")
+
+    result = pricing.reprice(database.engine, now=now, rules={})
+
+    assert result["flights"] == 1
+    assert result["updated"] == 1
+    db.expire_all()
+    flight = db.get(models.Flight, upcoming.id)
+    assert flight.price > 100.0
+    assert flight.base_price == 100.0
+    assert flight.updated_at is not None
+    assert db.get(models.Flight, departed.id).price == 100.0
+
+
+def test_dry_run_writes_nothing(db, network):
+    now = datetime.utcnow()
+    flight = add_flight(db, network, departure=now + timedelta(days=2), available_seats=10)
+
+    result = pricing.reprice(database.engine, now=now, rules={}, dry_run=True)
+
+    assert result["changed"] == 1
+    assert result["updated"] == 0
+    db.expire_all()
+    assert db.get(models.Flight, flight.id).price == 100.0
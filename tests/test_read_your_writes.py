@@ -0,0 +1,65 @@
+import time
+from starlette.requests import Request
+import cache
+import database
+import dependencies
+from conftest import add_user, auth_headers
+
+
+def read_request(headers: dict) -> Request:
+    raw = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/flights/", "headers": raw})
+
+
+def test_successful_write_returns_a_signed_marker(client, db, network):
+    user = add_user(db, "traveller@example.com")
+
+    response = client.put(f"/users/{user.id}", json={"phone": "123"}, headers=auth_headers(network["admin"]))
+
+    assert response.status_code == 200
+    marker = response.headers[dependencies.READ_YOUR_WRITES_HEADER]
+    assert f"{dependencies.READ_YOUR_WRITES_COOKIE}={marker}" in response.headers["set-cookie"]
+
+
+def test_failed_writes_and_reads_are_not_marked(client, network):
+    headers = auth_headers(network["admin"])
+
+    assert dependencies.READ_YOUR_WRITES_HEADER not in client.get("/users/", headers=headers).headers
+    assert dependencies.READ_YOUR_WRITES_HEADER not in client.put("/users/missing", json={}, headers=headers).headers
+
+
+def test_marker_pins_reads_to_the_primary_on_any_worker(client, network, monkeypatch):
+    monkeypatch.setattr(database.replica_monitor, "is_available", lambda: True)
+    headers = auth_headers(network["admin"])
+    response = client.post("/content/banners", json={"title": "Sale"}, headers=headers)
+    marker = response.headers[dependencies.READ_YOUR_WRITES_HEADER]
+    # Another worker has no record of the write
+    cache.recent_writers.clear()
+
+    assert dependencies.use_replica(read_request(headers)) is True
+    assert dependencies.use_replica(read_request({**headers, dependencies.READ_YOUR_WRITES_HEADER: marker})) is False
+    assert dependencies.use_replica(read_request({**headers, "Cookie": f"{dependencies.READ_YOUR_WRITES_COOKIE}={marker}"})) is False
+
+
+def test_marker_is_bound_to_the_user_and_expires(network, monkeypatch):
+    monkeypatch.setattr(database.replica_monitor, "is_available", lambda: True)
+    headers = auth_headers(network["admin"])
+    until = int(time.time()) + 60
+    other_users = dependencies.read_your_writes_token(network["manager"], until)
+    expired = dependencies.read_your_writes_token(network["admin"], int(time.time()) - 1)
+    forged = f"{until}.{'0' * 32}"
+
+    for marker in (other_users, expired, forged):
+        assert dependencies.use_replica(read_request({**headers, dependencies.READ_YOUR_WRITES_HEADER: marker})) is True
+
+
+def test_replica_availability_never_checks_on_the_caller(monkeypatch):
+    monitor = database.ReplicaMonitor(interval=60, max_lag=5)
+    monkeypatch.setattr(database, "replica_engine", object())
+    monkeypatch.setattr(monitor, "check", lambda: time.sleep(0.5))
+
+    start = time.perf_counter()
+    available = monitor.is_available()
+
+    assert available is False
+    assert time.perf_counter() - start < 0.25
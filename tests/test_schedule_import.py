@@ -0,0 +1,110 @@
+from datetime import date, datetime, timedelta
+import crud
+import database
+import models
+from schemas import SchedulePattern
+from conftest import add_flight, auth_headers
+
+# A Monday far enough out that every departure is in the future
+START = date.today() + timedelta(days=63 - date.today().weekday())
+
+
+def pattern(**values):
+    return {
+        "flight_number": "TA300",
+        "origin": "ORG",
+        "destination": "DST",
+        "days_of_week": "135",
+        "departure_time": "08:30:00",
+        "duration": 90,
+        "start_date": START.isoformat(),
+        "end_date": (START + timedelta(days=13)).isoformat(),
+        "price": 120.0,
+        "total_seats": 150,
+        **values,
+    }
+
+
+def import_schedule(client, network, patterns, **params):
+    response = client.post(
+        "/flights/schedules/import",
+        params=params,
+        json={"airline_id": network["airline"], "patterns": patterns},
+        headers=auth_headers(network["manager"]),
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_import_creates_a_flight_per_operating_day(client, db, network):
+    result = import_schedule(client, network, [pattern()])
+
+    # Monday, Wednesday and Friday of two weeks
+    assert result["flights_created"] == 6
+    assert result["duplicates_skipped"] == 0
+    departures = sorted(row.departure_time for row in db.query(models.Flight.departure_time))
+    assert departures[0] == datetime.combine(START, datetime.min.time()).replace(hour=8, minute=30)
+
+
+def test_dry_run_inserts_nothing(client, db, network):
+    result = import_schedule(client, network, [pattern()], dry_run=True)
+
+    assert result["flights_created"] == 6
+    assert db.query(models.Flight).count() == 0
+
+
+def test_reimport_skips_existing_departures(client, db, network):
+    import_schedule(client, network, [pattern()])
+
+    result = import_schedule(client, network, [pattern(end_date=(START + timedelta(days=20)).isoformat())])
+
+    assert result["flights_created"] == 3
+    assert result["duplicates_skipped"] == 6
+    assert db.query(models.Flight).count() == 9
+
+
+def test_invalid_rows_are_reported_and_the_rest_imported(client, db, network):
+    result = import_schedule(client, network, [pattern(origin="XXX"), pattern(flight_number="TA301")])
+
+    assert result["rows_failed"] == 1
+    assert result["rows"][0]["error"]
+    assert result["rows"][1]["flights_created"] == 6
+
+
+def test_departures_inserted_concurrently_count_as_duplicates(db, network, monkeypatch):
+    insert_new_flights = crud._insert_new_flights
+
+    def concurrent_import_first(session, flights):
+        # Another import commits one of the departures after this one's duplicate check
+        other = database.SessionLocal()
+        try:
+            add_flight(other, network, departure=flights[0]["departure_time"], flight_number=flights[0]["flight_number"])
+        finally:
+            other.close()
+        return insert_new_flights(session, flights)
+
+    monkeypatch.setattr(crud, "_insert_new_flights", concurrent_import_first)
+
+    result = crud.import_schedule(db, network["airline"], [SchedulePattern(**pattern())])
+
+    assert result.flights_created == 5
+    assert result.duplicates_skipped == 1
+    assert result.rows[0].flights_created == 5
+    assert db.query(models.Flight).count() == 6
+
+
+def test_creating_an_existing_departure_is_rejected(client, db, network):
+    flight = add_flight(db, network)
+
+    response = client.post("/flights/", headers=auth_headers(network["manager"]), json={
+        "flight_number": flight.flight_number,
+        "airline_id": network["airline"],
+        "origin_id": network["origin"],
+        "destination_id": network["destination"],
+        "departure_time": flight.departure_time.isoformat(),
+        "arrival_time": flight.arrival_time.isoformat(),
+        "price": 100.0,
+        "total_seats": 100,
+    })
+
+    assert response.status_code == 400
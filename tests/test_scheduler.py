@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+import database
+import models
+import scheduler
+from conftest import add_flight
+
+
+def test_advance_departs_and_arrives_due_flights(db, network):
+    now = datetime.utcnow()
+    departing = add_flight(db, network, departure=now - timedelta(minutes=30), flight_number="TA1")
+    arriving = add_flight(db, network, departure=now - timedelta(hours=3), flight_number="TA2", status="departed")
+    later = add_flight(db, network, departure=now + timedelta(days=1), flight_number="TA3")
+
+    result = scheduler.advance_flight_statuses(database.engine, now=now)
+
+    assert result["departed"] == 1
+    assert result["arrived"] == 1
+    db.expire_all()
+    assert db.get(models.Flight, departing.id).status == "departed"
+    assert db.get(models.Flight, arriving.id).status == "arrived"
+    assert db.get(models.Flight, later.id).status == "scheduled"
+
+
+def test_delayed_flight_keeps_its_status_past_the_original_departure(db, network):
+    now = datetime.utcnow()
+    # A bulk status change marks a flight delayed without moving departure_time
+    delayed = add_flight(db, network, departure=now - timedelta(hours=3), status="delayed")
+
+    result = scheduler.advance_flight_statuses(database.engine, now=now)
+
+    assert result == {"departed": 0, "arrived": 0, "bookings_completed": 0}
+    db.expire_all()
+    assert db.get(models.Flight, delayed.id).status == "delayed"
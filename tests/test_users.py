@@ -0,0 +1,63 @@
+import crud
+from conftest import add_user, auth_headers
+
+
+def query(client, network, **params):
+    response = client.get("/users/query", params=params, headers=auth_headers(network["admin"]))
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_keyset_pages_cover_every_user_once(client, db, network):
+    for i in range(7):
+        add_user(db, f"user{i}@example.com")
+
+    seen, after = [], None
+    while True:
+        params = {"role": "regular", "limit": 3}
+        if after:
+            params["after"] = after
+        page = query(client, network, **params)
+        seen.extend(user["email"] for user in page["data"])
+        after = page["next_cursor"]
+        if after is None:
+            break
+
+    assert sorted(seen) == sorted(f"user{i}@example.com" for i in range(7))
+    assert len(seen) == len(set(seen))
+
+
+def test_filters_by_prefix_and_counts(client, db, network):
+    add_user(db, "alice@example.com")
+    add_user(db, "albert@example.com")
+    add_user(db, "bob@example.com")
+
+    page = query(client, network, email_prefix="al", count="exact")
+
+    assert {user["email"] for user in page["data"]} == {"alice@example.com", "albert@example.com"}
+    assert page["total"] == 2
+
+
+def test_like_wildcards_in_a_prefix_match_literally(client, db, network):
+    add_user(db, "a_b@example.com")
+    add_user(db, "axb@example.com")
+
+    page = query(client, network, email_prefix="a_")
+
+    assert [user["email"] for user in page["data"]] == ["a_b@example.com"]
+
+
+def test_colon_in_a_prefix_is_not_a_bind_parameter(client, db, network):
+    add_user(db, "colon@example.com")
+
+    for count in ("exact", "estimate"):
+        page = query(client, network, name_prefix=":x", count=count)
+        assert page["data"] == []
+        assert page["total"] is not None
+
+
+def test_estimate_reads_the_plan_with_literal_colons_and_wildcards(db, network):
+    add_user(db, "colon@example.com")
+
+    # Runs EXPLAIN on PostgreSQL and falls back to an exact count elsewhere
+    assert crud.count_users(db, estimate=True, name_prefix=":x%_") >= 0